@@ -0,0 +1,426 @@
+"""Local stand-ins for Discord, Lavalink and Spotify used by the load harness.
+
+Lavalink and Spotify are real HTTP/websocket servers on localhost so the
+cog's own clients (wavelink, AsyncSpotify) run unmodified. Discord is
+emulated in-process: gateway events are fed straight into the bot's
+connection state and REST calls are answered by a replacement for
+``HTTPClient.request``. Every stand-in sleeps for a configurable latency.
+"""
+import asyncio
+import base64
+import datetime
+import hashlib
+import itertools
+import json
+import random
+import time
+import typing
+
+import discord
+from aiohttp import web
+
+GENRES = (
+    "acoustic", "alt-rock", "ambient", "blues", "classical", "country", "dance", "disco", "drum-and-bass",
+    "dubstep", "edm", "electronic", "folk", "funk", "garage", "grunge", "hip-hop", "house", "indie",
+    "jazz", "k-pop", "metal", "pop", "punk", "r-n-b", "reggae", "rock", "soul", "synth-pop", "techno",
+)
+
+ARTISTS = tuple(f"Artist {i}" for i in range(200))
+
+
+class _Server:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._runner: typing.Optional[web.AppRunner] = None
+        self.port = 0
+
+    def app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeSpotify(_Server):
+    """Client-credentials token endpoint plus search, recommendations, genre seeds and paged playlists/albums.
+
+    A playlist or album ID ending in digits has that many tracks, otherwise 50.
+    IDs starting with "private" are not found at all, and ones starting with
+    "broken" are not found past their first page.
+    """
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/token"
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/token", self._token)
+        app.router.add_get("/v1/search", self._search)
+        app.router.add_get("/v1/recommendations", self._recommendations)
+        app.router.add_get("/v1/recommendations/available-genre-seeds", self._genres)
+        app.router.add_get("/v1/playlists/{id}/tracks", self._collection)
+        app.router.add_get("/v1/albums/{id}/tracks", self._collection)
+        return app
+
+    @staticmethod
+    def _track(track_id: str, name: str, artist: str) -> dict:
+        return {"id": track_id, "name": name, "artists": [{"name": artist}]}
+
+    async def _token(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"access_token": "bench", "token_type": "Bearer", "expires_in": 3600})
+
+    async def _search(self, request: web.Request) -> web.Response:
+        await self._delay()
+        query = request.query.get("q", "")
+        track_id = hashlib.blake2b(query.encode(), digest_size=11).hexdigest()
+        return web.json_response({"tracks": {"items": [self._track(track_id, query, random.choice(ARTISTS))]}})
+
+    async def _recommendations(self, request: web.Request) -> web.Response:
+        await self._delay()
+        limit = int(request.query.get("limit", 20))
+        tracks = []
+        for _ in range(limit):
+            n = random.randrange(1_000_000)
+            tracks.append(self._track(f"rec{n:07d}", f"Song {n}", random.choice(ARTISTS)))
+        return web.json_response({"tracks": tracks})
+
+    async def _genres(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"genres": list(GENRES)})
+
+    async def _collection(self, request: web.Request) -> web.Response:
+        await self._delay()
+        collection_id = request.match_info["id"]
+        digits = collection_id[len(collection_id.rstrip("0123456789")):]
+        total = int(digits) if digits else 50
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 50))
+        if collection_id.startswith("private") or (collection_id.startswith("broken") and offset):
+            return web.json_response({"error": {"status": 404, "message": "Resource not found"}}, status=404)
+        tracks = [
+            self._track(f"{collection_id}-{n}", f"{collection_id} song {n}", ARTISTS[n % len(ARTISTS)])
+            for n in range(offset, min(offset + limit, total))
+        ]
+        # Playlist pages wrap each track in an item; album pages list the tracks directly.
+        items = [{"track": track} for track in tracks] if "/playlists/" in request.path else tracks
+        next_url = str(request.url.update_query(offset=offset + limit)) if offset + limit < total else None
+        return web.json_response({"items": items, "total": total, "offset": offset, "limit": limit, "next": next_url})
+
+
+class FakeLavalink(_Server):
+    """Speaks enough of the Lavalink v3 protocol for wavelink 1.3.
+
+    Searches return tracks whose identifiers encode their info, so
+    ``decodetrack`` needs no state. A played track "ends" after
+    ``track_seconds`` of wall time with a ``TrackEndEvent``.
+    """
+
+    def __init__(self, latency: float, *, track_seconds: float = 5.0, password: str = "bench") -> None:
+        super().__init__(latency)
+        self.track_seconds = track_seconds
+        self.password = password
+        self.plays = 0
+        self._sockets: typing.Set[web.WebSocketResponse] = set()
+        self._playing: typing.Dict[str, typing.Tuple[str, asyncio.TimerHandle]] = {}
+        # The last play payload per guild, for checks on what was sent where.
+        self.last_play: typing.Dict[str, dict] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self._websocket)
+        app.router.add_get("/loadtracks", self._load_tracks)
+        app.router.add_get("/decodetrack", self._decode_track)
+        return app
+
+    @staticmethod
+    def _info(query: str, index: int) -> dict:
+        identifier = hashlib.blake2b(f"{query}:{index}".encode(), digest_size=8).hexdigest()[:11]
+        return {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": random.choice(ARTISTS),
+            "length": random.randint(120, 300) * 1000,
+            "isStream": False,
+            "position": 0,
+            "title": query if index == 0 else f"{query} ({index})",
+            "uri": f"https://www.youtube.com/watch?v={identifier}",
+            "sourceName": "youtube",
+        }
+
+    @staticmethod
+    def _encode(info: dict) -> str:
+        return base64.b64encode(json.dumps(info).encode()).decode()
+
+    async def _load_tracks(self, request: web.Request) -> web.Response:
+        await self._delay()
+        identifier = request.query.get("identifier", "")
+        if "list=" in identifier:
+            # A YouTube playlist URL: as many tracks as the list ID's trailing digits, otherwise 50; "PLprivate" lists fail to load.
+            list_id = identifier.rpartition("list=")[2]
+            if list_id.startswith("PLprivate"):
+                return web.json_response(
+                    {"loadType": "LOAD_FAILED", "exception": {"message": "This playlist is private.", "severity": "COMMON"}}
+                )
+            digits = list_id[len(list_id.rstrip("0123456789")):]
+            tracks = []
+            for index in range(int(digits) if digits else 50):
+                info = self._info(f"{list_id} video", index + 1)
+                tracks.append({"track": self._encode(info), "info": info})
+            return web.json_response(
+                {"loadType": "PLAYLIST_LOADED", "playlistInfo": {"name": list_id, "selectedTrack": -1}, "tracks": tracks}
+            )
+        query = identifier.partition(":")[2] or identifier
+        tracks = []
+        for index in range(3):
+            info = self._info(query, index)
+            tracks.append({"track": self._encode(info), "info": info})
+        return web.json_response({"loadType": "SEARCH_RESULT", "playlistInfo": {}, "tracks": tracks})
+
+    async def _decode_track(self, request: web.Request) -> web.Response:
+        return web.json_response(json.loads(base64.b64decode(request.query["track"])))
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        if request.headers.get("Authorization") != self.password:
+            raise web.HTTPUnauthorized()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        stats = asyncio.get_running_loop().create_task(self._send_stats(ws))
+        try:
+            async for msg in ws:
+                self._handle(ws, json.loads(msg.data))
+        finally:
+            stats.cancel()
+            self._sockets.discard(ws)
+        return ws
+
+    async def _send_stats(self, ws: web.WebSocketResponse) -> None:
+        started = time.monotonic()
+        while not ws.closed:
+            await ws.send_json({
+                "op": "stats",
+                "uptime": int((time.monotonic() - started) * 1000),
+                "players": len(self._playing),
+                "playingPlayers": len(self._playing),
+                "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+                "cpu": {"cores": 1, "systemLoad": 0.1, "lavalinkLoad": 0.1},
+            })
+            await asyncio.sleep(1)
+
+    def _end(self, ws: web.WebSocketResponse, guild_id: str, reason: str) -> None:
+        playing = self._playing.pop(guild_id, None)
+        if playing is None:
+            return
+        track, timer = playing
+        timer.cancel()
+        if not ws.closed:
+            asyncio.ensure_future(ws.send_json(
+                {"op": "event", "type": "TrackEndEvent", "guildId": guild_id, "track": track, "reason": reason}
+            ))
+
+    def _handle(self, ws: web.WebSocketResponse, payload: dict) -> None:
+        op = payload.get("op")
+        guild_id = payload.get("guildId")
+        if op == "play":
+            self.plays += 1
+            self._end(ws, guild_id, "REPLACED")
+            timer = asyncio.get_running_loop().call_later(self.track_seconds, self._end, ws, guild_id, "FINISHED")
+            self._playing[guild_id] = (payload["track"], timer)
+            self.last_play[guild_id] = payload
+            asyncio.ensure_future(ws.send_json({
+                "op": "playerUpdate",
+                "guildId": guild_id,
+                "state": {"time": int(time.time() * 1000), "position": int(payload.get("startTime", 0))},
+            }))
+        elif op == "stop":
+            self._end(ws, guild_id, "STOPPED")
+        elif op == "destroy":
+            playing = self._playing.pop(guild_id, None)
+            if playing is not None:
+                playing[1].cancel()
+
+    async def close(self) -> None:
+        for _, timer in self._playing.values():
+            timer.cancel()
+        self._playing.clear()
+        for ws in list(self._sockets):
+            await ws.close()
+        await super().close()
+
+
+class FakeGateway:
+    """Stands in for ``Client.ws``; echoes voice state changes back as gateway events."""
+
+    def __init__(self, state, latency: float) -> None:
+        self.state = state
+        self.latency = latency
+        self.shard_id = None
+        self.open = True
+
+    async def voice_state(self, guild_id: int, channel_id: typing.Optional[int], self_mute=False, self_deaf=False) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        session_id = f"session-{guild_id}"
+        self.state.parse_voice_state_update({
+            "guild_id": str(guild_id),
+            "channel_id": str(channel_id) if channel_id else None,
+            "user_id": str(self.state.user.id),
+            "session_id": session_id,
+            "deaf": False, "mute": False, "self_deaf": self_deaf, "self_mute": self_mute,
+            "self_video": False, "suppress": False, "request_to_speak_timestamp": None,
+        })
+        if channel_id:
+            self.state.parse_voice_server_update(
+                {"guild_id": str(guild_id), "token": "bench", "endpoint": "127.0.0.1"}
+            )
+
+    async def change_presence(self, **kwargs) -> None:
+        pass
+
+    async def close(self, code: int = 1000) -> None:
+        self.open = False
+
+
+def _timestamp() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class FakeDiscord:
+    """Builds guilds, channels and members in a bot's cache and answers its REST calls."""
+
+    BOT_ID = 1
+
+    def __init__(self, bot: discord.Client, latency: float) -> None:
+        self.bot = bot
+        self.state = bot._connection
+        self.latency = latency
+        self.requests = 0
+        self._ids = itertools.count(10_000_000)
+
+        bot_user = self.user_payload(self.BOT_ID, "Harmony", bot=True)
+        self.state.user = discord.ClientUser(state=self.state, data=bot_user)
+        self.state._users[self.BOT_ID] = self.state.user
+        bot.http.request = self.request
+        bot.ws = FakeGateway(self.state, latency)
+        # AutoShardedClient looks up the gateway per shard; every guild shares the fake one.
+        self.state._get_websocket = lambda guild_id=None, *, shard_id=None: bot.ws
+
+    def snowflake(self) -> int:
+        return next(self._ids)
+
+    @staticmethod
+    def user_payload(user_id: int, name: str, *, bot: bool = False) -> dict:
+        return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": name, "avatar": None, "bot": bot}
+
+    def member_payload(self, user: dict) -> dict:
+        return {"user": user, "roles": [], "joined_at": _timestamp(), "deaf": False, "mute": False, "flags": 0}
+
+    def add_guild(self, index: int) -> typing.Tuple[discord.Guild, discord.TextChannel, discord.Member]:
+        guild_id = self.snowflake()
+        text_id, voice_id, user_id = self.snowflake(), self.snowflake(), self.snowflake()
+        user = self.user_payload(user_id, f"listener{index}")
+        data = {
+            "id": str(guild_id),
+            "name": f"Bench Guild {index}",
+            "owner_id": str(user_id),
+            "roles": [{
+                "id": str(guild_id), "name": "@everyone", "permissions": str(discord.Permissions.all().value),
+                "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False,
+            }],
+            "channels": [
+                {"id": str(text_id), "type": 0, "name": "music", "position": 0, "permission_overwrites": []},
+                {"id": str(voice_id), "type": 2, "name": "Music", "position": 1, "permission_overwrites": [],
+                 "bitrate": 64000, "user_limit": 0},
+            ],
+            "members": [self.member_payload(self.user_payload(self.BOT_ID, "Harmony", bot=True)), self.member_payload(user)],
+            "voice_states": [{
+                "user_id": str(user_id), "channel_id": str(voice_id), "session_id": f"user-{user_id}",
+                "deaf": False, "mute": False, "self_deaf": False, "self_mute": False, "self_video": False,
+                "suppress": False, "request_to_speak_timestamp": None,
+            }],
+            "member_count": 2,
+            "emojis": [], "stickers": [], "features": [],
+        }
+        guild = discord.Guild(data=data, state=self.state)
+        self.state._add_guild(guild)
+        return guild, guild.get_channel(text_id), guild.get_member(user_id)
+
+    def message_payload(self, channel_id: int, author: dict, content: str, *, guild_id=None, member=None, **extra) -> dict:
+        payload = {
+            "id": str(self.snowflake()),
+            "channel_id": str(channel_id),
+            "author": author,
+            "content": content,
+            "timestamp": _timestamp(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+        if guild_id is not None:
+            payload["guild_id"] = str(guild_id)
+        if member is not None:
+            payload["member"] = member
+        payload.update(extra)
+        return payload
+
+    def send(self, member: discord.Member, channel: discord.TextChannel, content: str) -> int:
+        """Dispatches a MESSAGE_CREATE from ``member`` and returns the message ID."""
+        author = self.user_payload(member.id, member.name)
+        payload = self.message_payload(
+            channel.id, author, content, guild_id=channel.guild.id,
+            member={"roles": [], "joined_at": _timestamp(), "deaf": False, "mute": False, "flags": 0},
+        )
+        self.state.parse_message_create(payload)
+        return int(payload["id"])
+
+    async def request(self, route, **kwargs) -> typing.Any:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = kwargs.get("json") or {}
+        if kwargs.get("form"):
+            for part in kwargs["form"]:
+                if part.get("name") == "payload_json":
+                    body = json.loads(part["value"])
+        channel_id = route.channel_id
+        if route.method in ("POST", "PATCH") and route.path.endswith(("/messages", "/messages/{message_id}")):
+            bot_user = self.user_payload(self.BOT_ID, "Harmony", bot=True)
+            extra = {"embeds": body.get("embeds") or [], "components": body.get("components") or []}
+            if route.method == "PATCH":
+                extra["id"] = route.url.rsplit("/", 1)[1]
+                return self.message_payload(channel_id, bot_user, body.get("content") or "", **extra)
+            channel = self.bot.get_channel(int(channel_id))
+            payload = self.message_payload(
+                channel_id, bot_user, body.get("content") or "", guild_id=getattr(channel.guild, "id", None), **extra
+            )
+            # Discord echoes the bot's own messages back, which keeps channel.last_message_id current.
+            self.state.parse_message_create(payload)
+            return payload
+        return None
@@ -0,0 +1,96 @@
+"""Times how long a large playlist import takes to start playing and to finish.
+
+    python -m bench.imports [--tracks 500] [--kind spotify|youtube]
+
+One guild runs ``play <playlist URL>`` against the offline stand-ins with
+their default latencies. Reports the time from the command to the first
+track playing, to the whole playlist being queued, and how many Spotify
+pages and Discord requests it took.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from bench.fakes import FakeDiscord, FakeLavalink, FakeSpotify
+from bench.load import Harness, configure_env, wait_for
+
+URLS = {
+    "spotify": "https://open.spotify.com/playlist/bench{tracks}",
+    "youtube": "https://www.youtube.com/playlist?list=PLbench{tracks}",
+}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    lavalink = FakeLavalink(args.lavalink_latency, track_seconds=600)
+    spotify = FakeSpotify(args.spotify_latency)
+    await lavalink.start()
+    await spotify.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_env(directory, lavalink, spotify)
+        import wavelink
+        from main import ID4
+
+        bot = ID4()
+        await bot._async_setup_hook()
+        fake = FakeDiscord(bot, args.discord_latency)
+        await bot.setup_hook()
+        bot._ready.set()
+        cog = bot.get_cog("Music")
+        await wait_for(lambda: any(node.is_connected() for node in wavelink.NodePool._nodes.values()), "Lavalink")
+
+        harness = Harness(bot, fake)
+        guild, channel, member = fake.add_guild(0)
+        await harness.run_command(member, channel, "connect")
+
+        plays, spotify_requests, discord_requests = lavalink.plays, spotify.requests, fake.requests
+        started = time.perf_counter()
+        command = asyncio.ensure_future(
+            harness.run_command(member, channel, "play " + URLS[args.kind].format(tracks=args.tracks))
+        )
+        await wait_for(lambda: lavalink.plays > plays, "first track", timeout=600)
+        first_track = time.perf_counter() - started
+        await command
+        total = time.perf_counter() - started
+        session = cog.sessions.get(guild.id)
+        queued = len(session.queue) + (session.player.source is not None)
+
+        result = {
+            "first_track": first_track,
+            "total": total,
+            "queued": queued,
+            "spotify_requests": spotify.requests - spotify_requests,
+            "discord_requests": fake.requests - discord_requests,
+            "errors": sum(harness.errors.values()),
+        }
+        await bot.close()
+        for node in list(wavelink.NodePool._nodes.values()):
+            await node.cleanup()
+    await lavalink.close()
+    await spotify.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=500)
+    parser.add_argument("--kind", choices=URLS, default="spotify")
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--lavalink-latency", type=float, default=0.03)
+    parser.add_argument("--spotify-latency", type=float, default=0.08)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(
+        f"{result['queued']} tracks queued; first track after {result['first_track']:.2f}s, "
+        f"all after {result['total']:.2f}s"
+    )
+    print(
+        f"{result['spotify_requests']} Spotify requests, {result['discord_requests']} Discord requests, "
+        f"{result['errors']} errors"
+    )
+
+
+if __name__ == "__main__":
+    main()
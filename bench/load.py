@@ -0,0 +1,277 @@
+"""Drives the real Music cog across many simulated guilds, fully offline.
+
+    python -m bench.load [--guilds 20] [--rounds 2] [--baseline bench/baselines/load.json]
+    python -m bench.load --save-baseline bench/baselines/load.json
+
+Each guild has one listener who sends the commands in SCENARIO one after
+another, waiting for each to finish; guilds run concurrently. Discord,
+Lavalink and Spotify are replaced by the stand-ins in bench.fakes. Reports
+throughput, per-command p50/p99 latency, upstream request counts and peak
+RSS. With ``--baseline`` the process exits non-zero if any of them regressed
+past ``--tolerance``, or if the commands run no longer match the baseline's,
+in which case the baseline is stale and has to be re-recorded.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import typing
+
+import discord
+from discord.ext import commands
+
+from bench.fakes import GENRES, FakeDiscord, FakeLavalink, FakeSpotify
+
+# Latencies within this many seconds of the baseline never count as a regression.
+LATENCY_SLACK = 0.005
+
+SCENARIO = (
+    "connect",
+    "play {guild} opening song",
+    "play {guild} second song {round}",
+    "play {guild} third song {round}",
+    "queue",
+    "genre {genre} 10",
+    "similarsongs 5",
+    "history",
+    "playlist save mix{round} {guild} one | {guild} two | {guild} three | {guild} four",
+    "playlist view mix{round}",
+    "playlist play mix{round}",
+    "queue",
+    "nowplaying",
+    "top",
+    "guildstats",
+)
+
+
+def percentile(samples: typing.Sequence[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def configure_env(directory: str, lavalink: FakeLavalink, spotify: FakeSpotify) -> None:
+    # Set before the bot and cog modules are imported, since they read settings at import time.
+    os.environ.update({
+        "PREFIX": "!",
+        "VERSION": "bench",
+        "METRICS_PORT": "",
+        "LAVALINK_NODES": f"127.0.0.1:{lavalink.port}:{lavalink.password}",
+        "SPOTIFY_CLIENT_ID": "bench",
+        "SPOTIFY_CLIENT_SECRET": "bench",
+        "SPOTIFY_API_URL": spotify.api_url,
+        "SPOTIFY_TOKEN_URL": spotify.token_url,
+        "DB_PATH": os.path.join(directory, "harmony.sqlite3"),
+        "LEGACY_DB_PATH": os.path.join(directory, "history.json"),
+        "CACHE_PATH": os.path.join(directory, "cache.sqlite3"),
+        "GENRES_PATH": os.path.join(directory, "genres.json"),
+    })
+
+
+async def wait_for(predicate: typing.Callable[[], bool], what: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Timed out waiting for {what}")
+        await asyncio.sleep(0.05)
+
+
+class Harness:
+    def __init__(self, bot: commands.Bot, discord_fake: FakeDiscord) -> None:
+        self.bot = bot
+        self.discord = discord_fake
+        self.latencies: typing.Dict[str, typing.List[float]] = {}
+        self.errors: typing.Dict[str, int] = {}
+        self._pending: typing.Dict[int, asyncio.Future] = {}
+        bot.add_listener(self._completed, "on_command_completion")
+        bot.add_listener(self._failed, "on_command_error")
+
+    def _finish(self, ctx: commands.Context, error: typing.Optional[Exception]) -> None:
+        future = self._pending.pop(ctx.message.id, None)
+        if future is not None and not future.done():
+            future.set_result(error)
+
+    async def _completed(self, ctx: commands.Context) -> None:
+        self._finish(ctx, None)
+
+    async def _failed(self, ctx: commands.Context, error: Exception) -> None:
+        self._finish(ctx, error)
+
+    async def run_command(self, member: discord.Member, channel: discord.TextChannel, content: str) -> None:
+        name = content.split()[0]
+        if name == "playlist":
+            name = " ".join(content.split()[:2])
+        future = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        message_id = self.discord.send(member, channel, "!" + content)
+        self._pending[message_id] = future
+        try:
+            error = await asyncio.wait_for(future, timeout=60)
+        except asyncio.TimeoutError:
+            error = TimeoutError(content)
+            self._pending.pop(message_id, None)
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if error is not None:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def run_guild(self, index: int, rounds: int) -> None:
+        guild, channel, member = self.discord.add_guild(index)
+        for round_ in range(rounds):
+            for template in SCENARIO:
+                if template == "connect" and round_:
+                    continue
+                content = template.format(guild=f"g{index}", round=round_, genre=GENRES[index % len(GENRES)])
+                await self.run_command(member, channel, content)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    lavalink = FakeLavalink(args.lavalink_latency, track_seconds=args.track_seconds)
+    spotify = FakeSpotify(args.spotify_latency)
+    await lavalink.start()
+    await spotify.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_env(args.data_dir or directory, lavalink, spotify)
+        import wavelink
+        from main import ID4
+
+        bot = ID4()
+        await bot._async_setup_hook()
+        fake = FakeDiscord(bot, args.discord_latency)
+        await bot.setup_hook()
+        bot._ready.set()
+        cog = bot.get_cog("Music")
+        await wait_for(lambda: any(node.is_connected() for node in wavelink.NodePool._nodes.values()), "Lavalink")
+        await wait_for(lambda: len(cog.genres) > 0, "genre seeds")
+
+        harness = Harness(bot, fake)
+        started = time.perf_counter()
+        await asyncio.gather(*(harness.run_guild(index, args.rounds) for index in range(args.guilds)))
+        elapsed = time.perf_counter() - started
+
+        result = {
+            "config": {
+                "guilds": args.guilds,
+                "rounds": args.rounds,
+                "discord_latency": args.discord_latency,
+                "lavalink_latency": args.lavalink_latency,
+                "spotify_latency": args.spotify_latency,
+                "track_seconds": args.track_seconds,
+            },
+            "commands_run": sum(len(samples) for samples in harness.latencies.values()),
+            "elapsed": elapsed,
+            "throughput": sum(len(samples) for samples in harness.latencies.values()) / elapsed,
+            "peak_rss_mb": peak_rss_mb(),
+            "requests": {"discord": fake.requests, "lavalink": lavalink.requests, "spotify": spotify.requests},
+            "commands": {
+                name: {
+                    "count": len(samples),
+                    "errors": harness.errors.get(name, 0),
+                    "p50": percentile(samples, 0.5),
+                    "p99": percentile(samples, 0.99),
+                }
+                for name, samples in sorted(harness.latencies.items())
+            },
+        }
+
+        await bot.close()
+        for node in list(wavelink.NodePool._nodes.values()):
+            await node.cleanup()
+    await lavalink.close()
+    await spotify.close()
+    return result
+
+
+def report(result: dict) -> None:
+    print(
+        f"{result['commands_run']} commands in {result['elapsed']:.2f}s "
+        f"({result['throughput']:.1f}/s), peak RSS {result['peak_rss_mb']:.1f} MiB"
+    )
+    requests = result["requests"]
+    print(f"upstream requests: discord {requests['discord']}, lavalink {requests['lavalink']}, spotify {requests['spotify']}")
+    print(f"{'command':<16} {'count':>6} {'errors':>6} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for name, stats in result["commands"].items():
+        print(f"{name:<16} {stats['count']:>6} {stats['errors']:>6} {stats['p50'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> typing.List[str]:
+    """Returns a line per regression against ``baseline``."""
+    if result["config"] != baseline["config"]:
+        return [f"baseline was recorded with {baseline['config']}, not {result['config']}"]
+    counts = {name: stats["count"] for name, stats in result["commands"].items()}
+    expected_counts = {name: stats["count"] for name, stats in baseline["commands"].items()}
+    if counts != expected_counts:
+        return [f"baseline ran commands {expected_counts}, this run {counts}; re-record it with --save-baseline"]
+
+    regressions = []
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {result['throughput']:.1f}/s < baseline {baseline['throughput']:.1f}/s")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {result['peak_rss_mb']:.1f} MiB > baseline {baseline['peak_rss_mb']:.1f} MiB")
+    for upstream, count in result["requests"].items():
+        expected = baseline["requests"].get(upstream, 0)
+        if count > expected * (1 + tolerance):
+            regressions.append(f"{upstream}: {count} requests > baseline {expected}")
+    for name, stats in result["commands"].items():
+        expected = baseline["commands"][name]
+        if stats["errors"] > expected["errors"]:
+            regressions.append(f"{name}: {stats['errors']} errors, baseline had {expected['errors']}")
+        for key in ("p50", "p99"):
+            if stats[key] > expected[key] * (1 + tolerance) + LATENCY_SLACK:
+                regressions.append(
+                    f"{name}: {key} {stats[key] * 1000:.1f}ms > baseline {expected[key] * 1000:.1f}ms"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--lavalink-latency", type=float, default=0.03)
+    parser.add_argument("--spotify-latency", type=float, default=0.08)
+    parser.add_argument("--track-seconds", type=float, default=5.0, help="wall time before a fake track ends")
+    parser.add_argument("--data-dir", help="keep the databases here instead of a temporary directory")
+    parser.add_argument("--baseline", help="fail if results regressed compared with this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", help="write the results to this file")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as write_file:
+            json.dump(result, write_file, indent=2)
+            write_file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as read_file:
+            regressions = compare(result, json.load(read_file), args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
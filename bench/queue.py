@@ -0,0 +1,100 @@
+"""Times queue operations on TrackQueue against the deque behind wavelink's Queue.
+
+    python -m bench.queue [--size 10000] [--ops 1000]
+
+Every operation runs against a queue already holding ``--size`` tracks.
+``page`` reads the ten tracks a queue page shows and ``duration`` totals
+the queue's length. The deque has no fair mode, so that row is TrackQueue only, with tracks
+spread over 50 requesters.
+"""
+import argparse
+import collections
+import itertools
+import random
+import time
+import typing
+
+from cogs.utils.trackqueue import TrackQueue
+
+
+class Track:
+    __slots__ = ("id", "title", "info")
+
+    def __init__(self, index: int) -> None:
+        self.id = f"track-{index}"
+        self.title = f"Song {index}"
+        self.info = {"length": 180_000 + index % 120 * 1000}
+
+    def is_stream(self) -> bool:
+        return False
+
+
+def timed(operation: typing.Callable[[], None], count: int) -> float:
+    """Microseconds per call."""
+    started = time.perf_counter()
+    operation()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def bench_deque(tracks: typing.List[Track], ops: int, rng: random.Random) -> typing.Dict[str, float]:
+    queue: typing.Deque[Track] = collections.deque()
+    results = {"append": timed(lambda: [queue.append(track) for track in tracks], len(tracks))}
+    results["extend"] = timed(lambda: collections.deque().extend(tracks), len(tracks))
+    positions = [rng.randrange(len(tracks)) for _ in range(ops)]
+    results["insert"] = timed(lambda: [queue.insert(i, tracks[i]) for i in positions], ops)
+    results["remove"] = timed(lambda: [queue.__delitem__(i) for i in positions], ops)
+
+    def move() -> None:
+        for i in positions:
+            track = queue[i]
+            del queue[i]
+            queue.insert(len(queue) - i, track)
+
+    results["move"] = timed(move, ops)
+    results["contains"] = timed(lambda: [any(queued.id == tracks[i].id for queued in queue) for i in positions], ops)
+    results["page"] = timed(lambda: [list(itertools.islice(queue, i, i + 10)) for i in positions], ops)
+    results["duration"] = timed(lambda: [sum(track.info["length"] for track in queue) for _ in range(10)], 10)
+    results["shuffle"] = timed(lambda: random.shuffle(queue), 1)
+    results["pop"] = timed(lambda: [queue.popleft() for _ in range(len(queue))], len(tracks))
+    return results
+
+
+def bench_trackqueue(tracks: typing.List[Track], ops: int, rng: random.Random) -> typing.Dict[str, float]:
+    queue = TrackQueue()
+    results = {"append": timed(lambda: [queue.append(track) for track in tracks], len(tracks))}
+    results["extend"] = timed(lambda: TrackQueue().extend(tracks), len(tracks))
+    positions = [rng.randrange(len(tracks)) for _ in range(ops)]
+    results["insert"] = timed(lambda: [queue.insert(i, tracks[i]) for i in positions], ops)
+    results["remove"] = timed(lambda: [queue.pop(i) for i in positions], ops)
+    results["move"] = timed(lambda: [queue.move(i, len(queue) - 1 - i) for i in positions], ops)
+    results["contains"] = timed(lambda: [tracks[i] in queue for i in positions], ops)
+    results["page"] = timed(lambda: [queue.slice(i, i + 10) for i in positions], ops)
+    results["duration"] = timed(lambda: [queue.duration for _ in range(10)], 10)
+    results["shuffle"] = timed(queue.shuffle, 1)
+    results["pop"] = timed(lambda: [queue.pop() for _ in range(len(queue))], len(tracks))
+
+    fair = TrackQueue(fair=True)
+    results["fair append"] = timed(lambda: [fair.append(track, i % 50) for i, track in enumerate(tracks)], len(tracks))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tracks = [Track(index) for index in range(args.size)]
+    before = bench_deque(tracks, args.ops, random.Random(args.seed))
+    after = bench_trackqueue(tracks, args.ops, random.Random(args.seed))
+
+    print(f"{args.size} tracks, µs per operation (shuffle: per whole queue)")
+    print(f"{'operation':<12} {'deque':>10} {'TrackQueue':>11}")
+    for name, value in after.items():
+        baseline = f"{before[name]:>10.2f}" if name in before else f"{'-':>10}"
+        print(f"{name:<12} {baseline} {value:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
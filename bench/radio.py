@@ -0,0 +1,95 @@
+"""Counts the Discord REST calls guilds make while radio mode plays on its own.
+
+    python -m bench.radio [--guilds 20] [--tracks 5] [--track-seconds 3]
+
+Each guild connects, plays a song and turns radio mode on; after that
+nobody sends a command and radio mode picks every following track. Only
+the requests made during that unattended stretch are counted, so the
+figure is what a guild with the radio on costs per hour, scaled from
+``--track-seconds`` to ``--average-track`` minutes per song.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from bench.fakes import FakeDiscord, FakeLavalink, FakeSpotify
+from bench.load import Harness, configure_env, wait_for
+
+
+async def run(args: argparse.Namespace) -> dict:
+    lavalink = FakeLavalink(0.0, track_seconds=args.track_seconds)
+    spotify = FakeSpotify(0.0)
+    await lavalink.start()
+    await spotify.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_env(directory, lavalink, spotify)
+        import wavelink
+        from main import ID4
+
+        bot = ID4()
+        await bot._async_setup_hook()
+        fake = FakeDiscord(bot, 0.0)
+        await bot.setup_hook()
+        bot._ready.set()
+        cog = bot.get_cog("Music")
+        await wait_for(lambda: any(node.is_connected() for node in wavelink.NodePool._nodes.values()), "Lavalink")
+
+        harness = Harness(bot, fake)
+        guilds = [fake.add_guild(index) for index in range(args.guilds)]
+
+        async def start(index: int) -> None:
+            _, channel, member = guilds[index]
+            for content in ("connect", f"play g{index} radio seed", "radio"):
+                await harness.run_command(member, channel, content)
+
+        await asyncio.gather(*(start(index) for index in range(args.guilds)))
+        # Let anything the commands scheduled settle before counting.
+        await asyncio.sleep(max(args.track_seconds, 3.0))
+        requests, plays = fake.requests, lavalink.plays
+        started = time.perf_counter()
+        await wait_for(
+            lambda: lavalink.plays - plays >= args.guilds * args.tracks, "radio tracks", timeout=args.tracks * 60
+        )
+        await asyncio.sleep(3.0)
+        elapsed = time.perf_counter() - started
+        requests, tracks = fake.requests - requests, lavalink.plays - plays
+
+        panels = getattr(cog, "panels", None)
+        await bot.close()
+        for node in list(wavelink.NodePool._nodes.values()):
+            await node.cleanup()
+    await lavalink.close()
+    await spotify.close()
+
+    per_track = requests / tracks
+    return {
+        "tracks": tracks,
+        "requests": requests,
+        "elapsed": elapsed,
+        "per_track": per_track,
+        "per_guild_hour": per_track * 3600 / (args.average_track * 60),
+        "panels": panels.stats() if panels is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--tracks", type=int, default=5, help="radio tracks to wait for per guild")
+    parser.add_argument("--track-seconds", type=float, default=3.0, help="wall time before a fake track ends")
+    parser.add_argument("--average-track", type=float, default=3.5, help="minutes per real song")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(
+        f"{result['tracks']} radio tracks, {result['requests']} Discord requests "
+        f"({result['per_track']:.2f} per track, ~{result['per_guild_hour']:.1f} per guild-hour)"
+    )
+    if result["panels"] is not None:
+        print("panel: " + ", ".join(f"{name} {value}" for name, value in result["panels"].items()))
+
+
+if __name__ == "__main__":
+    main()
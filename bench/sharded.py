@@ -0,0 +1,91 @@
+"""Measures how command throughput scales with worker processes.
+
+    python -m bench.sharded [--workers 1 2 4] [--guilds 200] [--rounds 1]
+
+For each worker count the guilds are split across that many bench.load
+processes, started together, the way launcher.py splits shards. All of
+them share one data directory, so history, playlists and the resolution
+cache contend on the same SQLite files as in a real deployment. Upstream
+latencies default to zero and rate limits are lifted so the bot's own CPU
+work is what gets measured.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_workers(workers: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            WORKER_COUNT=str(workers),
+            LAVALINK_SEARCH_RATE="1e9",
+            LAVALINK_SEARCH_BURST="1e9",
+            SPOTIFY_RATE="1e9",
+            SPOTIFY_BURST="1e9",
+        )
+        processes = []
+        started = time.perf_counter()
+        for worker in range(workers):
+            guilds = args.guilds // workers + (worker < args.guilds % workers)
+            output = os.path.join(directory, f"worker{worker}.json")
+            command = [
+                sys.executable, "-m", "bench.load",
+                "--guilds", str(guilds),
+                "--rounds", str(args.rounds),
+                "--discord-latency", str(args.latency),
+                "--lavalink-latency", str(args.latency),
+                "--spotify-latency", str(args.latency),
+                "--data-dir", directory,
+                "--save-baseline", output,
+            ]
+            processes.append((output, subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)))
+        for _, process in processes:
+            if process.wait():
+                raise RuntimeError(f"bench.load exited with {process.returncode}")
+        wall = time.perf_counter() - started
+
+        results = []
+        for output, _ in processes:
+            with open(output, "r", encoding="utf-8") as read_file:
+                results.append(json.load(read_file))
+
+    commands = sum(result["commands_run"] for result in results)
+    # Workers start at slightly different times, so use the slowest one's command phase.
+    elapsed = max(result["elapsed"] for result in results)
+    return {
+        "workers": workers,
+        "commands": commands,
+        "elapsed": elapsed,
+        "throughput": commands / elapsed,
+        "errors": sum(stats["errors"] for result in results for stats in result["commands"].values()),
+        "wall": wall,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of every stand-in")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s)")
+    print(f"{'workers':>7} {'commands':>9} {'elapsed (s)':>12} {'cmd/s':>8} {'speedup':>8} {'errors':>7}")
+    base = None
+    for workers in args.workers:
+        result = run_workers(workers, args)
+        base = base or result["throughput"]
+        print(
+            f"{workers:>7} {result['commands']:>9} {result['elapsed']:>12.2f} "
+            f"{result['throughput']:>8.1f} {result['throughput'] / base:>7.2f}x {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compares the gateway cache built at startup under two intent/member-cache settings.
+
+    python -m bench.startup_memory [--guilds 1000] [--members 200] [--in-voice 3]
+
+Synthetic GUILD_CREATE payloads are parsed into a client's cache the way
+the gateway would deliver them under each setting. With the members and
+presences intents every member arrives with a presence. Without them
+Discord only sends the members that are in voice. Each setting runs in
+its own subprocess so the peak RSS figures don't bleed into each other.
+"""
+import argparse
+import datetime
+import gc
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import discord
+
+from main import build_intents, build_member_cache
+
+SETTINGS = {
+    "before": ("all", "all"),
+    "after": ("guilds,voice_states,guild_messages,message_content", "voice"),
+}
+
+JOINED_AT = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc).isoformat()
+
+
+def guild_payload(guild_id: int, members: int, in_voice: int, intents: discord.Intents) -> dict:
+    voice_id = guild_id + 1
+    member_ids = [guild_id * 10_000 + i for i in range(members)]
+
+    def member(user_id: int) -> dict:
+        return {
+            "user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None},
+            "roles": [],
+            "joined_at": JOINED_AT,
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+
+    voice_states = [
+        {"user_id": str(user_id), "channel_id": str(voice_id), "session_id": f"s{user_id}", "deaf": False,
+         "mute": False, "self_deaf": False, "self_mute": False, "self_video": False, "suppress": False,
+         "request_to_speak_timestamp": None, "member": member(user_id)}
+        for user_id in member_ids[:in_voice]
+    ]
+    data = {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id}",
+        "owner_id": str(member_ids[0]),
+        "member_count": members,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [
+            {"id": str(guild_id + 2), "type": 0, "name": "general", "position": 0, "permission_overwrites": []},
+            {"id": str(voice_id), "type": 2, "name": "Music", "position": 1, "permission_overwrites": [],
+             "bitrate": 64000, "user_limit": 0},
+        ],
+        "voice_states": voice_states,
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+    }
+    # Without the members intent Discord only includes members that are in voice.
+    data["members"] = [member(user_id) for user_id in (member_ids if intents.members else member_ids[:in_voice])]
+    if intents.presences:
+        data["presences"] = [
+            {"user": {"id": str(user_id)}, "status": "online", "activities": [], "client_status": {"desktop": "online"}}
+            for user_id in member_ids
+        ]
+    return data
+
+
+def measure(setting: str, guilds: int, members: int, in_voice: int) -> dict:
+    intents_spec, member_cache = SETTINGS[setting]
+    intents = build_intents(intents_spec)
+    client = discord.Client(
+        intents=intents,
+        member_cache_flags=build_member_cache(member_cache, intents),
+        chunk_guilds_at_startup=False,
+    )
+    state = client._connection
+    state.user = discord.ClientUser(
+        state=state, data={"id": "1", "username": "Harmony", "discriminator": "0", "avatar": None, "bot": True}
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(guilds):
+        data = guild_payload((i + 1) * 1_000_000, members, in_voice, intents)
+        state._add_guild(discord.Guild(data=data, state=state))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "setting": setting,
+        "cached_members": sum(len(guild._members) for guild in client.guilds),
+        "cache_mb": current / (1024 * 1024),
+        "parse_seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--in-voice", type=int, default=3)
+    parser.add_argument("--setting", choices=SETTINGS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setting:
+        print(json.dumps(measure(args.setting, args.guilds, args.members, args.in_voice)))
+        return
+
+    print(f"{'setting':<8} {'members':>9} {'cache (MiB)':>12} {'parse (s)':>10} {'peak RSS (MiB)':>15}")
+    for setting in SETTINGS:
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.startup_memory", "--setting", setting,
+             "--guilds", str(args.guilds), "--members", str(args.members), "--in-voice", str(args.in_voice)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(
+            f"{setting:<8} {result['cached_members']:>9} {result['cache_mb']:>12.1f} "
+            f"{result['parse_seconds']:>10.2f} {result['peak_rss_mb']:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measures the cost of a single history insert as the table grows.
+
+    python -m bench.storage_insert [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from cogs.utils.storage import HistoryRecord, Storage
+
+SAMPLES = 1000
+
+
+def record(i: int) -> HistoryRecord:
+    return HistoryRecord(
+        guild_id=i % 500,
+        user_id=i % 20_000,
+        requestor=f"user{i % 20_000}",
+        song_name=f"Artist {i % 3000} - Song {i}",
+        song_url=f"https://www.youtube.com/watch?v={i:011d}",
+        played_at=1_700_000_000 + i,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = Storage(os.path.join(directory, "bench.sqlite3"))
+        rows = 0
+        print(f"{'rows':>10} {'insert (us)':>12}")
+        for size in sorted(args.sizes):
+            # Bulk fill up to the target size, then time single-row appends.
+            batch = 50_000
+            while rows < size:
+                count = min(batch, size - rows)
+                storage._add_history([record(rows + i) for i in range(count)])
+                rows += count
+
+            start = time.perf_counter()
+            for i in range(SAMPLES):
+                storage._add_history([record(rows + i)])
+            elapsed = time.perf_counter() - start
+            rows += SAMPLES
+            print(f"{size:>10} {elapsed / SAMPLES * 1e6:>12.1f}")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
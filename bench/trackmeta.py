@@ -0,0 +1,108 @@
+"""Measures what building the ``nowplaying`` embed costs per command.
+
+    python -m bench.trackmeta [--guilds 500] [--tracks 50] [--commands 20000]
+
+``--guilds`` guilds play tracks drawn from ``--tracks`` popular ones and
+ask for ``nowplaying`` at random positions. The old way formats every
+string from ``track.info`` on each command; the new one reuses the
+interned TrackMeta and only formats the position. Reports microseconds
+and bytes allocated per command, and the memory held by one embed per
+guild, as if each guild's last reply were still around.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import typing
+
+import discord
+import wavelink
+
+from cogs.utils.trackmeta import TrackMetaCache
+
+
+def make_track(index: int) -> wavelink.YouTubeTrack:
+    info = {
+        "identifier": f"video{index:06d}",
+        "isSeekable": True,
+        "author": f"Artist {index}",
+        "length": 150_000 + index * 7_000,
+        "isStream": False,
+        "position": 0,
+        "title": f"Artist {index} - Popular Song {index} (Official Video)",
+        "uri": f"https://www.youtube.com/watch?v=video{index:06d}",
+        "sourceName": "youtube",
+    }
+    return wavelink.YouTubeTrack(f"encoded-{index}", info)
+
+
+def legacy_embed(track: wavelink.Track, position: float) -> discord.Embed:
+    """The nowplaying embed as it used to be built, on every command."""
+    info = track.info
+    duration = time.strftime("%M:%S", time.gmtime(info["length"]))
+    cur_pos = time.strftime("%M:%S", time.gmtime(position))
+    embed = discord.Embed(title="Now Playing", color=discord.Colour.yellow())
+    embed.add_field(name=info["title"], value=" ", inline=False)
+    embed.add_field(name="Uploader", value=info["author"], inline=True)
+    embed.add_field(name="Time", value=f"{cur_pos}/{duration}", inline=True)
+    embed.add_field(name="Source", value=info["sourceName"].upper(), inline=True)
+    embed.add_field(name="URL", value=f'[{info["title"]}]({info["uri"]})', inline=False)
+    embed.set_footer(text="Harmony")
+    return embed
+
+
+def measure(
+    build: typing.Callable[[wavelink.Track, float], discord.Embed],
+    requests: typing.List[typing.Tuple[wavelink.Track, float]],
+    guilds: int,
+) -> typing.Dict[str, float]:
+    started = time.perf_counter()
+    for track, position in requests:
+        build(track, position)
+    elapsed = time.perf_counter() - started
+
+    # Every embed is kept until the end, so the traced memory growth is everything the commands allocated.
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    kept = [build(track, position) for track, position in requests]
+    current, _ = tracemalloc.get_traced_memory()
+    held = kept[-guilds:]
+    del kept
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "us": elapsed / len(requests) * 1e6,
+        "bytes": (current - baseline) / len(requests),
+        "held": (retained - baseline) / 1024,
+        "embeds": len(held),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--tracks", type=int, default=50)
+    parser.add_argument("--commands", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tracks = [make_track(index) for index in range(args.tracks)]
+    requests = []
+    for _ in range(args.commands):
+        track = tracks[int(rng.paretovariate(1.5)) % len(tracks)]
+        requests.append((track, rng.random() * track.duration))
+
+    cache = TrackMetaCache()
+    before = measure(legacy_embed, requests, args.guilds)
+    after = measure(lambda track, position: cache.get(track).now_playing(position), requests, args.guilds)
+
+    print(f"{args.commands} nowplaying commands over {args.tracks} tracks")
+    print(f"{'':<10} {'us/command':>11} {'bytes/command':>14} {f'KiB for {args.guilds} embeds':>20}")
+    for name, result in (("before", before), ("after", after)):
+        print(f"{name:<10} {result['us']:>11.2f} {result['bytes']:>14.0f} {result['held']:>20.1f}")
+    print(f"TrackMeta records: {len(cache)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import asyncio
+import datetime
 import os
 import time
 import typing
 import random
-import json
 
 import wavelink
 
@@ -11,78 +11,482 @@ import discord
 import wavelink
 from wavelink.ext import spotify
 from discord.ext import commands
-
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-
-from tinydb import TinyDB, Query
+from loguru import logger
+
+from cogs.utils import cache
+from cogs.utils.genres import GenreCatalog
+from cogs.utils.history import HistoryBuffer
+from cogs.utils.idle import IdleManager
+from cogs.utils.imports import ImportJob, Importer, ImportSource, parse_source
+from cogs.utils.listening import PERIODS, ListeningStats
+from cogs.utils.nodes import NodeManager, parse_nodes
+from cogs.utils.paginator import Paginator
+from cogs.utils.panel import PanelManager
+from cogs.utils.persistence import SessionSnapshotter
+from cogs.utils.prefetch import RadioPrefetcher
+from cogs.utils.recommendations import MAX_SEEDS, RecommendationEngine
+from cogs.utils.resolver import BatchResolver
+from cogs.utils.scheduler import Priority, Scheduler, priority
+from cogs.utils.session import GuildSession, SessionRegistry
+from cogs.utils.spotify import SPOTIFY_API_URL, SPOTIFY_TOKEN_URL, AsyncSpotify
+from cogs.utils.storage import HistoryRecord, PlaylistEntry, SessionSnapshot, Storage
+from cogs.utils.trackmeta import TrackMetaCache, format_duration
+from cogs.utils.writebehind import HistoryWriter
 
 LAVALINK_PASS = os.getenv("LAVALINK_PASS")
 LAVALINK_PORT = os.getenv("LAVALINK_PORT")
 LAVALINK_ADDRESS = os.getenv("LAVALINK_ADDRESS")
+# Comma-separated host:port:password entries; falls back to the single node above.
+LAVALINK_NODES = os.getenv("LAVALINK_NODES") or (
+    f"{LAVALINK_ADDRESS}:{LAVALINK_PORT}:{LAVALINK_PASS}" if LAVALINK_ADDRESS else ""
+)
 CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
+# "aiohttp" (default) or "thread" to run spotipy off the event loop instead.
+SPOTIFY_TRANSPORT = os.getenv("SPOTIFY_TRANSPORT", "aiohttp")
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", SPOTIFY_API_URL)
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", SPOTIFY_TOKEN_URL)
+RESOLVE_CONCURRENCY = int(os.getenv("RESOLVE_CONCURRENCY", 5))
+RADIO_LOOKAHEAD = int(os.getenv("RADIO_LOOKAHEAD", 3))
+RECOMMENDATION_BATCH_SIZE = int(os.getenv("RECOMMENDATION_BATCH_SIZE", 100))
+DB_PATH = os.getenv("DB_PATH", "cogs/db/harmony.sqlite3")
+LEGACY_DB_PATH = os.getenv("LEGACY_DB_PATH", "cogs/db/history.json")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 100))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 2.0))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", 10_000))
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", 500))
+HISTORY_PAGE_SIZE = 10
+QUEUE_PAGE_SIZE = 10
+# Songs and requesters counted per guild, user and day by the top commands; rarer ones are approximate.
+STATS_TOP_CAPACITY = int(os.getenv("STATS_TOP_CAPACITY", 500))
+STATS_RETENTION_DAYS = int(os.getenv("STATS_RETENTION_DAYS", 30))
+TOP_LIMIT = 10
+GENRES_PATH = os.getenv("GENRES_PATH", "cogs/db/genres.json")
+GENRES_REFRESH_INTERVAL = float(os.getenv("GENRES_REFRESH_INTERVAL", 24 * 3600))
+# Rate limits are for the whole deployment; launcher.py sets WORKER_COUNT so each process takes its share.
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", 1))
+SPOTIFY_RATE = float(os.getenv("SPOTIFY_RATE", 10))
+SPOTIFY_BURST = float(os.getenv("SPOTIFY_BURST", 20))
+LAVALINK_SEARCH_RATE = float(os.getenv("LAVALINK_SEARCH_RATE", 20))
+LAVALINK_SEARCH_BURST = float(os.getenv("LAVALINK_SEARCH_BURST", 40))
+# Seconds before leaving a channel with no listeners, and a player left paused or with nothing to play.
+IDLE_ALONE_TIMEOUT = float(os.getenv("IDLE_ALONE_TIMEOUT", 60))
+IDLE_INACTIVE_TIMEOUT = float(os.getenv("IDLE_INACTIVE_TIMEOUT", 300))
+PANEL_DEBOUNCE = float(os.getenv("PANEL_DEBOUNCE", 2.0))
+# Messages that may pile up below the now playing panel before it is moved back to the bottom.
+PANEL_REPOST_AFTER = int(os.getenv("PANEL_REPOST_AFTER", 5))
+# Seconds between progress bar refreshes on the now playing panel; 0 leaves the bar out.
+PANEL_PROGRESS_INTERVAL = float(os.getenv("PANEL_PROGRESS_INTERVAL", 0))
+# Whether new sessions queue tracks round-robin by requester; the fair command toggles it per guild.
+FAIR_QUEUE = os.getenv("FAIR_QUEUE", "").lower() in ("1", "true", "yes", "on")
+# Minimum seconds between edits of a playlist import's progress message.
+IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", 2.0))
+SESSION_SNAPSHOT_INTERVAL = float(os.getenv("SESSION_SNAPSHOT_INTERVAL", 10.0))
+SESSION_RESTORE_CONCURRENCY = int(os.getenv("SESSION_RESTORE_CONCURRENCY", 10))
+CACHE_PATH = os.getenv("CACHE_PATH", "cogs/db/cache.sqlite3")
+CACHE_TTL = float(os.getenv("CACHE_TTL", 7 * 24 * 3600))
+# Tracks whose formatted metadata is kept for nowplaying and the panel, shared by every guild.
+TRACK_META_CACHE_SIZE = int(os.getenv("TRACK_META_CACHE_SIZE", 2000))
+
+
+class CachedTrack(commands.Converter):
+    """Like the ``wavelink.YouTubeTrack`` converter, but goes through the cog's resolution cache.
+
+    Playlist and album URLs are returned as an :class:`ImportSource` for the
+    command to stream instead.
+    """
+
+    async def convert(self, ctx: commands.Context, argument: str) -> typing.Union[wavelink.YouTubeTrack, ImportSource]:
+        source = parse_source(argument)
+        if source is not None:
+            return source
+        track = await ctx.cog.search_track(argument)
+        if track is None:
+            raise commands.BadArgument("Could not find any songs matching that query.")
+        return track
+
+
+def stats_period(argument: str) -> str:
+    period = argument.lower()
+    if period not in PERIODS:
+        raise commands.BadArgument(f"Period must be one of: {', '.join(PERIODS)}.")
+    return period
 
-client_credentials_manager = SpotifyClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET)
-sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
 
 class Music(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot: commands.Bot = bot
-        self.db = TinyDB('cogs/db/history.json')
+        self.metrics = bot.metrics
+        self.db = Storage(DB_PATH, observer=self.metrics.observe_upstream)
+        self.history_writer = HistoryWriter(
+            self.db,
+            batch_size=HISTORY_BATCH_SIZE,
+            interval=HISTORY_FLUSH_INTERVAL,
+            max_pending=HISTORY_MAX_PENDING,
+        )
+        self.recent = HistoryBuffer(HISTORY_BUFFER_SIZE)
+        self.listening = ListeningStats(capacity=STATS_TOP_CAPACITY, retention_days=STATS_RETENTION_DAYS)
+        self.listening_rebuild: typing.Optional[asyncio.Task] = None
+        self.scheduler = Scheduler(observer=self.metrics.observe_upstream)
+        self.scheduler.add_upstream(
+            "spotify", rate=SPOTIFY_RATE / WORKER_COUNT, burst=max(SPOTIFY_BURST / WORKER_COUNT, 1)
+        )
+        self.scheduler.add_upstream(
+            "lavalink", rate=LAVALINK_SEARCH_RATE / WORKER_COUNT, burst=max(LAVALINK_SEARCH_BURST / WORKER_COUNT, 1)
+        )
+        self.spotify = AsyncSpotify(
+            CLIENT_ID,
+            CLIENT_SECRET,
+            api_url=SPOTIFY_API_URL,
+            token_url=SPOTIFY_TOKEN_URL,
+            use_threads=SPOTIFY_TRANSPORT == "thread",
+            scheduler=self.scheduler,
+        )
+        self.cache = cache.ResolutionCache(CACHE_PATH, ttl=CACHE_TTL)
+        self.genres = GenreCatalog(GENRES_PATH, self.fetch_genres, refresh_interval=GENRES_REFRESH_INTERVAL)
+        self.resolver = BatchResolver(limit=RESOLVE_CONCURRENCY, search=self.search_track)
+        self.importer = Importer(self.spotify, self.resolver, self.load_youtube_playlist)
+        self.sessions = SessionRegistry(fair=FAIR_QUEUE)
+        self.track_meta = TrackMetaCache(TRACK_META_CACHE_SIZE)
+        self.panels = PanelManager(
+            debounce=PANEL_DEBOUNCE,
+            repost_after=PANEL_REPOST_AFTER,
+            progress_interval=PANEL_PROGRESS_INTERVAL,
+            track_meta=self.track_meta,
+        )
+        self.snapshotter = SessionSnapshotter(self.db, self.sessions, interval=SESSION_SNAPSHOT_INTERVAL)
+        self.idle = IdleManager(
+            self.idle_disconnect, alone_timeout=IDLE_ALONE_TIMEOUT, inactive_timeout=IDLE_INACTIVE_TIMEOUT
+        )
+        self.recommender = RecommendationEngine(
+            self.spotify, self.spotify_track_id, batch_size=RECOMMENDATION_BATCH_SIZE
+        )
+        self.prefetcher = RadioPrefetcher(self.radio_recommendations, self.resolver, lookahead=RADIO_LOOKAHEAD)
+        self.nodes = NodeManager(
+            bot,
+            parse_nodes(LAVALINK_NODES),
+            spotify_client=spotify.SpotifyClient(
+                client_id=os.getenv("spotifyClientId"),
+                client_secret=os.getenv("spotifyClientSecret"),
+            ),
+        )
+        # Nodes that have been ready before; a second ready event means the node reconnected.
+        self.ready_nodes: typing.Set[str] = set()
         bot.loop.create_task(self.connect_nodes())
 
+    async def cog_load(self) -> None:
+        await self.db.migrate_tinydb(LEGACY_DB_PATH)
+        # Only this process's guilds: the other shards' workers load their own.
+        shards = {"shard_ids": self.bot.shard_ids, "shard_count": self.bot.shard_count or 1}
+        self.recent.load(await self.db.recent_history_by_guild(HISTORY_BUFFER_SIZE, **shards))
+        self.history_writer.start()
+        self.listening_rebuild = self.bot.loop.create_task(
+            self.listening.rebuild(self.db, writer=self.history_writer, **shards)
+        )
+        await self.genres.start()
+        self.snapshotter.start()
+        self.metrics.register(self.collect_metrics)
+
+    async def cog_unload(self) -> None:
+        self.metrics.unregister(self.collect_metrics)
+        # Flushed first, so a failure in any later step can't lose queued history.
+        await self.history_writer.close()
+        try:
+            # Runs before the players are torn down so the final snapshot sees them.
+            await self.snapshotter.close()
+            if self.listening_rebuild is not None:
+                self.listening_rebuild.cancel()
+            await self.nodes.close()
+            await self.scheduler.close()
+            await self.genres.close()
+            await self.spotify.close()
+            self.cache.close()
+        finally:
+            self.db.close()
+
+    def collect_metrics(self):
+        yield "active_players", {}, sum(1 for session in self.sessions if session.player.is_playing())
+        yield "sessions", {}, len(self.sessions)
+        for session in self.sessions:
+            yield "queue_length", {"guild": session.guild_id}, len(session.queue)
+            yield "prefetch_buffer", {"guild": session.guild_id}, len(session.prefetch)
+        for name, upstream in self.scheduler.stats().items():
+            yield "upstream_queue_depth", {"upstream": name}, upstream["depth"]
+            yield "upstream_coalesced", {"upstream": name}, upstream["coalesced"]
+            yield "upstream_retries", {"upstream": name}, upstream["retries"]
+            for lane, lane_stats in upstream["lanes"].items():
+                labels = {"upstream": name, "lane": lane}
+                yield "upstream_wait_avg_seconds", labels, lane_stats["wait_avg"]
+                yield "upstream_wait_max_seconds", labels, lane_stats["wait_max"]
+        for reason, count in self.idle.disconnected.items():
+            yield "idle_disconnects", {"reason": reason}, count
+        for name, value in self.cache.stats().items():
+            yield "resolution_cache", {"stat": name}, value
+        for name, value in self.history_writer.stats().items():
+            yield "history_writer", {"stat": name}, value
+        for name, value in self.listening.stats().items():
+            yield "listening_stats", {"stat": name}, value
+        for name, value in self.snapshotter.stats().items():
+            yield "session_snapshots", {"stat": name}, value
+        for name, value in self.panels.stats().items():
+            yield "now_playing_panel", {"stat": name}, value
+        for name, value in self.track_meta.stats().items():
+            yield "track_meta_cache", {"stat": name}, value
+        for node in wavelink.NodePool._nodes.values():
+            yield "lavalink_players", {"node": node.identifier}, len(node.players)
+            if node.stats is not None:
+                yield "lavalink_penalty", {"node": node.identifier}, node.penalty
+            yield "lavalink_connected", {"node": node.identifier}, int(node.is_connected())
+
     async def connect_nodes(self) -> None:
         await self.bot.wait_until_ready()
 
-        await wavelink.NodePool.create_node(
-            bot=self.bot,
-            host=LAVALINK_ADDRESS,
-            port=LAVALINK_PORT,
-            password=LAVALINK_PASS,
-            spotify_client=spotify.SpotifyClient(
-                client_id=os.getenv("spotifyClientId"),
-                client_secret=os.getenv("spotifyClientSecret"),
-            ),
+        await self.nodes.connect()
+        await self.snapshotter.restore(
+            self.restore_session,
+            owned=lambda guild_id: self.bot.get_guild(guild_id) is not None,
+            limit=SESSION_RESTORE_CONCURRENCY,
+        )
+
+    async def restore_session(self, snapshot: SessionSnapshot) -> bool:
+        """Rejoins the voice channel in ``snapshot`` and replays its tracks from their stored IDs.
+
+        Returns ``False`` if there is nobody left to listen or the guild
+        already has a player again.
+        """
+        guild = self.bot.get_guild(snapshot.guild_id)
+        channel = guild.get_channel(snapshot.channel_id)
+        if not isinstance(channel, discord.VoiceChannel) or guild.voice_client is not None:
+            return False
+        if not any(not member.bot for member in channel.members):
+            return False
+
+        player = await channel.connect(cls=self.nodes.new_player())
+        text_channel = guild.get_channel(snapshot.text_channel_id) if snapshot.text_channel_id else None
+        session = self.sessions.create(guild.id, player, text_channel)
+        session.loop = snapshot.loop
+        session.radio_mode = snapshot.radio_mode
+        current, *queued = (wavelink.YouTubeTrack(track_id, info) for track_id, info in snapshot.tracks)
+        session.queue.extend(queued)
+        await player.play(current, start=int(snapshot.position * 1000), pause=snapshot.paused)
+        self.idle.watch(session, channel)
+        if session.radio_mode:
+            self.prefetcher.wake(session)
+        self.panels.touch(session, "Resumed after a restart")
+        return True
+
+    async def search_track(self, query: str) -> typing.Optional[wavelink.YouTubeTrack]:
+        payload = await self.cache.get(cache.TRACKS, query)
+        if payload is not None:
+            return wavelink.YouTubeTrack(payload["id"], payload["info"])
+
+        tracks = await self.scheduler.submit(
+            "lavalink",
+            lambda: wavelink.YouTubeTrack.search(query=query, node=self.nodes.best_node()),
+            key=(cache.TRACKS, cache.normalize(query)),
+        )
+        if not tracks:
+            return None
+        track = tracks[0]
+        await self.cache.set(cache.TRACKS, query, {"id": track.id, "info": track.info})
+        return track
+
+    async def load_youtube_playlist(self, url: str) -> typing.Optional[wavelink.YouTubePlaylist]:
+        return await self.scheduler.submit(
+            "lavalink",
+            lambda: self.nodes.best_node().get_playlist(wavelink.YouTubePlaylist, url),
+            key=("playlist", url),
         )
 
+    async def fetch_genres(self) -> typing.List[str]:
+        with priority(Priority.BACKGROUND):
+            return (await self.spotify.recommendation_genre_seeds()).get('genres', [])
+
+    async def spotify_track_id(self, query: str) -> typing.Optional[str]:
+        song_id = await self.cache.get(cache.SPOTIFY_IDS, query)
+        if song_id is not None:
+            return song_id
+
+        items = (await self.spotify.search(q=query, limit=1))['tracks']['items']
+        if not items:
+            return None
+        song_id = items[0]['id']
+        await self.cache.set(cache.SPOTIFY_IDS, query, song_id)
+        return song_id
+
+    async def radio_recommendations(
+        self, session: GuildSession, count: int, ended: typing.Optional[wavelink.Track] = None
+    ) -> typing.List[str]:
+        # Seed from the newest track we know of so successive batches keep drifting forward.
+        # On track end the player has already cleared its source, leaving only the track that ended.
+        seed = session.prefetch[-1] if session.prefetch else session.player.source or ended
+        if seed is None:
+            return []
+        seeds, recent_titles = self.recommendation_seeds(session.guild_id, seed.title)
+        return await self.recommender.take(session, count, seeds, recent_titles)
+
+    def recommendation_seeds(self, guild_id: int, title: str) -> typing.Tuple[typing.List[str], typing.List[str]]:
+        """Seed titles (``title`` first, then recent history) and recently played titles to skip."""
+        recent_titles = [record.song_name for record in self.recent.recent(guild_id, 50)]
+        seeds = [title] + [name for name in recent_titles[:MAX_SEEDS * 2] if name != title]
+        return seeds, recent_titles
+
+    async def ensure_session(self, ctx) -> typing.Optional[GuildSession]:
+        """Returns the guild's session, connecting to the author's channel first if needed."""
+        session = self.sessions.get(ctx.guild.id)
+        if session is None or not session.player.is_connected():
+            if not ctx.author.voice or not ctx.author.voice.channel:
+                await ctx.send("You are not connected to any voice channel!")
+                return None
+            await self.connect(ctx, channel=ctx.author.voice.channel)
+            session = self.sessions.get(ctx.guild.id)
+        if session is not None:
+            session.text_channel = ctx.channel
+        return session
+
+    async def enqueue_bulk(
+        self, session: GuildSession, queries, requester: typing.Optional[int] = None
+    ) -> typing.Tuple[int, typing.List[str]]:
+        """Resolves ``queries`` concurrently and queues them in order.
+
+        Playback starts with the first track that resolves if nothing is
+        playing. Tracks that are already queued are skipped. Returns the
+        number of tracks added and the failed queries.
+        """
+        added = 0
+        failed = []
+        with priority(Priority.BULK):
+            async for result in self.resolver.stream(queries):
+                if result.track is None:
+                    failed.append(result.query)
+                    continue
+                if not session.player.is_playing():
+                    await session.player.play(result.track)
+                elif result.track in session.queue:
+                    continue
+                else:
+                    session.queue.append(result.track, requester)
+                added += 1
+        return added, failed
+
+    @staticmethod
+    def import_embed(job: ImportJob, done: bool = False) -> discord.Embed:
+        total = f"/{job.total}" if job.total is not None else ""
+        if job.error is not None:
+            title = f"⚠️ | Could not finish importing the {job.source.kind}"
+        else:
+            title = f"📥 | {'Imported' if done else 'Importing'} {job.source.kind}"
+        embed = discord.Embed(title=title, description=f"{job.added}{total} songs queued", colour=discord.Colour.yellow())
+        if job.error is not None:
+            embed.add_field(name="Error", value=job.error, inline=False)
+        if job.failed:
+            embed.set_footer(text=f"{job.failed} songs could not be found")
+        return embed
+
+    async def import_source(self, ctx, session: GuildSession, source: ImportSource) -> None:
+        """Streams a playlist or album into the queue, reporting progress in one edited message.
+
+        Playback starts as soon as the first track resolves.
+        """
+        job = ImportJob(source)
+        message = await ctx.send(embed=self.import_embed(job))
+        last_edit = time.monotonic()
+        with priority(Priority.BULK):
+            async for result in self.importer.stream(job):
+                if result.track is None:
+                    job.failed += 1
+                elif not session.player.is_playing():
+                    await session.player.play(result.track)
+                    job.added += 1
+                    self.panels.touch(session)
+                else:
+                    session.queue.append(result.track, ctx.author.id)
+                    job.added += 1
+                if time.monotonic() - last_edit >= IMPORT_PROGRESS_INTERVAL:
+                    message = await message.edit(embed=self.import_embed(job))
+                    last_edit = time.monotonic()
+        await message.edit(embed=self.import_embed(job, done=True))
+        if job.added:
+            self.panels.touch(session, self.added_status(ctx, f"{job.added} songs from a {source.kind}"))
+
+    async def idle_disconnect(self, session: GuildSession, reason: str) -> None:
+        if self.sessions.get(session.guild_id) is not session:
+            return
+        try:
+            await session.player.disconnect()
+        except Exception as e:
+            logger.warning(f"Idle disconnect failed for guild {session.guild_id}: {e}")
+        self.sessions.drop(session.guild_id)
+        if session.text_channel is not None:
+            why = "everyone left" if reason == "alone" else "nothing was playing"
+            await session.text_channel.send(f"🔌 | Left the voice channel because {why}.")
+
+    @staticmethod
+    def added_status(ctx: commands.Context, what: str, failed: typing.Sequence[str] = ()) -> str:
+        """Status line for the now playing panel after ``ctx.author`` queued ``what``."""
+        status = f"🎶 {ctx.author.display_name} added {what}"
+        if failed:
+            status += f" ({len(failed)} not found)"
+        return status
+
+    async def cog_after_invoke(self, ctx: commands.Context) -> None:
+        session = self.sessions.get(ctx.guild.id) if ctx.guild else None
+        if session is not None:
+            self.idle.update(session)
+            self.panels.touch(session)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        session = self.sessions.get(message.guild.id) if message.guild else None
+        if session is not None:
+            self.panels.message_created(session, message)
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        if not member.guild.voice_client:
+        if member.id == self.bot.user.id:
+            if after.channel is None:
+                self.sessions.drop(member.guild.id)
+            elif before.channel != after.channel:
+                session = self.sessions.get(member.guild.id)
+                if session is not None:
+                    self.idle.watch(session, after.channel)
             return
-        
-        if member.guild == member.guild.voice_client.guild:
-            if len(member.guild.voice_client.channel.members) == 1:
-                await member.guild.voice_client.disconnect()
+
+        session = self.sessions.get(member.guild.id)
+        if session is not None:
+            self.idle.member_moved(session, member, before.channel, after.channel)
 
     @commands.Cog.listener()
     async def on_wavelink_node_ready(self, node: wavelink.Node):
-        print(f"Node {node.identifier} is ready.")
+        logger.info(f"Node {node.identifier} is ready.")
+        if node.identifier not in self.ready_nodes:
+            self.ready_nodes.add(node.identifier)
+            return
+        # Lavalink lost its players when it went away; replay each one where it left off.
+        for player in list(node.players):
+            try:
+                await self.nodes.move_player(player, node)
+            except Exception as e:
+                logger.error(f"Failed to resume player for guild {player.guild.id} on {node.identifier}: {e}")
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(
         self, player: wavelink.Player, track: wavelink.Track, reason):
-        try:
-            ctx = player.ctx
-        except AttributeError as e:
-            ctx.send(f"An error occured: {e}")
-        
-
-        vc = ctx.voice_client
-
-        if vc.loop:
-            return await vc.play(track)
-        try:
-            next_song = vc.queue.get()
-        except wavelink.errors.QueueEmpty as e:
+        session = self.sessions.get(player.guild.id)
+        if session is None:
             return
-        await vc.play(next_song)
-        mbed = discord.Embed(
-            title=f"▶️ | Now playing {next_song}...",
-            description=f"**[{next_song.title}]({next_song.uri})**",
-            colour=discord.Colour.yellow(),
-        )
-        await ctx.send(embed=mbed)
+
+        if session.loop:
+            return await player.play(track)
+        if session.queue:
+            next_song = session.queue.pop()
+        else:
+            next_song = await self.prefetcher.next(session, track) if session.radio_mode else None
+            if next_song is None:
+                return self.idle.update(session)
+        await player.play(next_song)
+        self.idle.update(session)
+        self.panels.touch(session)
 
     @commands.command(
         name="connect",
@@ -100,13 +504,15 @@ class Music(commands.Cog):
                     "No voice channel to connect to. Please either provide one or join one."
                 )
 
-        self.node = wavelink.NodePool.get_node()
-        self.player = self.node.get_player(ctx.guild)
-
-        if self.player is not None and self.player.is_connected():
-            await self.player.move_to(ctx.author.voice.channel)
-
-        await channel.connect(cls=wavelink.Player)
+        player: wavelink.Player = ctx.voice_client
+        if player is not None and player.is_connected():
+            await player.move_to(channel)
+        else:
+            player = await channel.connect(cls=self.nodes.new_player())
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:
+            session = self.sessions.create(ctx.guild.id, player, ctx.channel)
+        self.idle.watch(session, channel)
 
         mbed = discord.Embed(
             title=f"🔗 | Connected to {channel.name}.",
@@ -123,40 +529,19 @@ class Music(commands.Cog):
         help="Gives a list of similar songs to the one you specify.",
     )
     async def similarsongs(self, ctx, number: int):
-        vc: wavelink.Player = ctx.voice_client
-        info = vc.source.info
-        song_name = info["title"]
-        results = sp.search(q=song_name, limit=1)
-        song_id = results['tracks']['items'][0]['id']
-        
-        recommendations = sp.recommendations(seed_tracks=[song_id], limit=number)
-        
-        trackz = []
-
-        for track in recommendations['tracks']:
-            name = (track['name'] + ' ' + track['artists'][0]['name'])
-            trackz.append(name)
-        
-        for track in trackz:
-            ytsong = await wavelink.YouTubeTrack.search(query=track, return_first=True)
-
-            ctx.voice_client.queue.put(ytsong)
-        
-        embed = discord.Embed(
-            title=f"🔗 | Added {number} similar songs to the queue.",
-            colour=discord.Colour.yellow(),
-        )
-
-        track_names = []
-
-        for track in recommendations['tracks']:
-            name = (track['name'] + ' - ' + track['artists'][0]['name'])
-            track_names.append(name)
-        
-        for track in track_names:
-            embed.add_field(name=track, value='', inline=False)
+        session = self.sessions.get(ctx.guild.id)
+        if session is None or session.player.source is None:
+            return await ctx.send("I am not currently playing anything!")
+        session.text_channel = ctx.channel
+        song_name = session.player.source.title
+        seeds, recent_titles = self.recommendation_seeds(ctx.guild.id, song_name)
+        with priority(Priority.BULK):
+            trackz = await self.recommender.take(session, number, seeds, recent_titles, fresh=True)
+        if not trackz:
+            return await ctx.send("Could not find any similar songs.")
 
-        await ctx.send(embed=embed)
+        added, failed = await self.enqueue_bulk(session, trackz, ctx.author.id)
+        self.panels.touch(session, self.added_status(ctx, f"{added} similar songs", failed))
 
     @commands.command(
         name="genre",
@@ -170,60 +555,31 @@ class Music(commands.Cog):
         if number == None:
             number = 5
         
-        genres = sp.recommendation_genre_seeds().get('genres')
-        if not ctx.voice_client:
-            await self.connect(ctx, channel=ctx.author.voice.channel)
-        vc: wavelink.Player = ctx.voice_client
-        ctx: commands.Context = ctx
+        if not len(self.genres):
+            return await ctx.send("The genre list is still loading, try again in a moment.")
 
-        if genre not in genres or genre == None:
+        genre = genre.lower()
+        if genre not in self.genres:
+            suggestions = self.genres.suggest(genre)
             mbed = discord.Embed(
-                title=f"🔗 | Genre not found. Please choose from the following:",
+                title=f"🔗 | Genre not found. Did you mean one of these?",
                 colour=discord.Colour.yellow(),
-                description=genres
+                description=", ".join(suggestions) or "No similar genres found.",
             )
             return await ctx.send(embed=mbed)
 
 
 
-        channel = ctx.author.voice.channel
-        if not ctx.author.voice or not channel:
-            return await ctx.send("You are not connected to any voice channel!")
-
-        if not ctx.voice_client:
-            await self.connect(ctx, channel=channel)
-
-        vc: wavelink.Player = ctx.voice_client
-            
-        results = sp.recommendations(seed_genres=[genre], limit=number)
-        trackz = []
-    
-        for idx, track in enumerate(results['tracks']):
-            print(f"{idx+1}. {track['name']} - {track['artists'][0]['name']}")
-            trackz.append(track['name'] + ' ' + track['artists'][0]['name'])
-        
-        first_track_played = False
-        for track in trackz:
-            ytsong = await wavelink.YouTubeTrack.search(query=track, return_first=True)
-            
-            if not first_track_played and not vc.is_playing():
-                await vc.play(ytsong)
-                first_track_played = True
-            else:
-                await vc.queue.put_wait(ytsong)
-        
-        embed = discord.Embed(
-            title=f"🔗 | Added {number} songs to the queue.",
-            colour=discord.Colour.yellow(),
-        )
-        for idx, track in enumerate(trackz):
-            embed.add_field(name=f"{idx+1}. {track}", value="")
+        session = await self.ensure_session(ctx)
+        if session is None:
+            return
 
-        await ctx.send(embed=embed)
-    
-        if not ctx.voice_client.is_playing():
-            await self.play(vc.queue.get())
+        with priority(Priority.BULK):
+            results = await self.spotify.recommendations(seed_genres=[genre], limit=number)
+        trackz = [track['name'] + ' ' + track['artists'][0]['name'] for track in results['tracks']]
 
+        added, failed = await self.enqueue_bulk(session, trackz, ctx.author.id)
+        self.panels.touch(session, self.added_status(ctx, f"{added} {genre} songs", failed))
 
     @commands.command(
         name="clear",
@@ -233,14 +589,93 @@ class Music(commands.Cog):
         help="Clears the queue.",
     )
     async def clear(self, ctx):
-        vc: wavelink.Player = ctx.voice_client
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        session.queue.clear()
+        await ctx.send("The queue has been cleared.")
 
-        if not vc or not vc.is_connected():
-            return await ctx.send("I am not currently connected to voice!")
+    async def queued_session(self, ctx) -> typing.Optional[GuildSession]:
+        """The guild's session if it has anything queued, replying otherwise."""
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:
+            await ctx.send("I am not currently connected to voice!")
+            return None
+        if not session.queue:
+            await ctx.send("There are no songs in the queue.")
+            return None
+        return session
 
-        vc.queue.clear()
+    @commands.command(
+        name="remove",
+        description="Remove from queue",
+        aliases=["rm"],
+        usage="remove <position>",
+        help="Removes the song at the given position in the queue.",
+    )
+    async def remove(self, ctx, position: int):
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        if not 1 <= position <= len(session.queue):
+            return await ctx.send(f"Pick a position between 1 and {len(session.queue)}.")
+        track = session.queue.pop(position - 1)
+        await ctx.send(f"Removed {track} from the queue.")
 
-        await ctx.send("The queue has been cleared.")
+    @commands.command(
+        name="move",
+        description="Move in queue",
+        aliases=["mv"],
+        usage="move <from> <to>",
+        help="Moves the song at one position in the queue to another.",
+    )
+    async def move(self, ctx, source: int, destination: int):
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        if not (1 <= source <= len(session.queue) and 1 <= destination <= len(session.queue)):
+            return await ctx.send(f"Pick positions between 1 and {len(session.queue)}.")
+        track = session.queue.move(source - 1, destination - 1)
+        await ctx.send(f"Moved {track} to position {destination}.")
+
+    @commands.command(
+        name="shuffle",
+        description="Shuffle queue",
+        usage="shuffle",
+        help="Shuffles the songs in the queue.",
+    )
+    async def shuffle(self, ctx):
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        session.queue.shuffle()
+        await ctx.send(f"Shuffled {len(session.queue)} songs.")
+
+    @commands.command(
+        name="dedupe",
+        description="Remove duplicates",
+        usage="dedupe",
+        help="Removes songs that are already further up in the queue.",
+    )
+    async def dedupe(self, ctx):
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        removed = session.queue.dedupe()
+        await ctx.send(f"Removed {removed} duplicate songs." if removed else "There are no duplicates in the queue.")
+
+    @commands.command(
+        name="fair",
+        description="Fair queue",
+        usage="fair",
+        help="Toggles fair queueing: songs are queued round-robin between the people who request them.",
+    )
+    async def fair(self, ctx):
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:
+            return await ctx.send("I am not currently connected to voice!")
+        session.queue.fair = not session.queue.fair
+        await ctx.send(f"Fair queueing turned {'on' if session.queue.fair else 'off'}.")
 
     @commands.command(
         name="nowplaying",
@@ -254,90 +689,71 @@ class Music(commands.Cog):
 
         if not vc or not vc.is_connected():
             return await ctx.send("I am not currently connected to voice!")
-        try:
-            duration = vc.source.info["length"]
-            info = vc.source.info
-            cur_pos = vc.position
-        except AttributeError:
+        if vc.source is None:
             return await ctx.send("I am not currently playing anything!")
 
-        duration = time.strftime("%M:%S", time.gmtime(duration))
-        cur_pos = time.strftime("%M:%S", time.gmtime(cur_pos))
-        embed = discord.Embed(title="Now Playing", color=discord.Colour.yellow())
-        embed.add_field(name=info["title"], value=" ", inline=False)
-        embed.add_field(name="Uploader", value=info["author"], inline=True)
-        embed.add_field(name="Time", value=f"{cur_pos}/{duration}", inline=True)
-        embed.add_field(name="Source", value=info["sourceName"].upper(), inline=True)
-        embed.add_field(
-            name="URL", value=f'[{info["title"]}]({info["uri"]})', inline=False
-        )
-        embed.set_footer(text="Harmony")
-
-        await ctx.send(embed=embed)
+        await ctx.send(embed=self.track_meta.get(vc.source).now_playing(vc.position))
 
     @commands.command()
     async def radio(self, ctx):
-        vc: wavelink.Player = ctx.voice_client
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:
+            return await ctx.send("I am not currently connected to voice!")
 
-        if getattr(vc, "radio_mode", False):
-            setattr(vc, "radio_mode", False)
-            await ctx.send("Radio mode turned off.")
-        else:
-            setattr(vc, "radio_mode", True)
+        session.radio_mode = not session.radio_mode
+        if session.radio_mode:
+            self.prefetcher.wake(session)
             await ctx.send("Radio mode turned on.")
+        else:
+            self.prefetcher.stop(session)
+            await ctx.send("Radio mode turned off.")
 
     @commands.command(
         name="play",
         description="Play Song",
         aliases=["p"],
         usage="play <song name/URL>",
-        help="Play a song with the given search query or URL. If the bot is already playing a song, it will add the song to the queue.",
+        help="Play a song with the given search query or URL. If the bot is already playing a song, it will add the song to the queue. Spotify playlist or album and YouTube playlist URLs queue every song, starting playback with the first.",
     )
-    async def play(self, ctx, *, track: wavelink.YouTubeTrack):
-        async with ctx.typing():
+    async def play(self, ctx, *, track: CachedTrack):
+        if isinstance(track, ImportSource):
+            session = await self.ensure_session(ctx)
+            if session is not None:
+                session.loop = False
+                await self.import_source(ctx, session, track)
+                if session.radio_mode:
+                    self.prefetcher.wake(session)
+            return
 
-            if not ctx.author.voice or not ctx.author.voice.channel:
-                return await ctx.send("You are not connected to any voice channel!")
+        async with ctx.typing():
 
-            if not ctx.voice_client:
-                await self.connect(ctx, channel=ctx.author.voice.channel)
-            vc: wavelink.Player = ctx.voice_client
+            session = await self.ensure_session(ctx)
+            if session is None:
+                return
+            vc = session.player
 
             if not vc.is_playing():
                 await vc.play(track)
-                mbed = discord.Embed(
-                    title=f"🎶 | Now playing {track}",
-                    description=f"Requested by {ctx.author.mention}", 
-                    colour=discord.Colour.yellow(),
-                )
-                await ctx.send(embed=mbed)
             else:
-                await vc.queue.put_wait(track)
-                mbed = discord.Embed(
-                    title=f"🎶 | Added {track} to the queue...",
-                    description=f"Requested by {ctx.author.mention}",
-                    colour=discord.Colour.yellow(),
-                )
-        
-                await ctx.send(embed=mbed)
-
-            vc.ctx = ctx
-            setattr(vc, "loop", False)
-
-            data = {
-                "song_name": track.title,
-                "song_url": track.uri,
-                "requestor": ctx.author.name,
-                "time": f"{time.strftime('%H:%M:%S', time.localtime())}|{time.strftime('%m/%d/%Y', time.localtime())}",
-            }
-            self.db.insert(data)
+                session.queue.append(track, ctx.author.id)
+            self.panels.touch(session, self.added_status(ctx, str(track)))
+
+            session.loop = False
+
+            record = HistoryRecord(
+                guild_id=ctx.guild.id,
+                user_id=ctx.author.id,
+                requestor=ctx.author.name,
+                song_name=track.title,
+                song_url=track.uri,
+                played_at=time.time(),
+            )
+            self.recent.add(record)
+            self.listening.add(record)
+            self.history_writer.submit(record)
 
-            if getattr(vc, "radio_mode", False) and vc.queue.is_empty:
-                song_id = sp.search(q=track.title, limit=1)['tracks']['items'][0]['id']
-                recommendations = sp.recommendations(seed_tracks=[song_id], limit=1)
-                similar_song = recommendations['tracks'][0]['name'] + ' ' + recommendations['tracks'][0]['artists'][0]['name']
-                similar_track = await wavelink.YouTubeTrack.search(query=similar_song, return_first=True)
-                await vc.queue.put(similar_track)
+            if session.radio_mode:
+                self.prefetcher.wake(session)
 
 
     @commands.command(
@@ -379,21 +795,24 @@ class Music(commands.Cog):
         help="Pause the current song. If the bot is playing a song, it will pause the song. If the bot is already paused, it will resume the song.",
     )
     async def pause(self, ctx):
-        if self.player is None:
+        player: wavelink.Player = ctx.voice_client
+        if player is None:
             return await ctx.send("ID4 is not connected to any voice channels. Fuark.")
 
-        if not self.player.is_paused():
-            if self.player.is_playing():
-                await self.player.pause()
-                mbed = discord.Embed(
-                    title="⏸️ | Playback paused",
-                    colour=discord.Colour.yellow(),
-                )
-            else:
-                mbed = discord.Embed(
-                    title="Not playing any music right now. Fuark.",
-                    colour=discord.Colour.yellow(),
-                )
+        if player.is_paused():
+            return await self.resume(ctx)
+
+        if player.is_playing():
+            await player.pause()
+            mbed = discord.Embed(
+                title="⏸️ | Playback paused",
+                colour=discord.Colour.yellow(),
+            )
+        else:
+            mbed = discord.Embed(
+                title="Not playing any music right now. Fuark.",
+                colour=discord.Colour.yellow(),
+            )
 
         return await ctx.send(embed=mbed)
 
@@ -405,11 +824,12 @@ class Music(commands.Cog):
         help="Resume the current song. If the bot is playing a song, it will resume the song.",
     )
     async def resume(self, ctx):
-        if self.player is None:
+        player: wavelink.Player = ctx.voice_client
+        if player is None:
             return await ctx.send("ID4 is not connected to any voice channels. Fuark.")
 
-        if not self.player.is_paused():
-            await self.player.resume()
+        if player.is_paused():
+            await player.resume()
             mbed = discord.Embed(
                 title=" ▶️ | Playback resumed",
                 colour=discord.Colour.yellow(),
@@ -447,30 +867,42 @@ class Music(commands.Cog):
         help="Get the music queue. If the bot is playing a song, it will show the queue. If the queue is empty, it will show the current song.",
     )
     async def queue(self, ctx) -> None:
-        vc: wavelink.Player = ctx.voice_client
-
-
-        if not vc or not vc.is_connected():
-            return await ctx.send("I am not currently connected to voice!")
-        
-        player: wavelink.Player = ctx.voice_client
-
-        if not player.queue:
-            return await ctx.send("There are no songs in the queue.")
-        
-        embed = discord.Embed(
-            title="Music Queue",
-            description=f"{len(player.queue)} songs in queue",
-            colour=discord.Colour.yellow(),
-        )
-        for track in player.queue:
-            embed.add_field(
-                name=f"{track.title} - {track.info['author']}",
-                value=f"{track.info['uri']}",
-                inline=False,
+        session = await self.queued_session(ctx)
+        if session is None:
+            return
+        queue, vc = session.queue, session.player
+
+        def page_count() -> int:
+            return -(-len(queue) // QUEUE_PAGE_SIZE)
+
+        def render(page: int) -> discord.Embed:
+            remaining = queue.duration
+            if vc.source is not None and not vc.source.is_stream():
+                remaining += max(vc.source.length - vc.position, 0)
+            embed = discord.Embed(
+                title="Music Queue",
+                description=f"{len(queue)} songs in queue • {format_duration(remaining)} remaining",
+                colour=discord.Colour.yellow(),
             )
+            if vc.source is not None:
+                embed.add_field(name="Now playing", value=f"{vc.source.title} - {vc.source.author}", inline=False)
+            tracks = queue.slice(page * QUEUE_PAGE_SIZE, (page + 1) * QUEUE_PAGE_SIZE)
+            for idx, track in enumerate(tracks, start=page * QUEUE_PAGE_SIZE + 1):
+                meta = self.track_meta.get(track)
+                embed.add_field(
+                    name=f"{idx}. {meta.title} - {meta.author}",
+                    value=f"{meta.uri} • {meta.duration}",
+                    inline=False,
+                )
+            embed.set_footer(text=f"Page {page + 1}/{max(page_count(), 1)}")
+            return embed
 
-        await ctx.send(embed=embed)
+        def version() -> typing.Tuple[int, typing.Optional[str]]:
+            # The radio prefetcher can change the current track without popping the queue,
+            # so the queue's version alone does not say whether the "Now playing" field is stale.
+            return queue.version, vc.source.identifier if vc.source is not None else None
+
+        await Paginator(ctx.author, page_count, render, version=version).start(ctx)
 
     @commands.command(
         name="disconnect",
@@ -485,7 +917,8 @@ class Music(commands.Cog):
         try:
             await vc.disconnect()
         except Exception as e:
-            print(e)
+            logger.warning(f"Disconnect failed for guild {ctx.guild.id}: {e}")
+        self.sessions.drop(ctx.guild.id)
         mbed = discord.Embed(
             title="🔌 | Disconnected from voice channel",
             colour=discord.Colour.yellow(),
@@ -498,23 +931,114 @@ class Music(commands.Cog):
         description="History",
         aliases=["h"],
         usage="history",
-        help="Get the history of the last 10 songs.",
+        help="Browse the songs recently played in this server.",
     )
     async def history(self, ctx) -> None:
-        with open("cogs\\db\\history.json", "r") as read_file:
-            data = json.load(read_file)
+        guild_id = ctx.guild.id
+        total = self.recent.count(guild_id)
+        if not total:
+            return await ctx.send("Nothing has been played in this server yet.")
+
+        def page_count() -> int:
+            return -(-self.recent.count(guild_id) // HISTORY_PAGE_SIZE)
+
+        def render(page: int) -> discord.Embed:
+            embed = discord.Embed(
+                title="History",
+                description=f"Last {self.recent.count(guild_id)} songs played",
+                colour=discord.Colour.yellow(),
+            )
+            records = self.recent.page(guild_id, page, HISTORY_PAGE_SIZE)
+            for idx, record in enumerate(records, start=page * HISTORY_PAGE_SIZE + 1):
+                embed.add_field(
+                    name=f"{idx}. {record.song_name}",
+                    value=f"{record.song_url} • {record.requestor} • <t:{int(record.played_at)}:R>",
+                    inline=False,
+                )
+            embed.set_footer(text=f"Page {page + 1}/{max(page_count(), 1)}")
+            return embed
+
+        await Paginator(ctx.author, page_count, render).start(ctx)
+
+    def ranking_embed(self, title: str, period: str, ranking) -> discord.Embed:
+        lines = [f"{idx}. {name} • ×{count}" for idx, (name, count) in enumerate(ranking, start=1)]
         embed = discord.Embed(
-            title="History",
-            description=f"Last {len(data)} songs played",
+            title=title,
+            description="\n".join(lines) or "Nothing has been played yet.",
             colour=discord.Colour.yellow(),
         )
-        for track in data:
-            embed.add_field(
-                name=f"{track['title']} - {track['author']}",
-                value=f"{track['uri']}",
-                inline=False,
-            )
+        footer = "All time" if period == "all" else f"Period: {period}"
+        if self.listening.rebuilding:
+            footer += " • still counting older history"
+        embed.set_footer(text=footer)
+        return embed
+
+    @commands.group(
+        name="top",
+        invoke_without_command=True,
+        usage="top [today|week|month|all]",
+        help="The most played songs in this server over the past week, or the given period.",
+    )
+    async def top(self, ctx, period: stats_period = "week"):
+        ranking = self.listening.top_tracks(period, TOP_LIMIT, guild_id=ctx.guild.id)
+        await ctx.send(embed=self.ranking_embed(f"Top songs in {ctx.guild.name}", period, ranking))
+
+    @top.command(
+        name="listeners",
+        aliases=["users"],
+        usage="top listeners [today|week|month|all]",
+        help="The people who requested the most songs in this server over the past week, or the given period.",
+    )
+    async def top_listeners(self, ctx, period: stats_period = "week"):
+        ranking = self.listening.top_users(ctx.guild.id, period, TOP_LIMIT)
+        await ctx.send(embed=self.ranking_embed(f"Top listeners in {ctx.guild.name}", period, ranking))
+
+    @top.command(
+        name="mine",
+        aliases=["me"],
+        usage="top mine [today|week|month|all]",
+        help="The songs you have requested most, in servers on this shard, of all time or over the given period.",
+    )
+    async def top_mine(self, ctx, period: stats_period = "all"):
+        ranking = self.listening.top_tracks(period, TOP_LIMIT, user_id=ctx.author.id)
+        await ctx.send(embed=self.ranking_embed(f"Top songs for {ctx.author.display_name}", period, ranking))
 
+    @commands.command(
+        name="guildstats",
+        description="Server Stats",
+        aliases=["gs"],
+        usage="guildstats",
+        help="How much music this server has played: today, this week, this month and all time.",
+    )
+    async def guildstats(self, ctx) -> None:
+        activity = self.listening.activity(ctx.guild.id)
+        embed = discord.Embed(
+            title=f"📈 | {ctx.guild.name}",
+            description=(
+                f"{activity.today} songs today • {activity.week} this week • "
+                f"{activity.month} this month • {activity.plays} all time"
+            ),
+            colour=discord.Colour.yellow(),
+        )
+        # Days are bucketed in UTC, so they are labelled in UTC too.
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        peak = max(activity.last_week) or 1
+        bars = "\n".join(
+            f"`{today - datetime.timedelta(days=6 - idx):%a}` {'█' * round(10 * plays / peak)} {plays}"
+            for idx, plays in enumerate(activity.last_week)
+        )
+        embed.add_field(name="Last 7 days", value=bars, inline=False)
+        if activity.busiest_hour is not None:
+            embed.add_field(name="Busiest hour", value=f"{activity.busiest_hour:02}:00 UTC", inline=True)
+        for label, ranking in (
+            ("Top song this week", self.listening.top_tracks("week", 1, guild_id=ctx.guild.id)),
+            ("Top listener this week", self.listening.top_users(ctx.guild.id, "week", 1)),
+        ):
+            if ranking:
+                name, count = ranking[0]
+                embed.add_field(name=label, value=f"{name} • ×{count}", inline=True)
+        if self.listening.rebuilding:
+            embed.set_footer(text="Still counting older history")
         await ctx.send(embed=embed)
 
     @commands.command(
@@ -540,28 +1064,133 @@ class Music(commands.Cog):
     async def playlist(self, ctx):
         await ctx.send_help(ctx.command)
 
-    @playlist.command(name="save")
-    async def playlist_save(self, ctx, playlist_name, *, song: wavelink.YouTubeTrack):
-        self.db.insert({'user_id': ctx.author.id, 'playlist_name': playlist_name, 'song_name': song.title, 'song_url': song.uri})
-        await ctx.send(f"Song '{song.title}' added to playlist '{playlist_name}'.")
+    @playlist.command(
+        name="save",
+        aliases=["add"],
+        usage="playlist save <playlist name> <song> [| <song> ...]",
+        help="Add one or more songs to a playlist. Separate songs with |, or give a Spotify playlist or album or a YouTube playlist URL to add all of its songs.",
+    )
+    async def playlist_save(self, ctx, playlist_name, *, songs: str):
+        source = parse_source(songs)
+        job = None
+        if source is not None:
+            job = ImportJob(source)
+            results = self.importer.stream(job)
+        else:
+            results = self.resolver.stream(query.strip() for query in songs.split("|") if query.strip())
+        entries = []
+        failed = []
+        async with ctx.typing():
+            with priority(Priority.BULK):
+                async for result in results:
+                    if result.track is None:
+                        failed.append(result.query)
+                        continue
+                    track = result.track
+                    entries.append(PlaylistEntry(track.title, track.uri, track.id, track.info))
+
+        if entries:
+            await self.db.add_playlist_entries(ctx.author.id, playlist_name, entries)
+        message = f"Added {len(entries)} song(s) to playlist '{playlist_name}'."
+        if failed and source is not None:
+            message += f" {len(failed)} could not be found."
+        elif failed:
+            message += f" Could not find: {', '.join(failed)}"
+        if job is not None and job.error is not None:
+            message += f" {job.error}"
+        await ctx.send(message)
+
+    @playlist.command(
+        name="remove",
+        aliases=["rm"],
+        usage="playlist remove <playlist name> <position> [<position> ...]",
+        help="Remove the songs at the given positions (as shown by playlist view) from a playlist.",
+    )
+    async def playlist_remove(self, ctx, playlist_name, *positions: int):
+        removed = await self.db.remove_playlist_entries(
+            ctx.author.id, playlist_name, [position - 1 for position in positions]
+        )
+        await ctx.send(f"Removed {removed} song(s) from playlist '{playlist_name}'.")
+
+    @playlist.command(name="delete", usage="playlist delete <playlist name>")
+    async def playlist_delete(self, ctx, playlist_name):
+        if await self.db.delete_playlist(ctx.author.id, playlist_name):
+            await ctx.send(f"Deleted playlist '{playlist_name}'.")
+        else:
+            await ctx.send("You do not have a playlist with that name.")
 
     @playlist.command(name="list")
     async def playlist_list(self, ctx):
-        User = Query()
-        playlists = self.db.search(User.user_id == ctx.author.id)
-        playlist_names = set([playlist['playlist_name'] for playlist in playlists])
+        playlist_names = await self.db.playlist_names(ctx.author.id)
         await ctx.send(f"Your playlists: {', '.join(playlist_names)}")
 
     @playlist.command(name="view")
     async def playlist_view(self, ctx, playlist_name):
-        User = Query()
-        playlists = self.db.search((User.user_id == ctx.author.id) & (User.playlist_name == playlist_name))
-        if not playlists:
+        entries = await self.db.playlist_entries(ctx.author.id, playlist_name)
+        if entries is None:
             await ctx.send("You do not have a playlist with that name.")
+        elif not entries:
+            await ctx.send(f"Playlist '{playlist_name}' is empty.")
         else:
-            songs = [playlist['song_name'] for playlist in playlists]
+            songs = [f"{idx+1}. {entry.song_name}" for idx, entry in enumerate(entries)]
             await ctx.send(f"Songs in playlist '{playlist_name}': {', '.join(songs)}")
 
+    @playlist.command(
+        name="play",
+        usage="playlist play <playlist name>",
+        help="Queue every song in one of your playlists.",
+    )
+    async def playlist_play(self, ctx, playlist_name):
+        entries = await self.db.playlist_entries(ctx.author.id, playlist_name)
+        if entries is None:
+            return await ctx.send("You do not have a playlist with that name.")
+        if not entries:
+            return await ctx.send(f"Playlist '{playlist_name}' is empty.")
+
+        session = await self.ensure_session(ctx)
+        if session is None:
+            return
+
+        tracks: typing.List[typing.Optional[wavelink.YouTubeTrack]] = []
+        missing = []
+        for idx, entry in enumerate(entries):
+            if entry.track_id is not None:
+                tracks.append(wavelink.YouTubeTrack(entry.track_id, entry.track_info))
+            else:
+                tracks.append(None)
+                missing.append(idx)
+
+        if missing:
+            # Entries saved before tracks were stored get resolved once and backfilled.
+            with priority(Priority.BULK):
+                results = await self.resolver.resolve(entries[idx].song_name for idx in missing)
+            resolved = {}
+            for idx, result in zip(missing, results):
+                if result.track is not None:
+                    tracks[idx] = result.track
+                    resolved[idx] = (result.track.id, result.track.info)
+            if resolved:
+                await self.db.set_playlist_tracks(ctx.author.id, playlist_name, resolved)
+
+        tracks = [track for track in tracks if track is not None]
+        if not tracks:
+            return await ctx.send("None of the songs in that playlist could be found.")
+        queued = len(tracks)
+
+        if not session.player.is_playing():
+            await session.player.play(tracks[0])
+            tracks = tracks[1:]
+        session.queue.extend(tracks, ctx.author.id)
+
+        mbed = discord.Embed(
+            title=f"🎶 | Queued playlist '{playlist_name}'",
+            description=f"{queued} songs, requested by {ctx.author.mention}",
+            colour=discord.Colour.yellow(),
+        )
+        if queued < len(entries):
+            mbed.set_footer(text=f"{len(entries) - queued} songs could not be found")
+        await ctx.send(embed=mbed)
+
 
 async def setup(bot):
     await bot.add_cog(Music(bot))
@@ -0,0 +1,83 @@
+import datetime
+import time
+
+import discord
+from discord.ext import commands
+
+from cogs.utils.metrics import Metrics
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms"
+
+
+class Stats(commands.Cog):
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot: commands.Bot = bot
+        self.metrics: Metrics = bot.metrics
+
+    @commands.command(
+        name="stats",
+        description="Stats",
+        usage="stats",
+        help="Shows latency, upstream and player statistics. Owner only.",
+    )
+    @commands.is_owner()
+    async def stats(self, ctx) -> None:
+        metrics = self.metrics
+        gauges = metrics.gauges()
+        uptime = datetime.timedelta(seconds=int(time.time() - metrics.started_at))
+        lag = metrics.loop_lag
+
+        embed = discord.Embed(
+            title="📊 | Stats",
+            description=f"Up for {uptime}, gateway latency {_ms(self.bot.latency)}",
+            colour=discord.Colour.yellow(),
+        )
+        embed.add_field(
+            name="Event loop lag",
+            value=f"p50 {_ms(lag.quantile(0.5))} • p99 {_ms(lag.quantile(0.99))} • max {_ms(lag.max)}",
+            inline=False,
+        )
+
+        players = sum(gauges.get("active_players", {}).values())
+        sessions = sum(gauges.get("sessions", {}).values())
+        queued = sum(gauges.get("queue_length", {}).values())
+        embed.add_field(
+            name="Players",
+            value=f"{players:.0f} playing • {sessions:.0f} sessions • {queued:.0f} queued tracks",
+            inline=False,
+        )
+
+        commands_seen = sorted(
+            metrics.histograms.get("command_seconds", {}).items(), key=lambda item: item[1].count, reverse=True
+        )
+        lines = [
+            f"`{dict(labels)['command']}` ×{histogram.count} • p50 {_ms(histogram.quantile(0.5))} • "
+            f"p95 {_ms(histogram.quantile(0.95))}"
+            for labels, histogram in commands_seen[:10]
+        ]
+        embed.add_field(name="Commands", value="\n".join(lines) or "None yet", inline=False)
+
+        errors = {}
+        for labels, count in metrics.counters.get("upstream_errors_total", {}).items():
+            upstream = dict(labels)["upstream"]
+            errors[upstream] = errors.get(upstream, 0) + count
+        depths = {dict(labels)["upstream"]: value for labels, value in gauges.get("upstream_queue_depth", {}).items()}
+        lines = []
+        for labels, histogram in sorted(metrics.histograms.get("upstream_call_seconds", {}).items()):
+            upstream = dict(labels)["upstream"]
+            line = (
+                f"`{upstream}` ×{histogram.count} • avg {_ms(histogram.mean)} • "
+                f"p95 {_ms(histogram.quantile(0.95))} • {errors.get(upstream, 0):.0f} errors"
+            )
+            if upstream in depths:
+                line += f" • {depths[upstream]:.0f} waiting"
+            lines.append(line)
+        embed.add_field(name="Upstreams", value="\n".join(lines) or "None yet", inline=False)
+
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
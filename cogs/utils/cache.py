@@ -0,0 +1,149 @@
+import asyncio
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+# Namespaces used by the Music cog.
+TRACKS = "track"
+SPOTIFY_IDS = "spotify_id"
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class ResolutionCache:
+    """Two-tier cache mapping normalized queries to resolved payloads.
+
+    The first tier is an in-memory LRU, the second an SQLite file that
+    survives restarts. Entries expire after ``ttl`` seconds in both tiers and
+    each tier is capped in size. Disk access runs on a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        memory_entries: int = 5000,
+        disk_entries: int = 200_000,
+        ttl: float = 7 * 24 * 3600,
+    ) -> None:
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+
+        self._memory: "collections.OrderedDict[typing.Tuple[str, str], typing.Tuple[float, typing.Any]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+
+    # -- memory tier -------------------------------------------------------
+
+    def _memory_get(self, key: typing.Tuple[str, str]) -> typing.Any:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: typing.Tuple[str, str], value: typing.Any, expires: float) -> None:
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _disk_get(self, namespace: str, key: str) -> typing.Optional[typing.Tuple[float, typing.Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM cache WHERE namespace = ? AND key = ? AND expires >= ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _disk_put(self, namespace: str, key: str, value: typing.Any, expires: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, separators=(",", ":")), expires),
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.disk_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY expires LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+
+    # -- public API --------------------------------------------------------
+
+    async def get(self, namespace: str, query: str) -> typing.Any:
+        key = (namespace, normalize(query))
+        value = self._memory_get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        entry = await asyncio.to_thread(self._disk_get, *key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.disk_hits += 1
+        expires, value = entry
+        self._memory_put(key, value, expires)
+        return value
+
+    async def set(self, namespace: str, query: str, value: typing.Any) -> None:
+        key = (namespace, normalize(query))
+        expires = time.time() + self.ttl
+        self._memory_put(key, value, expires)
+        await asyncio.to_thread(self._disk_put, *key, value, expires)
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
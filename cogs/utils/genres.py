@@ -0,0 +1,104 @@
+import asyncio
+import bisect
+import difflib
+import json
+import os
+import time
+import typing
+
+from loguru import logger
+
+Fetcher = typing.Callable[[], typing.Awaitable[typing.List[str]]]
+
+
+class GenreCatalog:
+    """Spotify's genre seed list, held in memory and mirrored to disk.
+
+    Lookups, prefix matches and suggestions never touch the network. The list
+    is refreshed from ``fetch`` on a background timer and saved to ``path``
+    so a cold start can answer straight from disk.
+    """
+
+    def __init__(self, path: str, fetch: Fetcher, *, refresh_interval: float = 24 * 3600) -> None:
+        self.path = path
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.updated_at = 0.0
+        self._genres: typing.FrozenSet[str] = frozenset()
+        self._sorted: typing.List[str] = []
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def __contains__(self, genre: str) -> bool:
+        return genre.lower() in self._genres
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def _set(self, genres: typing.Iterable[str], updated_at: float) -> None:
+        self._sorted = sorted({genre.lower() for genre in genres})
+        self._genres = frozenset(self._sorted)
+        self.updated_at = updated_at
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as read_file:
+                data = json.load(read_file)
+        except (OSError, ValueError):
+            return
+        self._set(data.get("genres", []), data.get("updated_at", 0.0))
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as write_file:
+            json.dump({"updated_at": self.updated_at, "genres": self._sorted}, write_file)
+        os.replace(tmp_path, self.path)
+
+    async def refresh(self) -> None:
+        genres = await self.fetch()
+        if not genres:
+            return
+        self._set(genres, time.time())
+        await asyncio.to_thread(self._save)
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._load)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        delay = max(self.updated_at + self.refresh_interval - time.time(), 0)
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+                delay = self.refresh_interval
+            except Exception as e:
+                logger.warning(f"Genre catalog refresh failed: {e}")
+                delay = min(self.refresh_interval, 300)
+
+    def prefix(self, text: str, limit: int = 10) -> typing.List[str]:
+        text = text.lower()
+        start = bisect.bisect_left(self._sorted, text)
+        matches = []
+        for genre in self._sorted[start:]:
+            if not genre.startswith(text) or len(matches) == limit:
+                break
+            matches.append(genre)
+        return matches
+
+    def suggest(self, text: str, limit: int = 10) -> typing.List[str]:
+        """Prefix matches first, then close spellings."""
+        matches = self.prefix(text, limit)
+        if len(matches) < limit:
+            for genre in difflib.get_close_matches(text.lower(), self._sorted, n=limit, cutoff=0.6):
+                if genre not in matches:
+                    matches.append(genre)
+        return matches[:limit]
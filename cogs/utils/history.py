@@ -0,0 +1,47 @@
+import collections
+import itertools
+import typing
+
+from cogs.utils.storage import HistoryRecord
+
+
+class HistoryBuffer:
+    """Per-guild ring buffers holding the most recently played tracks.
+
+    Each guild keeps at most ``size`` records, newest first, so reading a page
+    costs the same no matter how much history is stored on disk.
+    """
+
+    def __init__(self, size: int = 500) -> None:
+        self.size = size
+        self._guilds: typing.Dict[int, typing.Deque[HistoryRecord]] = {}
+
+    def _buffer(self, guild_id: int) -> typing.Deque[HistoryRecord]:
+        buffer = self._guilds.get(guild_id)
+        if buffer is None:
+            buffer = self._guilds[guild_id] = collections.deque(maxlen=self.size)
+        return buffer
+
+    def load(self, records: typing.Iterable[HistoryRecord]) -> None:
+        """Fills the buffers from records ordered newest first."""
+        for record in records:
+            buffer = self._buffer(record.guild_id)
+            if len(buffer) < self.size:
+                buffer.append(record)
+
+    def add(self, record: HistoryRecord) -> None:
+        self._buffer(record.guild_id).appendleft(record)
+
+    def count(self, guild_id: int) -> int:
+        buffer = self._guilds.get(guild_id)
+        return len(buffer) if buffer is not None else 0
+
+    def page(self, guild_id: int, page: int, per_page: int) -> typing.List[HistoryRecord]:
+        buffer = self._guilds.get(guild_id)
+        if buffer is None:
+            return []
+        start = page * per_page
+        return list(itertools.islice(buffer, start, start + per_page))
+
+    def recent(self, guild_id: int, limit: int) -> typing.List[HistoryRecord]:
+        return self.page(guild_id, 0, limit)
@@ -0,0 +1,80 @@
+import asyncio
+import typing
+
+import discord
+
+from cogs.utils.session import GuildSession
+
+Disconnect = typing.Callable[[GuildSession, str], typing.Awaitable[None]]
+
+ALONE = "alone"
+INACTIVE = "inactive"
+
+
+class IdleManager:
+    """Disconnects players nobody is listening to.
+
+    Each session keeps a count of the people in the bot's voice channel,
+    taken once when the bot joins a channel and then adjusted from voice
+    state deltas, so a voice event never scans channel members. When the
+    count drops to zero a grace timer starts, and a player that sits paused
+    or with nothing playing gets a timer of its own. Either timer is
+    cancelled as soon as things pick up again; if it fires, ``disconnect``
+    is called with the reason.
+    """
+
+    def __init__(self, disconnect: Disconnect, *, alone_timeout: float = 60, inactive_timeout: float = 300) -> None:
+        self.disconnect = disconnect
+        self.alone_timeout = alone_timeout
+        self.inactive_timeout = inactive_timeout
+        self.disconnected = {ALONE: 0, INACTIVE: 0}
+
+    def _arm(self, session: GuildSession, reason: str, delay: float) -> None:
+        if reason in session.timers:
+            return
+        loop = asyncio.get_running_loop()
+        session.set_timer(reason, loop.call_later(delay, lambda: loop.create_task(self._expire(session, reason))))
+
+    async def _expire(self, session: GuildSession, reason: str) -> None:
+        session.timers.pop(reason, None)
+        self.disconnected[reason] += 1
+        await self.disconnect(session, reason)
+
+    def _check_alone(self, session: GuildSession) -> None:
+        if session.listeners:
+            session.cancel_timer(ALONE)
+        else:
+            self._arm(session, ALONE, self.alone_timeout)
+
+    def watch(self, session: GuildSession, channel: typing.Optional[discord.abc.Connectable]) -> None:
+        """Recounts listeners after the bot joins or moves to ``channel``."""
+        members = getattr(channel, "members", ())
+        session.listeners = sum(1 for member in members if not member.bot)
+        self._check_alone(session)
+        self.update(session)
+
+    def member_moved(
+        self,
+        session: GuildSession,
+        member: discord.Member,
+        before: typing.Optional[discord.abc.Connectable],
+        after: typing.Optional[discord.abc.Connectable],
+    ) -> None:
+        if member.bot or before == after:
+            return
+        channel = session.player.channel
+        if after == channel:
+            session.listeners += 1
+        elif before == channel:
+            session.listeners = max(session.listeners - 1, 0)
+        else:
+            return
+        self._check_alone(session)
+
+    def update(self, session: GuildSession) -> None:
+        """Re-evaluates the inactivity timer after playback state may have changed."""
+        player = session.player
+        if player.is_playing() and not player.is_paused():
+            session.cancel_timer(INACTIVE)
+        else:
+            self._arm(session, INACTIVE, self.inactive_timeout)
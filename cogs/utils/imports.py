@@ -0,0 +1,125 @@
+import re
+import typing
+
+import wavelink
+
+from cogs.utils.resolver import BatchResolver, Resolved
+from cogs.utils.spotify import SpotifyError
+
+SPOTIFY_PLAYLIST = "Spotify playlist"
+SPOTIFY_ALBUM = "Spotify album"
+YOUTUBE_PLAYLIST = "YouTube playlist"
+
+_SPOTIFY_URL = re.compile(
+    r"^(?:https?://open\.spotify\.com/(?:intl-[\w-]+/)?(playlist|album)/|spotify:(playlist|album):)([A-Za-z0-9]+)"
+)
+_YOUTUBE_URL = re.compile(
+    r"^https?://(?:www\.|m\.|music\.)?youtube\.com/(?:playlist|watch)\?\S*?\blist=([\w-]+)"
+)
+
+PlaylistLoader = typing.Callable[[str], typing.Awaitable[typing.Optional[wavelink.YouTubePlaylist]]]
+
+
+class ImportSource(typing.NamedTuple):
+    kind: str
+    id: str
+    url: str
+
+
+def parse_source(text: str) -> typing.Optional[ImportSource]:
+    """Recognises Spotify playlist/album and YouTube playlist URLs; anything else is a search."""
+    text = text.strip()
+    match = _SPOTIFY_URL.match(text)
+    if match is not None:
+        kind = match.group(1) or match.group(2)
+        return ImportSource(SPOTIFY_PLAYLIST if kind == "playlist" else SPOTIFY_ALBUM, match.group(3), text)
+    match = _YOUTUBE_URL.match(text)
+    if match is not None:
+        return ImportSource(YOUTUBE_PLAYLIST, match.group(1), text)
+    return None
+
+
+def _describe(source: ImportSource, status: int, offset: int = 0) -> str:
+    if offset:
+        return f"Reading the {source.kind} failed after {offset} songs (error {status})."
+    if status in (401, 403, 404):
+        return f"That {source.kind} doesn't exist or is private."
+    return f"Reading the {source.kind} failed (error {status})."
+
+
+class ImportJob:
+    """Progress of one import, for the message that reports it."""
+
+    __slots__ = ("source", "total", "added", "failed", "error")
+
+    def __init__(self, source: ImportSource) -> None:
+        self.source = source
+        # Known once the first page (or the whole YouTube playlist) has loaded.
+        self.total: typing.Optional[int] = None
+        self.added = 0
+        self.failed = 0
+        # Why the import stopped early, if it did; whatever was already queued stays queued.
+        self.error: typing.Optional[str] = None
+
+
+class Importer:
+    """Turns a playlist or album URL into a stream of resolved tracks.
+
+    Spotify sources are paged lazily: the next page is only requested once
+    the resolver's window has room, so the first tracks can start playing
+    while the rest of a long playlist hasn't even been fetched. Lavalink
+    loads YouTube playlists in one request and they come back already
+    resolved, so they are streamed straight from that response.
+
+    A source that can't be read (private, deleted, or an upstream error)
+    ends the stream early with the reason in ``job.error``; tracks already
+    yielded, and those still resolving, are not lost.
+    """
+
+    def __init__(self, spotify, resolver: BatchResolver, load_playlist: PlaylistLoader) -> None:
+        self.spotify = spotify
+        self.resolver = resolver
+        self.load_playlist = load_playlist
+
+    async def _spotify_queries(self, job: ImportJob) -> typing.AsyncIterator[str]:
+        if job.source.kind == SPOTIFY_PLAYLIST:
+            fetch = self.spotify.playlist_tracks
+        else:
+            fetch = self.spotify.album_tracks
+        offset = 0
+        while True:
+            try:
+                page = await fetch(job.source.id, offset=offset)
+            except SpotifyError as e:
+                job.error = _describe(job.source, e.status, offset)
+                return
+            job.total = page.get("total", job.total)
+            items = page.get("items") or []
+            for item in items:
+                # Playlist items wrap the track; removed tracks and podcast episodes are skipped.
+                track = item.get("track") if job.source.kind == SPOTIFY_PLAYLIST else item
+                if not track or track.get("type", "track") != "track" or not track.get("name"):
+                    continue
+                artists = track.get("artists") or []
+                yield f"{track['name']} {artists[0]['name']}" if artists else track["name"]
+            if not page.get("next") or not items:
+                return
+            offset += len(items)
+
+    async def stream(self, job: ImportJob) -> typing.AsyncIterator[Resolved]:
+        if job.source.kind == YOUTUBE_PLAYLIST:
+            try:
+                playlist = await self.load_playlist(job.source.url)
+            except wavelink.LavalinkException as e:
+                job.error = f"Lavalink could not load the {job.source.kind}: {e}"
+                return
+            if playlist is None:
+                job.error = _describe(job.source, 404)
+                return
+            tracks = playlist.tracks
+            job.total = len(tracks)
+            for track in tracks:
+                yield Resolved(track.title, track, None)
+            return
+        async for result in self.resolver.stream_lazily(self._spotify_queries(job)):
+            yield result
@@ -0,0 +1,279 @@
+import collections
+import heapq
+import operator
+import time
+import typing
+
+from loguru import logger
+
+from cogs.utils.storage import HistoryRecord, Storage
+from cogs.utils.writebehind import HistoryWriter
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Days each period covers; None is all time.
+PERIODS = {"today": 1, "week": 7, "month": 30, "all": None}
+
+Ranking = typing.List[typing.Tuple[str, int]]
+
+
+class HeavyHitters:
+    """Approximate play counts for the most played keys in bounded memory.
+
+    A Misra-Gries summary: at most ``capacity`` keys are counted, and when a
+    new key arrives with the table full every count drops by one instead, so
+    an update is amortised O(1). Any key with more than
+    ``total / (capacity + 1)`` plays is guaranteed to be kept, and a kept
+    count is at most ``error`` below the true one.
+    """
+
+    __slots__ = ("capacity", "total", "error", "counts", "labels")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self.error = 0
+        self.counts: typing.Dict[typing.Hashable, int] = {}
+        self.labels: typing.Dict[typing.Hashable, str] = {}
+
+    def add(self, key: typing.Hashable, label: str) -> None:
+        self.total += 1
+        count = self.counts.get(key)
+        if count is not None:
+            self.counts[key] = count + 1
+            self.labels[key] = label
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = 1
+            self.labels[key] = label
+        else:
+            self.error += 1
+            for other, count in list(self.counts.items()):
+                if count == 1:
+                    del self.counts[other]
+                    del self.labels[other]
+                else:
+                    self.counts[other] = count - 1
+
+
+def _top(summaries: typing.Sequence[HeavyHitters], limit: int) -> Ranking:
+    """Merges summaries, oldest first so the newest label wins, and ranks the keys."""
+    if len(summaries) == 1:
+        counts, labels = summaries[0].counts, summaries[0].labels
+    else:
+        counts, labels = collections.Counter(), {}
+        for summary in summaries:
+            counts.update(summary.counts)
+            labels.update(summary.labels)
+    return [(labels[key], count) for key, count in heapq.nlargest(limit, counts.items(), key=operator.itemgetter(1))]
+
+
+class _Day:
+    __slots__ = ("plays", "tracks", "users")
+
+    def __init__(self, capacity: int, by_user: bool) -> None:
+        self.plays = 0
+        self.tracks = HeavyHitters(capacity)
+        self.users = HeavyHitters(capacity) if by_user else None
+
+
+class Scope:
+    """Play counts for one guild or one user: all time, per UTC day and per hour of day."""
+
+    __slots__ = ("plays", "tracks", "users", "hours", "days")
+
+    def __init__(self, capacity: int, by_user: bool) -> None:
+        self.plays = 0
+        self.tracks = HeavyHitters(capacity)
+        self.users = HeavyHitters(capacity) if by_user else None
+        # Plays by hour of the day (UTC), all time.
+        self.hours = [0] * 24
+        # Only the retained days are kept, keyed by days since the epoch.
+        self.days: typing.Dict[int, _Day] = {}
+
+
+class Activity(typing.NamedTuple):
+    plays: int
+    today: int
+    week: int
+    month: int
+    # Plays on each of the last seven days, oldest first.
+    last_week: typing.List[int]
+    busiest_hour: typing.Optional[int]
+
+
+class ListeningStats:
+    """Listening statistics, updated as each play is recorded.
+
+    Every record bumps fixed-size aggregates for its guild and its
+    requester, so answering "top songs this week" costs the same whether
+    there are a hundred plays on disk or ten million: at most a month of
+    daily summaries of ``capacity`` keys each are merged. Days older than
+    ``retention_days`` are dropped; all-time figures are kept.
+
+    Nothing is persisted. :meth:`rebuild` recomputes everything from the
+    history table, which the cog does in the background on load.
+    """
+
+    def __init__(self, *, capacity: int = 500, retention_days: int = 30, clock=time.time) -> None:
+        self.capacity = capacity
+        self.retention_days = max(retention_days, max(days for days in PERIODS.values() if days))
+        self.clock = clock
+        self.guilds: typing.Dict[int, Scope] = {}
+        self.users: typing.Dict[int, Scope] = {}
+        self.plays = 0
+        # Records added while a rebuild runs, replayed onto the rebuilt aggregates.
+        self._during_rebuild: typing.Optional[typing.List[HistoryRecord]] = None
+        self.rebuilt = 0
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._during_rebuild is not None
+
+    def _scope(self, scopes: typing.Dict[int, Scope], key: int, by_user: bool) -> Scope:
+        scope = scopes.get(key)
+        if scope is None:
+            scope = scopes[key] = Scope(self.capacity, by_user)
+        return scope
+
+    def _count(self, scope: Scope, record: HistoryRecord, day: typing.Optional[int], hour: int) -> None:
+        track = record.song_url or record.song_name
+        user = record.user_id if record.user_id is not None else record.requestor
+        scope.plays += 1
+        scope.tracks.add(track, record.song_name)
+        if scope.users is not None:
+            scope.users.add(user, record.requestor)
+        scope.hours[hour] += 1
+        if day is None:
+            return
+        bucket = scope.days.get(day)
+        if bucket is None:
+            oldest = day - self.retention_days
+            for expired in [key for key in scope.days if key <= oldest]:
+                del scope.days[expired]
+            bucket = scope.days[day] = _Day(self.capacity, scope.users is not None)
+        bucket.plays += 1
+        bucket.tracks.add(track, record.song_name)
+        if bucket.users is not None:
+            bucket.users.add(user, record.requestor)
+
+    def add(self, record: HistoryRecord) -> None:
+        if self._during_rebuild is not None:
+            self._during_rebuild.append(record)
+        day = int(record.played_at // DAY)
+        if day <= self._today() - self.retention_days:
+            day = None
+        hour = int(record.played_at % DAY // HOUR)
+        self.plays += 1
+        if record.guild_id is not None:
+            self._count(self._scope(self.guilds, record.guild_id, True), record, day, hour)
+        if record.user_id is not None:
+            self._count(self._scope(self.users, record.user_id, False), record, day, hour)
+
+    def _today(self) -> int:
+        return int(self.clock() // DAY)
+
+    def _days(self, scope: Scope, days: int) -> typing.List[_Day]:
+        today = self._today()
+        return [scope.days[day] for day in range(today - days + 1, today + 1) if day in scope.days]
+
+    def _summaries(self, scope: Scope, period: str, field: str) -> typing.List[HeavyHitters]:
+        days = PERIODS[period]
+        if days is None:
+            return [getattr(scope, field)]
+        return [getattr(bucket, field) for bucket in self._days(scope, days)]
+
+    # -- queries -----------------------------------------------------------
+
+    def top_tracks(
+        self,
+        period: str = "all",
+        limit: int = 10,
+        *,
+        guild_id: typing.Optional[int] = None,
+        user_id: typing.Optional[int] = None,
+    ) -> Ranking:
+        """The most played songs in a guild, or by a user, as (name, plays) pairs."""
+        scope = self.users.get(user_id) if user_id is not None else self.guilds.get(guild_id)
+        if scope is None:
+            return []
+        return _top(self._summaries(scope, period, "tracks"), limit)
+
+    def top_users(self, guild_id: int, period: str = "all", limit: int = 10) -> Ranking:
+        """The people who requested the most songs in a guild, as (name, plays) pairs."""
+        scope = self.guilds.get(guild_id)
+        if scope is None:
+            return []
+        return _top(self._summaries(scope, period, "users"), limit)
+
+    def activity(self, guild_id: int) -> Activity:
+        scope = self.guilds.get(guild_id)
+        if scope is None:
+            return Activity(0, 0, 0, 0, [0] * 7, None)
+        today = self._today()
+        last_week = [scope.days[day].plays if day in scope.days else 0 for day in range(today - 6, today + 1)]
+        busiest = max(range(24), key=scope.hours.__getitem__) if scope.plays else None
+        return Activity(
+            plays=scope.plays,
+            today=last_week[-1],
+            week=sum(last_week),
+            month=sum(bucket.plays for bucket in self._days(scope, PERIODS["month"])),
+            last_week=last_week,
+            busiest_hour=busiest,
+        )
+
+    # -- rebuilding --------------------------------------------------------
+
+    async def rebuild(
+        self,
+        storage: Storage,
+        *,
+        writer: typing.Optional[HistoryWriter] = None,
+        shard_ids: typing.Optional[typing.Sequence[int]] = None,
+        shard_count: int = 1,
+        batch_size: int = 5000,
+    ) -> int:
+        """Recomputes every aggregate from the history table; returns the records read.
+
+        Reads in batches so the event loop keeps running. Plays recorded in
+        the meantime keep counting towards the old aggregates and are
+        replayed onto the new ones before they are swapped in.
+
+        Pass the ``writer`` that records are submitted to: plays it has not
+        written yet when the rebuild starts are in neither the table nor the
+        replay, and would be lost without it. With ``shard_ids``, only plays
+        in guilds on those shards are read, matching what this process sees live.
+        """
+        started = time.perf_counter()
+        fresh = ListeningStats(capacity=self.capacity, retention_days=self.retention_days, clock=self.clock)
+        # Capturing starts in the same step as the writer's checkpoint is queued, so every play is either
+        # at or below last_id, or captured and replayed below, never both.
+        self._during_rebuild = []
+        try:
+            last_id = await (storage.last_history_id() if writer is None else writer.last_written_id())
+            after = 0
+            while after < last_id:
+                rows = await storage.history_after(
+                    after, last_id, batch_size, shard_ids=shard_ids, shard_count=shard_count
+                )
+                if not rows:
+                    break
+                for _, record in rows:
+                    fresh.add(record)
+                after = rows[-1][0]
+            read = fresh.plays
+            for record in self._during_rebuild:
+                fresh.add(record)
+        finally:
+            self._during_rebuild = None
+        self.guilds, self.users, self.plays = fresh.guilds, fresh.users, fresh.plays
+        self.rebuilt = read
+        logger.info(f"Rebuilt listening stats from {read} history records in {time.perf_counter() - started:.2f}s")
+        return read
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "plays": self.plays,
+            "guilds": len(self.guilds),
+            "users": len(self.users),
+            "rebuilt": self.rebuilt,
+        }
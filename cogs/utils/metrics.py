@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import collections
+import time
+import typing
+
+from aiohttp import web
+from loguru import logger
+
+# Upper bounds in seconds, roughly doubling from 1ms to 30s.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = typing.Tuple[typing.Tuple[str, str], ...]
+Sample = typing.Tuple[str, typing.Dict[str, typing.Any], float]
+Collector = typing.Callable[[], typing.Iterable[Sample]]
+
+
+def merge_exports(exports: typing.Mapping[str, str], label: str = "worker") -> str:
+    """Combines the ``render`` output of several processes, tagging each sample with ``label``."""
+    types: typing.Dict[str, str] = {}
+    samples: typing.Dict[str, typing.List[str]] = collections.defaultdict(list)
+    for source, text in exports.items():
+        tag = f'{label}="{source}"'
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(" ", 3)
+                types.setdefault(name, kind)
+                continue
+            series, _, value = line.rpartition(" ")
+            name, brace, labels = series.partition("{")
+            series = f"{name}{{{tag},{labels}" if brace else f"{name}{{{tag}}}"
+            family = name
+            for suffix in ("_bucket", "_sum", "_count"):
+                if name.endswith(suffix) and name[: -len(suffix)] in types:
+                    family = name[: -len(suffix)]
+            samples[family].append(f"{series} {value}")
+
+    lines = []
+    for family, kind in types.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples.pop(family, ()))
+    for leftover in samples.values():
+        lines.extend(leftover)
+    return "\n".join(lines) + "\n"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; ``observe`` is a bisect and two additions."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+def _labels(labels: typing.Dict[str, typing.Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: typing.Optional[typing.Tuple[str, str]] = None) -> str:
+    pairs = list(labels)
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """In-process registry for counters, histograms and pulled gauges.
+
+    Counters and histograms are updated inline by the code being measured.
+    Gauges are read from ``collectors`` only when the metrics are rendered,
+    so things like queue lengths cost nothing between scrapes.
+    """
+
+    def __init__(self, *, lag_interval: float = 0.5) -> None:
+        self.started_at = time.time()
+        self.lag_interval = lag_interval
+        self.counters: typing.Dict[str, typing.Dict[Labels, float]] = collections.defaultdict(
+            lambda: collections.defaultdict(float)
+        )
+        self.histograms: typing.Dict[str, typing.Dict[Labels, Histogram]] = collections.defaultdict(dict)
+        self.loop_lag = Histogram()
+        self.collectors: typing.List[Collector] = []
+        self._lag_task: typing.Optional[asyncio.Task] = None
+        self._runner: typing.Optional[web.AppRunner] = None
+
+    # -- recording ---------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        self.counters[name][_labels(labels)] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        histogram = self.histograms[name].get(key)
+        if histogram is None:
+            histogram = self.histograms[name][key] = Histogram()
+        histogram.observe(value)
+
+    def observe_upstream(self, upstream: str, seconds: float, error: typing.Optional[BaseException]) -> None:
+        """Observer hook for :class:`Scheduler` and :class:`Storage`."""
+        self.observe("upstream_call_seconds", seconds, upstream=upstream)
+        if error is not None:
+            self.inc("upstream_errors_total", upstream=upstream, error=type(error).__name__)
+
+    def register(self, collector: Collector) -> None:
+        self.collectors.append(collector)
+
+    def unregister(self, collector: Collector) -> None:
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    # -- event loop lag ----------------------------------------------------
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag.observe(max(loop.time() - expected, 0.0))
+
+    # -- export ------------------------------------------------------------
+
+    def gauges(self) -> typing.Dict[str, typing.Dict[Labels, float]]:
+        gauges: typing.Dict[str, typing.Dict[Labels, float]] = collections.defaultdict(dict)
+        for collector in list(self.collectors):
+            try:
+                for name, labels, value in collector():
+                    gauges[name][_labels(labels)] = value
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector!r} failed: {e}")
+        return gauges
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE harmony_uptime_seconds gauge",
+            f"harmony_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        for name, series in self.counters.items():
+            lines.append(f"# TYPE harmony_{name} counter")
+            for labels, value in series.items():
+                lines.append(f"harmony_{name}{_format_labels(labels)} {value}")
+
+        histograms = dict(self.histograms)
+        histograms["event_loop_lag_seconds"] = {(): self.loop_lag}
+        for name, series in histograms.items():
+            lines.append(f"# TYPE harmony_{name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"harmony_{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"harmony_{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"harmony_{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"harmony_{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, series in self.gauges().items():
+            lines.append(f"# TYPE harmony_{name} gauge")
+            for labels, value in series.items():
+                lines.append(f"harmony_{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self, host: typing.Optional[str] = None, port: typing.Optional[int] = None) -> None:
+        """Starts lag sampling, and the HTTP endpoint if a port is given."""
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(self._sample_lag())
+        if port is None or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def close(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
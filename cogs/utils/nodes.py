@@ -0,0 +1,139 @@
+import asyncio
+import re
+import typing
+
+import discord
+import wavelink
+from loguru import logger
+
+# move_player reaches into wavelink 1.3 internals: Player.node, Node._players and
+# Player._voice_state. Other versions get no failover rather than a broken one.
+# wavelink 1.x reports its version as e.g. "V1.3.5".
+WAVELINK_VERSION = tuple(int(part) for part in re.findall(r"\d+", wavelink.__version__)[:2])
+CAN_MOVE_PLAYERS = WAVELINK_VERSION == (1, 3) and hasattr(wavelink.Player, "_dispatch_voice_update")
+
+
+class NodeConfig(typing.NamedTuple):
+    identifier: str
+    host: str
+    port: int
+    password: str
+
+
+def parse_nodes(spec: str) -> typing.List[NodeConfig]:
+    """Parses ``host:port:password`` entries separated by commas."""
+    configs = []
+    for index, entry in enumerate(filter(None, (part.strip() for part in spec.split(",")))):
+        host, port, password = entry.split(":", 2)
+        configs.append(NodeConfig(f"node-{index + 1}", host, int(port), password))
+    return configs
+
+
+class NodeManager:
+    """Places players on the least-loaded Lavalink node and fails over dead ones.
+
+    Load is Lavalink's own penalty score (playing players, CPU and dropped
+    frames) reported through node stats. A background task checks node health
+    every ``check_interval`` seconds and moves the players of a node that has
+    gone away onto the best remaining node, keeping their track and position.
+    The guild's queue lives in its session, so it is untouched by the move.
+    """
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        configs: typing.Sequence[NodeConfig],
+        *,
+        spotify_client=None,
+        check_interval: float = 5.0,
+    ) -> None:
+        self.bot = bot
+        self.configs = list(configs)
+        self.spotify_client = spotify_client
+        self.check_interval = check_interval
+        self._monitor: typing.Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        for config in self.configs:
+            try:
+                await wavelink.NodePool.create_node(
+                    bot=self.bot,
+                    host=config.host,
+                    port=config.port,
+                    password=config.password,
+                    identifier=config.identifier,
+                    spotify_client=self.spotify_client,
+                )
+            except wavelink.NodeOccupied:
+                pass
+        if self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self.spotify_client is not None:
+            await self.spotify_client.session.close()
+
+    @staticmethod
+    def _load(node: wavelink.Node) -> typing.Tuple[bool, float, int]:
+        # Nodes that haven't sent stats yet sort after those that have.
+        return (node.stats is None, node.penalty if node.stats is not None else 0.0, len(node.players))
+
+    def healthy_nodes(self) -> typing.List[wavelink.Node]:
+        return [node for node in wavelink.NodePool._nodes.values() if node.is_connected()]
+
+    def best_node(self, exclude: typing.Collection[wavelink.Node] = ()) -> wavelink.Node:
+        nodes = [node for node in self.healthy_nodes() if node not in exclude]
+        if not nodes:
+            raise wavelink.ZeroConnectedNodes("There are no connected Lavalink nodes.")
+        return min(nodes, key=self._load)
+
+    def new_player(self) -> wavelink.Player:
+        """A player bound to the best node, for ``VoiceChannel.connect(cls=...)``."""
+        return wavelink.Player(node=self.best_node())
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for node in list(wavelink.NodePool._nodes.values()):
+                if node.players and not node.is_connected():
+                    await self.failover(node)
+
+    async def failover(self, dead: wavelink.Node) -> None:
+        if not CAN_MOVE_PLAYERS:
+            logger.error(
+                f"Node {dead.identifier} is down, but moving players needs wavelink 1.3 (found {wavelink.__version__})."
+            )
+            return
+        try:
+            target = self.best_node(exclude=(dead,))
+        except wavelink.ZeroConnectedNodes:
+            logger.warning(f"Node {dead.identifier} is down and there is no node to move its players to.")
+            return
+
+        players = list(dead.players)
+        logger.warning(f"Node {dead.identifier} is down, moving {len(players)} players to {target.identifier}.")
+        for player in players:
+            try:
+                await self.move_player(player, target)
+            except Exception as e:
+                logger.error(f"Failed to move player for guild {player.guild.id}: {e}")
+
+    async def move_player(self, player: wavelink.Player, node: wavelink.Node) -> None:
+        if not CAN_MOVE_PLAYERS:
+            raise RuntimeError(f"Moving players needs wavelink 1.3, found {wavelink.__version__}")
+        source = player.source
+        position = player.position
+        paused = player.is_paused()
+
+        if player in player.node._players:
+            player.node._players.remove(player)
+        player.node = node
+        node._players.append(player)
+
+        # The Discord voice session is still valid; hand it to the new node.
+        await player._dispatch_voice_update(player._voice_state)
+        if source is not None:
+            await player.play(source, start=int(position * 1000), volume=player.volume, pause=paused)
@@ -0,0 +1,92 @@
+import typing
+
+import discord
+
+
+class Paginator(discord.ui.View):
+    """Button-driven embed pager that only renders the page being shown.
+
+    ``render`` is called with a 0-based page index whenever the page changes,
+    and ``page_count`` is re-read each time so the pager follows data that
+    grows or shrinks while it is open. Given a ``version`` callable, rendered
+    pages are kept and reused until the value it returns changes.
+    """
+
+    def __init__(
+        self,
+        author: discord.abc.User,
+        page_count: typing.Callable[[], int],
+        render: typing.Callable[[int], discord.Embed],
+        *,
+        version: typing.Optional[typing.Callable[[], typing.Hashable]] = None,
+        timeout: float = 120.0,
+    ) -> None:
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.page_count = page_count
+        self.render = render
+        self.version = version
+        self._pages: typing.Dict[int, discord.Embed] = {}
+        self._rendered_version: typing.Hashable = None
+        self.page = 0
+        self.message: typing.Optional[discord.Message] = None
+        self._update_buttons()
+
+    def _render(self, page: int) -> discord.Embed:
+        if self.version is None:
+            return self.render(page)
+        version = self.version()
+        if version != self._rendered_version:
+            self._pages.clear()
+            self._rendered_version = version
+        embed = self._pages.get(page)
+        if embed is None:
+            embed = self._pages[page] = self.render(page)
+        return embed
+
+    async def start(self, ctx) -> None:
+        if self.page_count() <= 1:
+            self.stop()
+            self.message = await ctx.send(embed=self._render(0))
+            return
+        self.message = await ctx.send(embed=self._render(0), view=self)
+
+    def _update_buttons(self) -> None:
+        pages = max(self.page_count(), 1)
+        self.page = min(self.page, pages - 1)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= pages - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self._render(self.page), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message("This menu isn't for you.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self) -> None:
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, 0)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, max(self.page - 1, 0))
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self._show(interaction, max(self.page_count() - 1, 0))
@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import typing
+
+import discord
+from loguru import logger
+
+from cogs.utils.session import GuildSession
+from cogs.utils.trackmeta import TrackMetaCache
+
+PANEL = "panel"
+PROGRESS = "panel-progress"
+UP_NEXT = 5
+
+
+def progress_bar(position: float, duration: float, width: int = 16) -> str:
+    filled = min(int(width * position / duration), width - 1) if duration else 0
+    return "▬" * filled + "🔘" + "▬" * (width - filled - 1)
+
+
+class Panel:
+    __slots__ = ("message", "status", "rendered", "buried", "dirty")
+
+    def __init__(self) -> None:
+        self.message: typing.Optional[discord.Message] = None
+        # Footer line describing the last thing that happened, e.g. what was just queued.
+        self.status: typing.Optional[str] = None
+        # Embed last sent, as a dict, so an update that changes nothing costs no request.
+        self.rendered: typing.Optional[dict] = None
+        # Messages posted in the channel since the panel was sent.
+        self.buried = 0
+        self.dirty = False
+
+
+class PanelManager:
+    """Keeps a single "now playing" message per guild and edits it in place.
+
+    ``touch`` only marks the panel dirty and arms a ``debounce`` timer, so a
+    burst of events (a playlist being queued, several commands in a row)
+    turns into one edit. The message is edited in place until more than
+    ``repost_after`` messages have been posted below it; then it is sent
+    again at the bottom and the old one deleted. A render identical to the
+    last one is never sent. With ``progress_interval`` set, playing panels
+    also show a progress bar that is refreshed on that interval.
+    """
+
+    def __init__(
+        self,
+        *,
+        debounce: float = 2.0,
+        repost_after: int = 5,
+        progress_interval: float = 0.0,
+        track_meta: typing.Optional[TrackMetaCache] = None,
+    ) -> None:
+        self.debounce = debounce
+        self.repost_after = repost_after
+        self.progress_interval = progress_interval
+        self.track_meta = track_meta if track_meta is not None else TrackMetaCache()
+
+        self.sent = 0
+        self.edited = 0
+        self.deleted = 0
+        self.coalesced = 0
+        self.unchanged = 0
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "edited": self.edited,
+            "deleted": self.deleted,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+        }
+
+    def touch(self, session: GuildSession, status: typing.Optional[str] = None) -> None:
+        """Schedules a panel update, optionally replacing the status line."""
+        if session.panel is None:
+            session.panel = Panel()
+        if status is not None:
+            session.panel.status = status
+        session.panel.dirty = True
+        if PANEL in session.timers:
+            self.coalesced += 1
+            return
+        loop = asyncio.get_running_loop()
+        session.set_timer(PANEL, loop.call_later(self.debounce, self._start_flush, session))
+        if self.progress_interval and PROGRESS not in session.timers:
+            session.set_timer(PROGRESS, loop.create_task(self._refresh_progress(session)))
+
+    def message_created(self, session: GuildSession, message: discord.Message) -> None:
+        panel = session.panel
+        if panel is not None and panel.message is not None and message.channel.id == panel.message.channel.id:
+            if message.id != panel.message.id:
+                panel.buried += 1
+
+    def _start_flush(self, session: GuildSession) -> None:
+        session.set_timer(PANEL, asyncio.get_running_loop().create_task(self._flush(session)))
+
+    async def _flush(self, session: GuildSession) -> None:
+        panel = session.panel
+        panel.dirty = False
+        try:
+            await self._publish(session, panel)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update the now playing panel for guild {session.guild_id}: {e}")
+        finally:
+            session.timers.pop(PANEL, None)
+        # Anything that happened while the request was in flight gets its own debounced update.
+        if panel.dirty:
+            self.touch(session)
+
+    async def _refresh_progress(self, session: GuildSession) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            player = session.player
+            if player.is_playing() and not player.is_paused():
+                self.touch(session)
+
+    async def _publish(self, session: GuildSession, panel: Panel) -> None:
+        channel = session.text_channel
+        if channel is None:
+            return
+        embed = self.render(session, panel)
+        rendered = embed.to_dict()
+        old = panel.message
+        if old is not None and old.channel.id == channel.id:
+            if rendered == panel.rendered:
+                self.unchanged += 1
+                return
+            if panel.buried <= self.repost_after:
+                try:
+                    panel.message = await old.edit(embed=embed)
+                    panel.rendered = rendered
+                    self.edited += 1
+                    return
+                except discord.NotFound:
+                    old = None
+
+        panel.message = await channel.send(embed=embed)
+        panel.rendered = rendered
+        panel.buried = 0
+        self.sent += 1
+        if old is not None:
+            try:
+                await old.delete()
+                self.deleted += 1
+            except discord.HTTPException:
+                pass
+
+    def render(self, session: GuildSession, panel: Panel) -> discord.Embed:
+        player = session.player
+        track = player.source
+        if track is None:
+            embed = discord.Embed(title="⏹️ | Nothing is playing", colour=discord.Colour.yellow())
+        else:
+            meta = self.track_meta.get(track)
+            icon = "⏸️" if player.is_paused() else "▶️"
+            embed = discord.Embed(
+                title=f"{icon} | Now playing",
+                description=f"**{meta.link}**",
+                colour=discord.Colour.yellow(),
+            )
+            embed.add_field(name="Uploader", value=meta.author, inline=True)
+            if self.progress_interval and meta.length is not None:
+                position = player.position
+                length = f"{progress_bar(position, meta.length)} {meta.time(position)}"
+            else:
+                length = meta.duration
+            embed.add_field(name="Length", value=length, inline=not self.progress_interval)
+
+        modes = [name for name, on in (("🔂 Loop", session.loop), ("📻 Radio", session.radio_mode)) if on]
+        if modes:
+            embed.add_field(name="Mode", value=" · ".join(modes), inline=True)
+        upcoming = list(itertools.islice(session.queue, UP_NEXT))
+        if upcoming:
+            lines = [f"{idx}. {queued.title}" for idx, queued in enumerate(upcoming, start=1)]
+            if len(session.queue) > UP_NEXT:
+                lines.append(f"…and {len(session.queue) - UP_NEXT} more")
+            embed.add_field(name="Up next", value="\n".join(lines), inline=False)
+        if panel.status:
+            embed.set_footer(text=panel.status)
+        return embed
@@ -0,0 +1,162 @@
+import asyncio
+import time
+import typing
+
+from loguru import logger
+
+from cogs.utils.session import GuildSession, SessionRegistry
+from cogs.utils.storage import SessionSnapshot, Storage
+
+Restore = typing.Callable[[SessionSnapshot], typing.Awaitable[bool]]
+
+
+def snapshot_of(session: GuildSession) -> typing.Optional[SessionSnapshot]:
+    """Captures ``session``, or returns ``None`` if it has nothing worth restoring."""
+    player = session.player
+    if player.channel is None:
+        return None
+    tracks = [(track.id, track.info) for track in session.queue]
+    position = 0.0
+    if player.source is not None:
+        tracks.insert(0, (player.source.id, player.source.info))
+        position = player.position
+    if not tracks:
+        return None
+    return SessionSnapshot(
+        session.guild_id,
+        player.channel.id,
+        getattr(session.text_channel, "id", None),
+        position,
+        player.is_paused(),
+        session.loop,
+        session.radio_mode,
+        tracks,
+        time.time(),
+    )
+
+
+def _signature(session: GuildSession) -> typing.Tuple:
+    """Everything in a snapshot except the playback position."""
+    player = session.player
+    return (
+        getattr(player.channel, "id", None),
+        getattr(session.text_channel, "id", None),
+        getattr(player.source, "id", None),
+        id(session.queue),
+        session.queue.version,
+        session.loop,
+        session.radio_mode,
+    )
+
+
+class SessionSnapshotter:
+    """Periodically writes every guild's session to storage so it survives a restart.
+
+    Snapshots are incremental. A session whose tracks, channels and flags
+    are unchanged since the last write only has its position and pause
+    state updated. Full rows are written only for sessions that changed,
+    and rows are deleted for sessions that ended or have nothing queued.
+    """
+
+    def __init__(self, storage: Storage, sessions: SessionRegistry, *, interval: float = 10.0) -> None:
+        self.storage = storage
+        self.sessions = sessions
+        self.interval = interval
+
+        self._signatures: typing.Dict[int, typing.Tuple] = {}
+        self._task: typing.Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.positions = 0
+        self.deleted = 0
+        self.restored = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stops the background task and takes one last snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.snapshot()
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "tracked": len(self._signatures),
+            "written": self.written,
+            "positions": self.positions,
+            "deleted": self.deleted,
+            "restored": self.restored,
+            "failed": self.failed,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logger.error(f"Session snapshot failed: {e}")
+
+    async def snapshot(self) -> None:
+        changed: typing.List[SessionSnapshot] = []
+        positions: typing.List[typing.Tuple[int, float, bool]] = []
+        signatures: typing.Dict[int, typing.Tuple] = {}
+        for session in self.sessions:
+            signature = _signature(session)
+            if self._signatures.get(session.guild_id) == signature:
+                signatures[session.guild_id] = signature
+                player = session.player
+                if player.source is not None:
+                    positions.append((session.guild_id, player.position, player.is_paused()))
+                continue
+            snapshot = snapshot_of(session)
+            if snapshot is not None:
+                signatures[session.guild_id] = signature
+                changed.append(snapshot)
+
+        ended = [guild_id for guild_id in self._signatures if guild_id not in signatures]
+        self._signatures = signatures
+        if changed:
+            await self.storage.save_sessions(*changed)
+        if positions:
+            await self.storage.update_session_positions(positions)
+        if ended:
+            await self.storage.delete_sessions(ended)
+        self.written += len(changed)
+        self.positions += len(positions)
+        self.deleted += len(ended)
+
+    async def restore(self, restore: Restore, *, owned: typing.Callable[[int], bool], limit: int = 10) -> None:
+        """Calls ``restore`` for every stored session this process ``owned``, ``limit`` at a time.
+
+        Rows for guilds owned by another shard are left for that shard.
+        Rows that ``restore`` turns down or fails on are deleted.
+        """
+        snapshots = [snapshot for snapshot in await self.storage.sessions() if owned(snapshot.guild_id)]
+        if not snapshots:
+            return
+        semaphore = asyncio.Semaphore(limit)
+        started = time.perf_counter()
+
+        async def restore_one(snapshot: SessionSnapshot) -> typing.Optional[int]:
+            async with semaphore:
+                try:
+                    if await restore(snapshot):
+                        self.restored += 1
+                        return None
+                except Exception as e:
+                    logger.warning(f"Could not restore the session for guild {snapshot.guild_id}: {e}")
+                self.failed += 1
+                return snapshot.guild_id
+
+        stale = [guild_id for guild_id in await asyncio.gather(*map(restore_one, snapshots)) if guild_id is not None]
+        if stale:
+            await self.storage.delete_sessions(stale)
+        logger.info(
+            f"Restored {len(snapshots) - len(stale)}/{len(snapshots)} sessions "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
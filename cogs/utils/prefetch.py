@@ -0,0 +1,84 @@
+import asyncio
+import typing
+
+import wavelink
+from loguru import logger
+
+from cogs.utils import scheduler
+from cogs.utils.resolver import BatchResolver
+from cogs.utils.session import GuildSession
+
+# Called with the session, how many queries are wanted and the track that just ended, if any.
+Recommender = typing.Callable[[GuildSession, int, typing.Optional[wavelink.Track]], typing.Awaitable[typing.List[str]]]
+
+
+class RadioPrefetcher:
+    """Keeps ``lookahead`` resolved radio tracks ready in each session.
+
+    A background task per guild asks ``recommend`` for search queries,
+    resolves them and appends the tracks to ``session.prefetch``. Popping a
+    track wakes the task again so the buffer refills while music plays.
+    """
+
+    def __init__(self, recommend: Recommender, resolver: BatchResolver, lookahead: int = 3) -> None:
+        self.recommend = recommend
+        self.resolver = resolver
+        self.lookahead = max(1, lookahead)
+
+    def _task(self, session: GuildSession) -> typing.Optional[asyncio.Task]:
+        task = session.timers.get("prefetch")
+        if task is not None and not task.done():
+            return task
+        return None
+
+    def wake(self, session: GuildSession, ended: typing.Optional[wavelink.Track] = None) -> None:
+        if not session.radio_mode or self._task(session) is not None:
+            return
+        if len(session.prefetch) >= self.lookahead:
+            return
+        session.set_timer("prefetch", asyncio.get_running_loop().create_task(self._fill(session, ended)))
+
+    def stop(self, session: GuildSession) -> None:
+        session.cancel_timer("prefetch")
+        session.prefetch.clear()
+
+    async def _fill(self, session: GuildSession, ended: typing.Optional[wavelink.Track]) -> None:
+        with scheduler.priority(scheduler.Priority.BACKGROUND):
+            await self._fill_buffer(session, ended)
+
+    async def _fill_buffer(self, session: GuildSession, ended: typing.Optional[wavelink.Track]) -> None:
+        while session.radio_mode and len(session.prefetch) < self.lookahead:
+            try:
+                queries = await self.recommend(session, self.lookahead - len(session.prefetch), ended)
+            except Exception as e:
+                logger.warning(f"Radio recommendations failed for guild {session.guild_id}: {e}")
+                return
+            if not queries:
+                return
+            added = 0
+            async for result in self.resolver.stream(queries):
+                if result.track is not None:
+                    session.prefetch.append(result.track)
+                    added += 1
+            if not added:
+                return
+
+    async def next(
+        self, session: GuildSession, ended: typing.Optional[wavelink.Track] = None
+    ) -> typing.Optional[wavelink.YouTubeTrack]:
+        """Pops the next radio track, waiting on an in-flight fill only if the buffer ran dry.
+
+        ``ended`` is the track that just finished. The player has already let
+        go of it, so with the buffer empty it is the only seed left for a refill.
+        """
+        if not session.prefetch:
+            task = self._task(session)
+            if task is None:
+                self.wake(session, ended)
+                task = self._task(session)
+            if task is not None:
+                # wait() rather than await so a cancelled fill doesn't cancel the caller.
+                await asyncio.wait({task})
+        track = session.prefetch.popleft() if session.prefetch else None
+        self.wake(session, ended)
+        return track
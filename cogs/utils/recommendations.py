@@ -0,0 +1,121 @@
+import re
+import typing
+
+from cogs.utils.cache import normalize
+from cogs.utils.session import GuildSession
+from cogs.utils.spotify import AsyncSpotify
+
+TrackIdLookup = typing.Callable[[str], typing.Awaitable[typing.Optional[str]]]
+
+# Spotify accepts at most five seeds per recommendations request.
+MAX_SEEDS = 5
+
+_BRACKETED = re.compile(r"[(\[][^)\]]*[)\]]")
+_FEATURING = re.compile(r"\s(?:ft\.?|feat\.?|featuring)\s.*$")
+
+SongKey = typing.Tuple[typing.Optional[str], str]
+
+
+def _clean(part: str) -> str:
+    return normalize(_FEATURING.sub("", part))
+
+
+def _played_key(title: str) -> SongKey:
+    """(artist, song) for a played title such as "Artist - Song (Official Video)"; artist is None without a dash."""
+    artist, dash, song = _BRACKETED.sub(" ", title.casefold()).partition(" - ")
+    if not dash:
+        return None, _clean(artist)
+    return _clean(artist), _clean(song.partition(" - ")[0])
+
+
+def _candidate_keys(track: dict) -> typing.List[SongKey]:
+    """The keys a played copy of a Spotify track could have, by each of its artists or by name alone."""
+    # Spotify appends versions after a dash: "Song - Remastered 2011".
+    song = _clean(_BRACKETED.sub(" ", track['name'].casefold()).partition(" - ")[0])
+    return [(None, song)] + [(normalize(artist['name']), song) for artist in track['artists']]
+
+
+class RecommendationEngine:
+    """Serves Spotify recommendations from a per-guild buffer.
+
+    One request fetches up to ``batch_size`` recommendations seeded from
+    several tracks at once. Tracks already served to the guild or found in
+    its recent history are skipped, and the rest are kept on the session
+    until they are used up.
+    """
+
+    def __init__(
+        self,
+        spotify: AsyncSpotify,
+        track_id: TrackIdLookup,
+        *,
+        batch_size: int = 100,
+        served_limit: int = 1000,
+    ) -> None:
+        self.spotify = spotify
+        self.track_id = track_id
+        self.batch_size = batch_size
+        self.served_limit = served_limit
+        self.requests = 0
+
+    async def _refill(self, session: GuildSession, seeds: typing.Sequence[str], recent_titles: typing.Sequence[str]) -> int:
+        seed_ids = []
+        for seed in seeds:
+            song_id = await self.track_id(seed)
+            if song_id is not None and song_id not in seed_ids:
+                seed_ids.append(song_id)
+            if len(seed_ids) == MAX_SEEDS:
+                break
+        if not seed_ids:
+            return 0
+
+        self.requests += 1
+        results = await self.spotify.recommendations(seed_tracks=seed_ids, limit=self.batch_size)
+        played = {_played_key(title) for title in recent_titles}
+        added = 0
+        for track in results['tracks']:
+            if track['id'] in session.served or track['id'] in seed_ids:
+                continue
+            if any(key in played for key in _candidate_keys(track)):
+                continue
+            session.recommendations.append((track['id'], track['name'] + ' ' + track['artists'][0]['name']))
+            added += 1
+        session.recommendation_seed = normalize(seeds[0])
+        return added
+
+    def _mark_served(self, session: GuildSession, track_id: str) -> None:
+        session.served[track_id] = None
+        while len(session.served) > self.served_limit:
+            del session.served[next(iter(session.served))]
+
+    async def take(
+        self,
+        session: GuildSession,
+        count: int,
+        seeds: typing.Sequence[str],
+        recent_titles: typing.Sequence[str] = (),
+        *,
+        fresh: bool = False,
+    ) -> typing.List[str]:
+        """Returns up to ``count`` search queries for recommended tracks.
+
+        ``seeds`` are track titles, most important first. With ``fresh`` the
+        buffer is discarded unless it was filled from the same first seed,
+        which is what similar-song lookups want; radio mode just keeps going.
+        """
+        if not seeds:
+            return []
+        if fresh and session.recommendation_seed != normalize(seeds[0]):
+            session.recommendations.clear()
+
+        queries = []
+        refilled = False
+        while len(queries) < count:
+            if not session.recommendations:
+                if refilled or not await self._refill(session, seeds, recent_titles):
+                    break
+                refilled = True
+            track_id, query = session.recommendations.popleft()
+            self._mark_served(session, track_id)
+            queries.append(query)
+        return queries
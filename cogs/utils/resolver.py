@@ -0,0 +1,87 @@
+import asyncio
+import collections
+import typing
+
+import wavelink
+
+
+class Resolved(typing.NamedTuple):
+    query: str
+    track: typing.Optional[wavelink.YouTubeTrack]
+    error: typing.Optional[Exception]
+
+
+class BatchResolver:
+    """Resolves many search queries against Lavalink concurrently.
+
+    Lookups run with at most ``limit`` in flight, but results are yielded in
+    the order the queries were given, each one as soon as it and everything
+    before it has finished. A failed lookup is yielded with its error instead
+    of aborting the rest of the batch.
+    """
+
+    def __init__(
+        self,
+        limit: int = 5,
+        search: typing.Optional[typing.Callable[[str], typing.Awaitable[typing.Optional[wavelink.YouTubeTrack]]]] = None,
+    ) -> None:
+        self.limit = max(1, limit)
+        self.search = search
+
+    async def _search(self, query: str) -> typing.Optional[wavelink.YouTubeTrack]:
+        if self.search is not None:
+            return await self.search(query)
+        return await wavelink.YouTubeTrack.search(query=query, return_first=True)
+
+    async def _resolve(self, query: str, semaphore: asyncio.Semaphore) -> Resolved:
+        async with semaphore:
+            try:
+                track = await self._search(query)
+            except Exception as e:
+                return Resolved(query, None, e)
+        if track is None:
+            return Resolved(query, None, LookupError(f"No results for {query!r}"))
+        return Resolved(query, track, None)
+
+    async def stream(self, queries: typing.Iterable[str]) -> typing.AsyncIterator[Resolved]:
+        semaphore = asyncio.Semaphore(self.limit)
+        tasks = [asyncio.ensure_future(self._resolve(query, semaphore)) for query in queries]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream_lazily(
+        self, queries: typing.AsyncIterable[str], window: typing.Optional[int] = None
+    ) -> typing.AsyncIterator[Resolved]:
+        """Like :meth:`stream`, but pulls ``queries`` only as results are consumed.
+
+        At most ``window`` lookups (twice ``limit`` by default) run ahead of
+        the consumer, so a paged source is fetched a page at a time rather
+        than all up front.
+        """
+        window = window or self.limit * 2
+        semaphore = asyncio.Semaphore(self.limit)
+        pending: typing.Deque[asyncio.Future] = collections.deque()
+        iterator = queries.__aiter__()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        query = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.append(asyncio.ensure_future(self._resolve(query, semaphore)))
+                if not pending:
+                    return
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def resolve(self, queries: typing.Iterable[str]) -> typing.List[Resolved]:
+        return [result async for result in self.stream(queries)]
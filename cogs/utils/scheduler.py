@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import contextvars
+import enum
+import itertools
+import time
+import typing
+
+from loguru import logger
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+# Called with (upstream name, seconds, exception or None) after every call.
+Observer = typing.Callable[[str, float, typing.Optional[BaseException]], None]
+
+
+@contextlib.contextmanager
+def priority(level: Priority) -> typing.Iterator[None]:
+    """Runs upstream calls made inside the block (and tasks it spawns) in the given lane."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def wait_unblocked(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now >= self.blocked_until:
+                return
+            await asyncio.sleep(self.blocked_until - now)
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "factory", "future", "key", "enqueued_at", "attempts")
+
+    def __init__(self, priority: Priority, seq: int, factory, future: asyncio.Future, key) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.future = future
+        self.key = key
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _LaneStats:
+    __slots__ = ("queued", "dispatched", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.queued = 0
+        self.dispatched = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class Upstream:
+    def __init__(self, name: str, rate: float, burst: float, concurrency: int, max_retries: int) -> None:
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.queue: "asyncio.PriorityQueue[_Job]" = asyncio.PriorityQueue()
+        self.inflight: typing.Dict[typing.Hashable, asyncio.Future] = {}
+        self.workers: typing.List[asyncio.Task] = []
+        self.lanes = {level: _LaneStats() for level in Priority}
+        self.coalesced = 0
+        self.retries = 0
+
+
+class Scheduler:
+    """Central gate for calls to rate-limited upstream services.
+
+    Each upstream has a token bucket and a fixed number of workers. Jobs are
+    served highest priority first (interactive, then bulk, then background).
+    A failure carrying a ``retry_after`` attribute pauses the bucket for that
+    long and puts the job back in line. Jobs submitted with the same key
+    while one is already queued or running share its result.
+    """
+
+    def __init__(self, *, observer: typing.Optional[Observer] = None) -> None:
+        self._upstreams: typing.Dict[str, Upstream] = {}
+        self._seq = itertools.count()
+        self.observer = observer
+
+    def add_upstream(
+        self,
+        name: str,
+        *,
+        rate: float,
+        burst: float,
+        concurrency: int = 8,
+        max_retries: int = 3,
+    ) -> None:
+        self._upstreams[name] = Upstream(name, rate, burst, concurrency, max_retries)
+
+    def _start(self, upstream: Upstream) -> None:
+        if upstream.workers:
+            return
+        loop = asyncio.get_running_loop()
+        upstream.workers = [loop.create_task(self._work(upstream)) for _ in range(upstream.concurrency)]
+
+    async def close(self) -> None:
+        for upstream in self._upstreams.values():
+            for worker in upstream.workers:
+                worker.cancel()
+            upstream.workers = []
+
+    async def submit(
+        self,
+        name: str,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+        *,
+        key: typing.Optional[typing.Hashable] = None,
+        priority: typing.Optional[Priority] = None,
+    ) -> typing.Any:
+        upstream = self._upstreams[name]
+        self._start(upstream)
+
+        if key is not None:
+            future = upstream.inflight.get(key)
+            if future is not None:
+                upstream.coalesced += 1
+                return await asyncio.shield(future)
+
+        level = _priority.get() if priority is None else priority
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            upstream.inflight[key] = future
+            future.add_done_callback(lambda _: upstream.inflight.pop(key, None))
+        upstream.lanes[level].queued += 1
+        upstream.queue.put_nowait(_Job(level, next(self._seq), factory, future, key))
+        return await asyncio.shield(future)
+
+    async def _work(self, upstream: Upstream) -> None:
+        while True:
+            # Taking the token first keeps the pick by priority: the job is chosen only once it can run.
+            await upstream.bucket.acquire()
+            job = await upstream.queue.get()
+            # The token may predate a backoff that began while this worker sat idle.
+            await upstream.bucket.wait_unblocked()
+
+            lane = upstream.lanes[job.priority]
+            wait = time.monotonic() - job.enqueued_at
+            lane.dispatched += 1
+            lane.wait_total += wait
+            lane.wait_max = max(lane.wait_max, wait)
+
+            started = time.perf_counter()
+            try:
+                result = await job.factory()
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                self._observe(upstream, started, e)
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None and job.attempts < upstream.max_retries:
+                    job.attempts += 1
+                    upstream.retries += 1
+                    upstream.bucket.block(retry_after)
+                    logger.warning(f"{upstream.name} asked us to back off for {retry_after}s")
+                    upstream.queue.put_nowait(job)
+                    continue
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self._observe(upstream, started, None)
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def _observe(self, upstream: Upstream, started: float, error: typing.Optional[BaseException]) -> None:
+        if self.observer is not None:
+            self.observer(upstream.name, time.perf_counter() - started, error)
+
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        stats = {}
+        for name, upstream in self._upstreams.items():
+            lanes = {}
+            for level, lane in upstream.lanes.items():
+                lanes[level.name.lower()] = {
+                    "queued": lane.queued,
+                    "dispatched": lane.dispatched,
+                    "wait_avg": lane.wait_total / lane.dispatched if lane.dispatched else 0.0,
+                    "wait_max": lane.wait_max,
+                }
+            stats[name] = {
+                "depth": upstream.queue.qsize(),
+                "coalesced": upstream.coalesced,
+                "retries": upstream.retries,
+                "lanes": lanes,
+            }
+        return stats
@@ -0,0 +1,125 @@
+import asyncio
+import collections
+import sys
+import time
+import typing
+
+import discord
+import wavelink
+
+from cogs.utils.trackqueue import TrackQueue
+
+
+class GuildSession:
+    """Playback state for one guild.
+
+    Uses ``__slots__`` so an idle session is a handful of pointers; the
+    queue, prefetch buffer and timer table are the only things that grow.
+    """
+
+    __slots__ = (
+        "guild_id",
+        "player",
+        "queue",
+        "text_channel",
+        "panel",
+        "listeners",
+        "loop",
+        "radio_mode",
+        "prefetch",
+        "recommendations",
+        "recommendation_seed",
+        "served",
+        "timers",
+        "created_at",
+    )
+
+    def __init__(
+        self,
+        guild_id: int,
+        player: wavelink.Player,
+        text_channel: typing.Optional[discord.abc.Messageable] = None,
+        *,
+        fair: bool = False,
+    ) -> None:
+        self.guild_id = guild_id
+        self.player = player
+        self.queue = TrackQueue(fair=fair)
+        self.text_channel = text_channel
+        # The now-playing panel; created by PanelManager on first use.
+        self.panel = None
+        # People (not bots) in the bot's voice channel; kept up to date by IdleManager.
+        self.listeners = 0
+        self.loop = False
+        self.radio_mode = False
+        self.prefetch: typing.Deque[wavelink.YouTubeTrack] = collections.deque()
+        # (Spotify track ID, search query) pairs waiting to be used.
+        self.recommendations: typing.Deque[typing.Tuple[str, str]] = collections.deque()
+        self.recommendation_seed: typing.Optional[str] = None
+        # Insertion-ordered set of Spotify IDs already handed out in this guild.
+        self.served: typing.Dict[str, None] = {}
+        self.timers: typing.Dict[str, typing.Union[asyncio.Task, asyncio.TimerHandle]] = {}
+        self.created_at = time.monotonic()
+
+    def set_timer(self, name: str, timer: typing.Union[asyncio.Task, asyncio.TimerHandle]) -> None:
+        self.cancel_timer(name)
+        self.timers[name] = timer
+
+    def cancel_timer(self, name: str) -> None:
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+
+    def close(self) -> None:
+        for name in list(self.timers):
+            self.cancel_timer(name)
+        self.prefetch.clear()
+        self.recommendations.clear()
+        self.served.clear()
+
+    def footprint(self) -> int:
+        """Approximate bytes held by the session itself, excluding the player and tracks."""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.prefetch)
+            + sys.getsizeof(self.recommendations)
+            + sys.getsizeof(self.served)
+            + sys.getsizeof(self.timers)
+        )
+
+
+class SessionRegistry:
+    """Maps guild IDs to their :class:`GuildSession`."""
+
+    def __init__(self, *, fair: bool = False) -> None:
+        # Whether new sessions start with round-robin queueing by requester.
+        self.fair = fair
+        self._sessions: typing.Dict[int, GuildSession] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> typing.Iterator[GuildSession]:
+        return iter(list(self._sessions.values()))
+
+    def get(self, guild_id: int) -> typing.Optional[GuildSession]:
+        return self._sessions.get(guild_id)
+
+    def create(
+        self,
+        guild_id: int,
+        player: wavelink.Player,
+        text_channel: typing.Optional[discord.abc.Messageable] = None,
+    ) -> GuildSession:
+        self.drop(guild_id)
+        session = self._sessions[guild_id] = GuildSession(guild_id, player, text_channel, fair=self.fair)
+        return session
+
+    def drop(self, guild_id: int) -> typing.Optional[GuildSession]:
+        session = self._sessions.pop(guild_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def footprint(self) -> int:
+        return sys.getsizeof(self._sessions) + sum(session.footprint() for session in self._sessions.values())
@@ -0,0 +1,243 @@
+import asyncio
+import base64
+import time
+import typing
+
+import aiohttp
+from loguru import logger
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+# Refresh the access token this many seconds before Spotify says it expires.
+TOKEN_REFRESH_MARGIN = 60
+
+
+class SpotifyError(Exception):
+    def __init__(self, status: int, message: str, retry_after: typing.Optional[float] = None) -> None:
+        super().__init__(f"Spotify returned {status}: {message}")
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class AsyncSpotify:
+    """Non-blocking Spotify Web API client using the client credentials flow.
+
+    Requests go through one pooled keep-alive aiohttp session. The access token
+    is refreshed in the background shortly before it expires, so only the very
+    first call ever waits on the token endpoint. With ``use_threads=True`` the
+    calls are instead made with spotipy on a worker thread, which keeps the
+    event loop free when aiohttp can't be used. If a scheduler is given,
+    every API call is queued through its ``"spotify"`` upstream.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        *,
+        api_url: str = SPOTIFY_API_URL,
+        token_url: str = SPOTIFY_TOKEN_URL,
+        pool_size: int = 20,
+        timeout: float = 10.0,
+        use_threads: bool = False,
+        scheduler=None,
+    ) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip("/")
+        self.token_url = token_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.use_threads = use_threads
+        self.scheduler = scheduler
+
+        self._session: typing.Optional[aiohttp.ClientSession] = None
+        self._token: typing.Optional[str] = None
+        self._token_expires: float = 0.0
+        self._token_lock = asyncio.Lock()
+        self._refresh_task: typing.Optional[asyncio.Task] = None
+        self._spotipy = None
+
+    # -- transport ---------------------------------------------------------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # -- token handling ----------------------------------------------------
+
+    def _token_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._token_expires
+
+    async def _fetch_token(self) -> None:
+        credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        session = self._get_session()
+        async with session.post(
+            self.token_url,
+            data={"grant_type": "client_credentials"},
+            headers={"Authorization": f"Basic {credentials}"},
+        ) as resp:
+            payload = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise SpotifyError(resp.status, payload.get("error_description", "token request failed"))
+
+        expires_in = int(payload.get("expires_in", 3600))
+        self._token = payload["access_token"]
+        self._token_expires = time.monotonic() + expires_in
+        self._schedule_refresh(max(expires_in - TOKEN_REFRESH_MARGIN, 1))
+
+    def _schedule_refresh(self, delay: float) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            if self._refresh_task is not asyncio.current_task():
+                self._refresh_task.cancel()
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            async with self._token_lock:
+                await self._fetch_token()
+        except Exception as e:
+            # The old token is still good for TOKEN_REFRESH_MARGIN seconds; the
+            # next request will retry inline if it lapses.
+            logger.warning(f"Spotify token refresh failed: {e}")
+
+    async def _get_token(self) -> str:
+        if self._token_valid():
+            return self._token
+        async with self._token_lock:
+            if not self._token_valid():
+                await self._fetch_token()
+            return self._token
+
+    async def _call(self, key: typing.Hashable, factory: typing.Callable[[], typing.Awaitable[dict]]) -> dict:
+        if self.scheduler is None:
+            return await factory()
+        return await self.scheduler.submit("spotify", factory, key=key)
+
+    async def _request(self, path: str, params: typing.Optional[dict] = None) -> dict:
+        key = (path, tuple(sorted((params or {}).items())))
+        return await self._call(key, lambda: self._send(path, params))
+
+    async def _send(self, path: str, params: typing.Optional[dict] = None) -> dict:
+        token = await self._get_token()
+        session = self._get_session()
+        async with session.get(
+            f"{self.api_url}{path}",
+            params=params,
+            headers={"Authorization": f"Bearer {token}"},
+        ) as resp:
+            if resp.status == 401:
+                # Token was revoked early; drop it so the next call fetches a new one.
+                self._token = None
+            if resp.status >= 400:
+                retry_after = resp.headers.get("Retry-After")
+                try:
+                    payload = await resp.json(content_type=None)
+                    message = payload.get("error", {}).get("message", resp.reason)
+                except (aiohttp.ContentTypeError, ValueError, AttributeError):
+                    message = resp.reason
+                raise SpotifyError(
+                    resp.status,
+                    message,
+                    float(retry_after) if retry_after is not None else None,
+                )
+            return await resp.json(content_type=None)
+
+    # -- spotipy fallback --------------------------------------------------
+
+    def _get_spotipy(self):
+        if self._spotipy is None:
+            import spotipy
+            from spotipy.oauth2 import SpotifyClientCredentials
+
+            self._spotipy = spotipy.Spotify(
+                client_credentials_manager=SpotifyClientCredentials(
+                    client_id=self.client_id, client_secret=self.client_secret
+                ),
+                requests_timeout=self.timeout,
+                # spotipy would sleep out a 429 on the worker thread and then raise without the headers;
+                # let it through so the scheduler sees Retry-After and backs off for every caller.
+                status_forcelist=tuple(code for code in spotipy.Spotify.default_retry_codes if code != 429),
+            )
+        return self._spotipy
+
+    async def _run_threaded(self, method: str, *args, **kwargs) -> dict:
+        client = self._get_spotipy()
+        key = (method, args, tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items())))
+
+        def call() -> dict:
+            from spotipy import SpotifyException
+
+            try:
+                return getattr(client, method)(*args, **kwargs)
+            except SpotifyException as e:
+                # Same error type as the aiohttp transport, so callers handle one exception.
+                retry_after = (e.headers or {}).get("Retry-After")
+                raise SpotifyError(
+                    e.http_status,
+                    e.msg,
+                    float(retry_after) if retry_after is not None else None,
+                ) from e
+
+        return await self._call(key, lambda: asyncio.to_thread(call))
+
+    # -- API ---------------------------------------------------------------
+
+    async def search(self, q: str, limit: int = 10, type: str = "track") -> dict:
+        if self.use_threads:
+            return await self._run_threaded("search", q=q, limit=limit, type=type)
+        return await self._request("/search", {"q": q, "limit": limit, "type": type})
+
+    async def recommendations(
+        self,
+        seed_tracks: typing.Optional[typing.List[str]] = None,
+        seed_genres: typing.Optional[typing.List[str]] = None,
+        limit: int = 20,
+    ) -> dict:
+        if self.use_threads:
+            return await self._run_threaded(
+                "recommendations", seed_tracks=seed_tracks, seed_genres=seed_genres, limit=limit
+            )
+        params = {"limit": limit}
+        if seed_tracks:
+            params["seed_tracks"] = ",".join(seed_tracks)
+        if seed_genres:
+            params["seed_genres"] = ",".join(seed_genres)
+        return await self._request("/recommendations", params)
+
+    async def playlist_tracks(self, playlist_id: str, offset: int = 0, limit: int = 100) -> dict:
+        """One page of a playlist's items; ``next`` is ``None`` on the last page."""
+        if self.use_threads:
+            return await self._run_threaded("playlist_items", playlist_id, offset=offset, limit=limit)
+        return await self._request(f"/playlists/{playlist_id}/tracks", {"offset": offset, "limit": limit})
+
+    async def album_tracks(self, album_id: str, offset: int = 0, limit: int = 50) -> dict:
+        """One page of an album's tracks; ``next`` is ``None`` on the last page."""
+        if self.use_threads:
+            return await self._run_threaded("album_tracks", album_id, offset=offset, limit=limit)
+        return await self._request(f"/albums/{album_id}/tracks", {"offset": offset, "limit": limit})
+
+    async def recommendation_genre_seeds(self) -> dict:
+        if self.use_threads:
+            return await self._run_threaded("recommendation_genre_seeds")
+        return await self._request("/recommendations/available-genre-seeds")
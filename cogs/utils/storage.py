@@ -0,0 +1,578 @@
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+import zlib
+
+from loguru import logger
+
+# Each entry upgrades the schema by one version; see Storage._migrate_schema.
+MIGRATIONS = (
+    (
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            user_id INTEGER,
+            requestor TEXT NOT NULL,
+            song_name TEXT NOT NULL,
+            song_url TEXT,
+            played_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS history_guild ON history (guild_id, played_at)",
+        "CREATE INDEX IF NOT EXISTS history_user ON history (user_id, played_at)",
+        "CREATE INDEX IF NOT EXISTS history_time ON history (played_at)",
+        """
+        CREATE TABLE IF NOT EXISTS playlists (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            playlist_name TEXT NOT NULL,
+            song_name TEXT NOT NULL,
+            song_url TEXT,
+            added_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS playlists_user ON playlists (user_id, playlist_name)",
+    ),
+    (
+        "ALTER TABLE playlists RENAME TO playlists_v1",
+        "DROP INDEX IF EXISTS playlists_user",
+        """
+        CREATE TABLE playlists (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE (user_id, name)
+        )
+        """,
+        """
+        CREATE TABLE playlist_entries (
+            id INTEGER PRIMARY KEY,
+            playlist_id INTEGER NOT NULL REFERENCES playlists (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            song_name TEXT NOT NULL,
+            song_url TEXT,
+            track_id TEXT,
+            track_info TEXT
+        )
+        """,
+        "CREATE INDEX playlist_entries_order ON playlist_entries (playlist_id, position)",
+        """
+        INSERT INTO playlists (user_id, name, created_at)
+        SELECT user_id, playlist_name, MIN(added_at) FROM playlists_v1 GROUP BY user_id, playlist_name
+        """,
+        """
+        INSERT INTO playlist_entries (playlist_id, position, song_name, song_url)
+        SELECT p.id,
+               (SELECT COUNT(*) FROM playlists_v1 o
+                WHERE o.user_id = v.user_id AND o.playlist_name = v.playlist_name AND o.id < v.id),
+               v.song_name, v.song_url
+        FROM playlists_v1 v JOIN playlists p ON p.user_id = v.user_id AND p.name = v.playlist_name
+        """,
+        "DROP TABLE playlists_v1",
+    ),
+    (
+        """
+        CREATE TABLE sessions (
+            guild_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            text_channel_id INTEGER,
+            position REAL NOT NULL,
+            paused INTEGER NOT NULL,
+            loop INTEGER NOT NULL,
+            radio_mode INTEGER NOT NULL,
+            tracks BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+    ),
+    (
+        """
+        CREATE TABLE legacy_imports (
+            path TEXT PRIMARY KEY,
+            records INTEGER NOT NULL,
+            imported_at REAL NOT NULL
+        )
+        """,
+    ),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class HistoryRecord(typing.NamedTuple):
+    guild_id: typing.Optional[int]
+    user_id: typing.Optional[int]
+    requestor: str
+    song_name: str
+    song_url: typing.Optional[str]
+    played_at: float
+
+
+class PlaylistEntry(typing.NamedTuple):
+    song_name: str
+    song_url: typing.Optional[str]
+    # Lavalink's encoded track and its info, so the entry can be queued without a search.
+    track_id: typing.Optional[str] = None
+    track_info: typing.Optional[dict] = None
+
+
+class SessionSnapshot(typing.NamedTuple):
+    guild_id: int
+    channel_id: int
+    text_channel_id: typing.Optional[int]
+    # Seconds into the first track, which is the one that was playing.
+    position: float
+    paused: bool
+    loop: bool
+    radio_mode: bool
+    # (Lavalink track ID, track info) for the current track followed by the queue.
+    tracks: typing.List[typing.Tuple[str, dict]]
+    updated_at: float
+
+
+def shard_filter(shard_ids: typing.Optional[typing.Sequence[int]], shard_count: int) -> typing.Tuple[str, list]:
+    """An SQL condition on ``guild_id`` keeping the rows of guilds on ``shard_ids``, with its parameters.
+
+    Uses Discord's guild-to-shard formula. Rows without a guild count as
+    shard 0, where Discord sends direct messages. ``None`` keeps every row.
+    """
+    if shard_ids is None:
+        return "1", []
+    return f"(COALESCE(guild_id, 0) >> 22) % ? IN ({', '.join('?' * len(shard_ids))})", [shard_count, *shard_ids]
+
+
+def encode_tracks(tracks: typing.Sequence[typing.Tuple[str, dict]]) -> bytes:
+    return zlib.compress(json.dumps(tracks, separators=(",", ":")).encode())
+
+
+def decode_tracks(blob: bytes) -> typing.List[typing.Tuple[str, dict]]:
+    return [tuple(track) for track in json.loads(zlib.decompress(blob))]
+
+
+class Storage:
+    """SQLite-backed store for play history, playlists and session snapshots.
+
+    The database runs in WAL mode so appends are cheap and readers never
+    block the writer. Every query has a blocking ``_name`` implementation and
+    an async wrapper that runs it on a worker thread.
+    """
+
+    def __init__(self, path: str, *, observer=None) -> None:
+        self.path = path
+        # Called with ("sqlite", seconds, exception or None) after every query.
+        self.observer = observer
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate_schema()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> typing.Iterator[sqlite3.Connection]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two worker processes
+            # can't both read and then deadlock trying to upgrade; the loser
+            # waits out sqlite3's default 5s busy timeout instead.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _migrate_schema(self) -> None:
+        with self._transaction() as conn:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            for statements in MIGRATIONS[version:]:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    async def _run(self, func, *args):
+        if self.observer is None:
+            return await asyncio.to_thread(func, *args)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(func, *args)
+        except Exception as e:
+            self.observer("sqlite", time.perf_counter() - started, e)
+            raise
+        self.observer("sqlite", time.perf_counter() - started, None)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- history -----------------------------------------------------------
+
+    def _add_history(self, records: typing.Iterable[HistoryRecord]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO history (guild_id, user_id, requestor, song_name, song_url, played_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                records,
+            )
+
+    async def add_history(self, *records: HistoryRecord) -> None:
+        await self._run(self._add_history, records)
+
+    def _recent_history(self, guild_id: int, limit: int) -> typing.List[HistoryRecord]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id, user_id, requestor, song_name, song_url, played_at FROM history"
+                " WHERE guild_id = ? ORDER BY played_at DESC LIMIT ?",
+                (guild_id, limit),
+            ).fetchall()
+        return [HistoryRecord(*row) for row in rows]
+
+    async def recent_history(self, guild_id: int, limit: int = 10) -> typing.List[HistoryRecord]:
+        return await self._run(self._recent_history, guild_id, limit)
+
+    def _recent_history_by_guild(
+        self, limit: int, shard_ids: typing.Optional[typing.Sequence[int]], shard_count: int
+    ) -> typing.List[HistoryRecord]:
+        # Both queries walk the history_guild index: the first hops from one guild ID to the next,
+        # the second reads only the newest ``limit`` entries of each guild, so neither scans the table.
+        on_shards, params = shard_filter(shard_ids, shard_count)
+        with self._lock:
+            guild_ids = self._conn.execute(
+                "WITH RECURSIVE guilds (guild_id) AS ("
+                " SELECT MIN(guild_id) FROM history"
+                " UNION ALL"
+                " SELECT (SELECT MIN(guild_id) FROM history WHERE guild_id > guilds.guild_id) FROM guilds"
+                " WHERE guild_id IS NOT NULL"
+                f") SELECT guild_id FROM guilds WHERE guild_id IS NOT NULL AND {on_shards}",
+                params,
+            ).fetchall()
+            rows = []
+            for (guild_id,) in guild_ids:
+                rows += self._conn.execute(
+                    "SELECT guild_id, user_id, requestor, song_name, song_url, played_at FROM history"
+                    " WHERE guild_id = ? ORDER BY played_at DESC LIMIT ?",
+                    (guild_id, limit),
+                ).fetchall()
+        return [HistoryRecord(*row) for row in rows]
+
+    async def recent_history_by_guild(
+        self, limit: int, *, shard_ids: typing.Optional[typing.Sequence[int]] = None, shard_count: int = 1
+    ) -> typing.List[HistoryRecord]:
+        """Returns up to ``limit`` of the newest records for every guild on ``shard_ids``, newest first.
+
+        With ``shard_ids`` left out, every guild's records are returned.
+        """
+        return await self._run(self._recent_history_by_guild, limit, shard_ids, shard_count)
+
+    def _last_history_id(self) -> int:
+        with self._lock:
+            (last_id,) = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()
+        return last_id
+
+    async def last_history_id(self) -> int:
+        return await self._run(self._last_history_id)
+
+    def _history_after(
+        self,
+        after_id: int,
+        until_id: int,
+        limit: int,
+        shard_ids: typing.Optional[typing.Sequence[int]],
+        shard_count: int,
+    ) -> typing.List[typing.Tuple[int, HistoryRecord]]:
+        on_shards, params = shard_filter(shard_ids, shard_count)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, guild_id, user_id, requestor, song_name, song_url, played_at FROM history"
+                f" WHERE id > ? AND id <= ? AND {on_shards} ORDER BY id LIMIT ?",
+                (after_id, until_id, *params, limit),
+            ).fetchall()
+        return [(row[0], HistoryRecord(*row[1:])) for row in rows]
+
+    async def history_after(
+        self,
+        after_id: int,
+        until_id: int,
+        limit: int,
+        *,
+        shard_ids: typing.Optional[typing.Sequence[int]] = None,
+        shard_count: int = 1,
+    ) -> typing.List[typing.Tuple[int, HistoryRecord]]:
+        """Records with IDs in ``(after_id, until_id]`` in insertion order, for paging through all history.
+
+        With ``shard_ids``, only records from guilds on those shards are returned.
+        """
+        return await self._run(self._history_after, after_id, until_id, limit, shard_ids, shard_count)
+
+    # -- playlists ---------------------------------------------------------
+
+    def _playlist_id(self, conn: sqlite3.Connection, user_id: int, name: str, create: bool = False) -> typing.Optional[int]:
+        row = conn.execute(
+            "SELECT id FROM playlists WHERE user_id = ? AND name = ?", (user_id, name)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        return conn.execute(
+            "INSERT INTO playlists (user_id, name, created_at) VALUES (?, ?, ?)",
+            (user_id, name, time.time()),
+        ).lastrowid
+
+    def _add_playlist_entries(self, user_id: int, name: str, entries: typing.Sequence[PlaylistEntry]) -> int:
+        with self._transaction() as conn:
+            return self._append_entries(conn, user_id, name, entries)
+
+    def _append_entries(
+        self, conn: sqlite3.Connection, user_id: int, name: str, entries: typing.Sequence[PlaylistEntry]
+    ) -> int:
+        playlist_id = self._playlist_id(conn, user_id, name, create=True)
+        (start,) = conn.execute(
+            "SELECT COUNT(*) FROM playlist_entries WHERE playlist_id = ?", (playlist_id,)
+        ).fetchone()
+        conn.executemany(
+            "INSERT INTO playlist_entries (playlist_id, position, song_name, song_url, track_id, track_info)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    playlist_id,
+                    start + offset,
+                    entry.song_name,
+                    entry.song_url,
+                    entry.track_id,
+                    json.dumps(entry.track_info) if entry.track_info is not None else None,
+                )
+                for offset, entry in enumerate(entries)
+            ],
+        )
+        return start + len(entries)
+
+    async def add_playlist_entries(self, user_id: int, name: str, entries: typing.Sequence[PlaylistEntry]) -> int:
+        """Appends ``entries`` to the playlist, creating it if needed, and returns its new length."""
+        return await self._run(self._add_playlist_entries, user_id, name, entries)
+
+    def _remove_playlist_entries(self, user_id: int, name: str, positions: typing.Iterable[int]) -> int:
+        with self._transaction() as conn:
+            playlist_id = self._playlist_id(conn, user_id, name)
+            if playlist_id is None:
+                return 0
+            removed = conn.executemany(
+                "DELETE FROM playlist_entries WHERE playlist_id = ? AND position = ?",
+                [(playlist_id, position) for position in set(positions)],
+            ).rowcount
+            ids = conn.execute(
+                "SELECT id FROM playlist_entries WHERE playlist_id = ? ORDER BY position", (playlist_id,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE playlist_entries SET position = ? WHERE id = ?",
+                [(position, entry_id) for position, (entry_id,) in enumerate(ids)],
+            )
+        return removed
+
+    async def remove_playlist_entries(self, user_id: int, name: str, positions: typing.Iterable[int]) -> int:
+        """Removes the entries at the given 0-based positions and closes the gaps."""
+        return await self._run(self._remove_playlist_entries, user_id, name, list(positions))
+
+    def _delete_playlist(self, user_id: int, name: str) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM playlists WHERE user_id = ? AND name = ?", (user_id, name)
+            ).rowcount > 0
+
+    async def delete_playlist(self, user_id: int, name: str) -> bool:
+        return await self._run(self._delete_playlist, user_id, name)
+
+    def _playlist_names(self, user_id: int) -> typing.List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM playlists WHERE user_id = ? ORDER BY name", (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    async def playlist_names(self, user_id: int) -> typing.List[str]:
+        return await self._run(self._playlist_names, user_id)
+
+    def _playlist_entries(self, user_id: int, name: str) -> typing.Optional[typing.List[PlaylistEntry]]:
+        with self._lock:
+            playlist_id = self._playlist_id(self._conn, user_id, name)
+            if playlist_id is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT song_name, song_url, track_id, track_info FROM playlist_entries"
+                " WHERE playlist_id = ? ORDER BY position",
+                (playlist_id,),
+            ).fetchall()
+        return [
+            PlaylistEntry(song_name, song_url, track_id, json.loads(track_info) if track_info else None)
+            for song_name, song_url, track_id, track_info in rows
+        ]
+
+    async def playlist_entries(self, user_id: int, name: str) -> typing.Optional[typing.List[PlaylistEntry]]:
+        """Returns the playlist's entries in order, or ``None`` if it doesn't exist."""
+        return await self._run(self._playlist_entries, user_id, name)
+
+    def _set_playlist_tracks(self, user_id: int, name: str, tracks: typing.Dict[int, typing.Tuple[str, dict]]) -> None:
+        with self._transaction() as conn:
+            playlist_id = self._playlist_id(conn, user_id, name)
+            if playlist_id is None:
+                return
+            conn.executemany(
+                "UPDATE playlist_entries SET track_id = ?, track_info = ? WHERE playlist_id = ? AND position = ?",
+                [
+                    (track_id, json.dumps(info), playlist_id, position)
+                    for position, (track_id, info) in tracks.items()
+                ],
+            )
+
+    async def set_playlist_tracks(self, user_id: int, name: str, tracks: typing.Dict[int, typing.Tuple[str, dict]]) -> None:
+        """Stores resolved Lavalink tracks for entries that were saved without one."""
+        await self._run(self._set_playlist_tracks, user_id, name, tracks)
+
+    # -- sessions ----------------------------------------------------------
+
+    def _save_sessions(self, snapshots: typing.Iterable[SessionSnapshot]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions (guild_id, channel_id, text_channel_id, position, paused, loop,"
+                " radio_mode, tracks, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    snapshot._replace(tracks=encode_tracks(snapshot.tracks))
+                    for snapshot in snapshots
+                ],
+            )
+
+    async def save_sessions(self, *snapshots: SessionSnapshot) -> None:
+        await self._run(self._save_sessions, snapshots)
+
+    def _update_session_positions(self, positions: typing.Iterable[typing.Tuple[int, float, bool]]) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE sessions SET position = ?, paused = ?, updated_at = ? WHERE guild_id = ?",
+                [(position, paused, now, guild_id) for guild_id, position, paused in positions],
+            )
+
+    async def update_session_positions(self, positions: typing.Iterable[typing.Tuple[int, float, bool]]) -> None:
+        """Updates only the playback position and pause state of already saved sessions."""
+        await self._run(self._update_session_positions, list(positions))
+
+    def _delete_sessions(self, guild_ids: typing.Iterable[int]) -> None:
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM sessions WHERE guild_id = ?", [(guild_id,) for guild_id in guild_ids])
+
+    async def delete_sessions(self, guild_ids: typing.Iterable[int]) -> None:
+        await self._run(self._delete_sessions, list(guild_ids))
+
+    def _sessions(self) -> typing.List[SessionSnapshot]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id, channel_id, text_channel_id, position, paused, loop, radio_mode, tracks, updated_at"
+                " FROM sessions"
+            ).fetchall()
+        return [
+            SessionSnapshot(
+                guild_id, channel_id, text_channel_id, position, bool(paused), bool(loop), bool(radio_mode),
+                decode_tracks(tracks), updated_at,
+            )
+            for guild_id, channel_id, text_channel_id, position, paused, loop, radio_mode, tracks, updated_at in rows
+        ]
+
+    async def sessions(self) -> typing.List[SessionSnapshot]:
+        return await self._run(self._sessions)
+
+    # -- TinyDB migration --------------------------------------------------
+
+    def _migrate_tinydb(self, json_path: str) -> int:
+        """Imports a legacy TinyDB file and renames it so it only runs once.
+
+        The import is a single transaction that also records the file in
+        ``legacy_imports``: it happens completely or not at all, and a file
+        still in place after a committed import is only renamed. A
+        ``.migrating`` file, left by earlier versions when they died part-way
+        through an import, is resumed without duplicating what got in.
+        """
+        leftover_path = json_path + ".migrating"
+        with self._transaction() as conn:
+            # The write lock is held from here on, so worker processes take turns and the later ones find the import recorded.
+            source = next((path for path in (json_path, leftover_path) if os.path.exists(path)), None)
+            if source is None:
+                return 0
+            if conn.execute("SELECT 1 FROM legacy_imports WHERE path = ?", (json_path,)).fetchone() is None:
+                history, playlists = self._insert_tinydb(conn, source, resume=source == leftover_path)
+                conn.execute(
+                    "INSERT INTO legacy_imports (path, records, imported_at) VALUES (?, ?, ?)",
+                    (json_path, history + playlists, time.time()),
+                )
+            else:
+                history = playlists = 0
+
+        # Another worker may have renamed it between its commit and ours.
+        with contextlib.suppress(FileNotFoundError):
+            os.replace(source, json_path + ".migrated")
+        if history or playlists:
+            logger.info(f"Migrated {history} history and {playlists} playlist records from {source}")
+        return history + playlists
+
+    def _insert_tinydb(self, conn: sqlite3.Connection, path: str, *, resume: bool) -> typing.Tuple[int, int]:
+        with open(path, "r", encoding="utf-8") as read_file:
+            data = json.load(read_file)
+
+        history = []
+        playlists: typing.Dict[typing.Tuple[int, str], typing.List[PlaylistEntry]] = {}
+        for table in data.values():
+            for document in table.values():
+                if "playlist_name" in document:
+                    playlists.setdefault((document["user_id"], document["playlist_name"]), []).append(
+                        PlaylistEntry(document["song_name"], document.get("song_url"))
+                    )
+                else:
+                    history.append((
+                        None,
+                        None,
+                        document.get("requestor", ""),
+                        document["song_name"],
+                        document.get("song_url"),
+                        _parse_legacy_time(document.get("time")),
+                    ))
+
+        if resume:
+            # Earlier versions committed all the history in one go and then each playlist on its own,
+            # so if anything got in, all the history did, and a playlist is either complete or missing.
+            (imported,) = conn.execute("SELECT COUNT(*) FROM history WHERE guild_id IS NULL").fetchone()
+            if imported:
+                history = []
+            playlists = {
+                key: entries for key, entries in playlists.items() if self._playlist_id(conn, *key) is None
+            }
+
+        conn.executemany(
+            "INSERT INTO history (guild_id, user_id, requestor, song_name, song_url, played_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            history,
+        )
+        for (user_id, name), entries in playlists.items():
+            self._append_entries(conn, user_id, name, entries)
+        return len(history), sum(len(entries) for entries in playlists.values())
+
+    async def migrate_tinydb(self, json_path: str) -> int:
+        return await self._run(self._migrate_tinydb, json_path)
+
+
+def _parse_legacy_time(value: typing.Optional[str]) -> float:
+    # TinyDB records were written as "%H:%M:%S|%m/%d/%Y" in local time.
+    try:
+        return datetime.datetime.strptime(value, "%H:%M:%S|%m/%d/%Y").timestamp()
+    except (TypeError, ValueError):
+        return 0.0
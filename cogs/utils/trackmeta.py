@@ -0,0 +1,91 @@
+import collections
+import typing
+
+import discord
+import wavelink
+
+LIVE = "🔴 LIVE"
+COLOUR = discord.Colour.yellow().value
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}" if hours else f"{minutes:02}:{seconds:02}"
+
+
+class TrackMeta:
+    """Display strings for one track, formatted once and shared by every guild playing it.
+
+    Besides the strings, it holds the parts of the ``nowplaying`` embed that
+    never change, so a request only formats the position.
+    """
+
+    __slots__ = (
+        "identifier", "title", "author", "source", "uri", "length", "duration", "link", "_embed", "_before", "_after"
+    )
+
+    def __init__(self, track: wavelink.Track) -> None:
+        info = track.info
+        self.identifier: str = info.get("identifier") or track.id
+        self.title: str = track.title
+        self.author: str = track.author or "Unknown"
+        self.source: str = (info.get("sourceName") or "unknown").upper()
+        self.uri: typing.Optional[str] = track.uri
+        # Seconds, or None for a stream.
+        self.length: typing.Optional[float] = None if track.is_stream() else track.duration
+        self.duration = LIVE if self.length is None else format_duration(self.length)
+        self.link = f"[{self.title}]({self.uri})" if self.uri else self.title
+
+        self._embed = {"type": "rich", "title": "Now Playing", "color": COLOUR, "footer": {"text": "Harmony"}}
+        self._before = (
+            {"name": self.title, "value": " ", "inline": False},
+            {"name": "Uploader", "value": self.author, "inline": True},
+        )
+        self._after = (
+            {"name": "Source", "value": self.source, "inline": True},
+            {"name": "URL", "value": self.link, "inline": False},
+        )
+
+    def time(self, position: float) -> str:
+        if self.length is None:
+            return LIVE
+        return f"{format_duration(position)}/{self.duration}"
+
+    def now_playing(self, position: float) -> discord.Embed:
+        """The ``nowplaying`` embed at ``position`` seconds in.
+
+        The returned embed shares its field dicts with every other one built
+        for this track, so callers must not modify its fields in place.
+        """
+        time_field = {"name": "Time", "value": self.time(position), "inline": True}
+        return discord.Embed.from_dict({**self._embed, "fields": [*self._before, time_field, *self._after]})
+
+
+class TrackMetaCache:
+    """Interns :class:`TrackMeta` records by track identifier, keeping the ``size`` most recently used."""
+
+    def __init__(self, size: int = 2000) -> None:
+        self.size = size
+        self._entries: "collections.OrderedDict[str, TrackMeta]" = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, track: wavelink.Track) -> TrackMeta:
+        key = track.info.get("identifier") or track.id
+        meta = self._entries.get(key)
+        if meta is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return meta
+        self.misses += 1
+        meta = self._entries[key] = TrackMeta(track)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return meta
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
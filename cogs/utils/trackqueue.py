@@ -0,0 +1,343 @@
+import random
+import typing
+
+import wavelink
+
+Requester = typing.Optional[int]
+
+
+class _Node:
+    __slots__ = ("track", "requester", "round", "priority", "size", "left", "right")
+
+    def __init__(self, track: wavelink.Track, requester: Requester, round_: int) -> None:
+        self.track = track
+        self.requester = requester
+        self.round = round_
+        self.priority = random.random()
+        self.size = 1
+        self.left: typing.Optional[_Node] = None
+        self.right: typing.Optional[_Node] = None
+
+
+def _size(node: typing.Optional[_Node]) -> int:
+    return node.size if node is not None else 0
+
+
+def _update(node: _Node) -> _Node:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _merge(left: typing.Optional[_Node], right: typing.Optional[_Node]) -> typing.Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _split(node: typing.Optional[_Node], index: int) -> typing.Tuple[typing.Optional[_Node], typing.Optional[_Node]]:
+    """Splits ``node`` into its first ``index`` entries and the rest."""
+    if node is None:
+        return None, None
+    if _size(node.left) >= index:
+        left, node.left = _split(node.left, index)
+        return left, _update(node)
+    node.right, right = _split(node.right, index - _size(node.left) - 1)
+    return _update(node), right
+
+
+def _length(track: wavelink.Track) -> int:
+    """Track length in whole milliseconds; streams count as zero."""
+    return 0 if track.is_stream() else int(track.info.get("length", 0))
+
+
+def _build(nodes: typing.Sequence[_Node]) -> typing.Optional[_Node]:
+    """Builds a treap holding ``nodes`` in order in O(n), using a stack along the right spine."""
+    spine: typing.List[_Node] = []
+    for node in nodes:
+        node.left = node.right = None
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = _update(spine.pop())
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+    root = spine[0] if spine else None
+    while spine:
+        _update(spine.pop())
+    return root
+
+
+class TrackQueue:
+    """A guild's upcoming tracks, indexed by position.
+
+    The tracks are held in an implicit treap, a randomly balanced binary
+    tree ordered by position, so inserting, removing or moving the track at
+    any position is O(log n) and appending a batch of k tracks is O(k + log n).
+    A count per track ID makes duplicate checks O(1), and a running total
+    of track lengths keeps :attr:`duration` O(1) too.
+
+    With ``fair`` on, tracks are queued round-robin by requester: each
+    person's next track goes after everyone else's track from the same
+    round, so one user queueing a hundred songs doesn't hold up the next
+    person's one. Moving tracks by hand overrides that order.
+    """
+
+    def __init__(self, *, fair: bool = False) -> None:
+        self.fair = fair
+        # Bumped on every change, so callers can tell the queue changed without walking it.
+        self.version = 0
+        self._root: typing.Optional[_Node] = None
+        self._ids: typing.Dict[str, int] = {}
+        self._length = 0
+        # Fair-share bookkeeping: the round being played and the last round each requester was given.
+        self._round = 0
+        self._rounds: typing.Dict[Requester, int] = {}
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __bool__(self) -> bool:
+        return self._root is not None
+
+    def __iter__(self) -> typing.Iterator[wavelink.Track]:
+        for node in self._nodes():
+            yield node.track
+
+    def __contains__(self, track: typing.Union[str, wavelink.Track]) -> bool:
+        """Whether a track, or a track ID, is queued."""
+        return (track if isinstance(track, str) else track.id) in self._ids
+
+    def __getitem__(self, index: int) -> wavelink.Track:
+        return self._node_at(self._index(index)).track
+
+    @property
+    def duration(self) -> float:
+        """Total length of the queued tracks in seconds, not counting streams."""
+        return self._length / 1000
+
+    def slice(self, start: int, stop: int) -> typing.List[wavelink.Track]:
+        """Tracks ``start`` up to ``stop``, found in O(log n) plus the number returned."""
+        start, stop = max(start, 0), min(stop, len(self))
+        tracks = []
+        if start >= stop:
+            return tracks
+        # Descend to ``start``, stacking the ancestors still to be visited in order.
+        stack: typing.List[_Node] = []
+        node, index = self._root, start
+        while node is not None:
+            left = _size(node.left)
+            if index < left:
+                stack.append(node)
+                node = node.left
+            elif index == left:
+                stack.append(node)
+                break
+            else:
+                index -= left + 1
+                node = node.right
+        while stack and len(tracks) < stop - start:
+            node = stack.pop()
+            tracks.append(node.track)
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+        return tracks
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("queue index out of range")
+        return index
+
+    def _insert_index(self, index: int) -> int:
+        """Clamps ``index`` the way ``list.insert`` does."""
+        if index < 0:
+            index += len(self)
+        return min(max(index, 0), len(self))
+
+    def _node_at(self, index: int) -> _Node:
+        node = self._root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node
+            else:
+                index -= left + 1
+                node = node.right
+
+    def _nodes(self) -> typing.Iterator[_Node]:
+        stack: typing.List[_Node] = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def _track_added(self, track: wavelink.Track) -> None:
+        self._ids[track.id] = self._ids.get(track.id, 0) + 1
+        self._length += _length(track)
+
+    def _track_removed(self, track: wavelink.Track) -> None:
+        self._length -= _length(track)
+        count = self._ids[track.id] - 1
+        if count:
+            self._ids[track.id] = count
+        else:
+            del self._ids[track.id]
+
+    def _next_round(self, requester: Requester) -> int:
+        round_ = max(self._round, self._rounds.get(requester, self._round - 1) + 1)
+        self._rounds[requester] = round_
+        return round_
+
+    def _fair_index(self, round_: int) -> int:
+        """Position after every queued track from ``round_`` or earlier."""
+        index = 0
+        node = self._root
+        while node is not None:
+            if node.round > round_:
+                node = node.left
+            else:
+                index += _size(node.left) + 1
+                node = node.right
+        return index
+
+    def _round_at(self, index: int) -> int:
+        """The round for a track put at ``index`` by hand: its left neighbour's, so rounds never decrease along the queue."""
+        return self._node_at(index - 1).round if index else self._round
+
+    def _insert_node(self, index: int, node: _Node) -> None:
+        if index == len(self):
+            # Appending only walks the right spine; no split needed.
+            self._root = _merge(self._root, node)
+        else:
+            left, right = _split(self._root, index)
+            self._root = _merge(_merge(left, node), right)
+        self._track_added(node.track)
+        self.version += 1
+
+    # -- adding ------------------------------------------------------------
+
+    def append(self, track: wavelink.Track, requester: Requester = None) -> int:
+        """Queues ``track`` at the end, or at its fair position, and returns its index."""
+        if self.fair:
+            round_ = self._next_round(requester)
+            index = self._fair_index(round_)
+        else:
+            round_ = self._round
+            index = len(self)
+        self._insert_node(index, _Node(track, requester, round_))
+        return index
+
+    def insert(self, index: int, track: wavelink.Track, requester: Requester = None) -> None:
+        index = self._insert_index(index)
+        self._insert_node(index, _Node(track, requester, self._round_at(index)))
+
+    def extend(self, tracks: typing.Iterable[wavelink.Track], requester: Requester = None) -> None:
+        if self.fair:
+            for track in tracks:
+                self.append(track, requester)
+            return
+        nodes = [_Node(track, requester, self._round) for track in tracks]
+        if not nodes:
+            return
+        for node in nodes:
+            self._track_added(node.track)
+        self._root = _merge(self._root, _build(nodes))
+        self.version += 1
+
+    # -- removing ----------------------------------------------------------
+
+    def _take_first(self) -> _Node:
+        parent = None
+        node = self._root
+        while node.left is not None:
+            node.size -= 1
+            parent, node = node, node.left
+        if parent is None:
+            self._root = node.right
+        else:
+            parent.left = node.right
+        node.right = None
+        node.size = 1
+        self._track_removed(node.track)
+        self.version += 1
+        return node
+
+    def _take(self, index: int) -> _Node:
+        if index == 0:
+            return self._take_first()
+        left, rest = _split(self._root, index)
+        node, right = _split(rest, 1)
+        self._root = _merge(left, right)
+        self._track_removed(node.track)
+        self.version += 1
+        return node
+
+    def pop(self, index: int = 0) -> wavelink.Track:
+        """Removes and returns the track at ``index``, the next one by default."""
+        if self._root is None:
+            raise IndexError("pop from an empty queue")
+        index = self._index(index)
+        node = self._take(index)
+        if index == 0:
+            self._round = max(self._round, node.round)
+        return node.track
+
+    def clear(self) -> None:
+        self._root = None
+        self._ids.clear()
+        self._length = 0
+        self._rounds.clear()
+        self.version += 1
+
+    def dedupe(self) -> int:
+        """Drops every repeat of a track already queued earlier; returns how many went."""
+        if len(self._ids) == len(self):
+            return 0
+        seen: typing.Set[str] = set()
+        kept = []
+        for node in self._nodes():
+            if node.track.id not in seen:
+                seen.add(node.track.id)
+                kept.append(node)
+        removed = len(self) - len(kept)
+        self._root = _build(kept)
+        self._ids = dict.fromkeys(seen, 1)
+        self._length = sum(_length(node.track) for node in kept)
+        self.version += 1
+        return removed
+
+    # -- reordering --------------------------------------------------------
+
+    def move(self, source: int, destination: int) -> wavelink.Track:
+        """Moves the track at ``source`` so it ends up at ``destination``."""
+        node = self._take(self._index(source))
+        index = self._insert_index(destination)
+        # _fair_index relies on the rounds staying in order, so the track joins its new neighbour's round.
+        node.round = self._round_at(index)
+        self._insert_node(index, node)
+        return node.track
+
+    def shuffle(self) -> None:
+        """Shuffles the tracks in place, keeping the tree's shape and each position's round."""
+        nodes = list(self._nodes())
+        payloads = [(node.track, node.requester) for node in nodes]
+        random.shuffle(payloads)
+        for node, (track, requester) in zip(nodes, payloads):
+            node.track, node.requester = track, requester
+        self.version += 1
@@ -0,0 +1,146 @@
+import asyncio
+import typing
+
+from loguru import logger
+
+from cogs.utils.storage import HistoryRecord, Storage
+
+
+class HistoryWriter:
+    """Write-behind queue that batches history records into the database.
+
+    ``submit`` never waits: records are queued in memory and a background
+    task writes them out once ``batch_size`` have built up or ``interval``
+    seconds have passed. When more than ``max_pending`` records are waiting,
+    new ones are dropped and counted instead of slowing down the caller.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        *,
+        batch_size: int = 100,
+        interval: float = 2.0,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.storage = storage
+        self.batch_size = batch_size
+        self.interval = interval
+
+        # Besides records, the queue carries futures from last_written_id and the None sentinel from close.
+        self._queue: "asyncio.Queue[typing.Union[HistoryRecord, asyncio.Future, None]]" = asyncio.Queue(
+            maxsize=max_pending
+        )
+        self._task: typing.Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, record: HistoryRecord) -> bool:
+        if self._closed:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        return True
+
+    async def close(self) -> None:
+        """Stops accepting records and waits until everything queued is written."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            return
+        # The sentinel queues behind every pending record, so they all get flushed first.
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def last_written_id(self) -> int:
+        """The ID of the newest history row once every record submitted before the call is written.
+
+        Records submitted after the call are not written until the ID has
+        been read, so they are exactly the ones that end up with larger IDs.
+        """
+        if self._task is None or self._closed:
+            return await self.storage.last_history_id()
+        written = asyncio.get_running_loop().create_future()
+        await self._queue.put(written)
+        return await written
+
+    async def _checkpoint(self, written: asyncio.Future) -> None:
+        try:
+            last_id = await self.storage.last_history_id()
+        except Exception as e:
+            if not written.done():
+                written.set_exception(e)
+        else:
+            if not written.done():
+                written.set_result(last_id)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self._queue.get()
+            if record is None:
+                return
+            if isinstance(record, asyncio.Future):
+                await self._checkpoint(record)
+                continue
+            batch = [record]
+            deadline = loop.time() + self.interval
+            stopping = False
+            checkpoint = None
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                if isinstance(record, asyncio.Future):
+                    checkpoint = record
+                    break
+                batch.append(record)
+
+            await self._flush(batch)
+            if checkpoint is not None:
+                await self._checkpoint(checkpoint)
+            if stopping:
+                return
+
+    async def _flush(self, batch: typing.List[HistoryRecord]) -> None:
+        try:
+            await self.storage.add_history(*batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Failed to write {len(batch)} history records: {e}")
+        else:
+            self.flushed += len(batch)
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "pending": self.pending,
+        }
@@ -0,0 +1,151 @@
+"""Runs ID4 as several worker processes, each owning a contiguous range of shards.
+
+    python launcher.py
+
+Every worker is a plain ``main.py`` with SHARD_COUNT, SHARD_IDS, WORKER_ID
+and WORKER_COUNT set. History, playlists and the resolution cache already
+live in SQLite files that the workers share. Each worker serves its own
+metrics on METRICS_PORT + 1 + WORKER_ID, and the launcher serves all of
+them merged, with a ``worker`` label, on METRICS_PORT.
+"""
+import asyncio
+import os
+import signal
+import sys
+import typing
+
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+from loguru import logger
+
+from cogs.utils.metrics import merge_exports
+
+load_dotenv()
+
+DISCORD_TOKEN = os.getenv("TOKEN")
+# Total shards; empty asks Discord for its recommended count.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+WORKERS = int(os.getenv("WORKERS") or os.cpu_count() or 1)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT", "9108")
+# Discord allows one IDENTIFY per 5 seconds per concurrency bucket.
+IDENTIFY_INTERVAL = 5.0
+RESTART_DELAY = 5.0
+
+
+def shard_ranges(shard_count: int, workers: int) -> typing.List[range]:
+    """Splits ``shard_count`` shards into at most ``workers`` contiguous, even ranges."""
+    workers = max(1, min(workers, shard_count))
+    return [range(i * shard_count // workers, (i + 1) * shard_count // workers) for i in range(workers)]
+
+
+async def recommended_shards() -> typing.Tuple[int, int]:
+    """Returns Discord's recommended shard count and the identify concurrency."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {DISCORD_TOKEN}"}
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return data["shards"], data["session_start_limit"]["max_concurrency"]
+
+
+class Worker:
+    def __init__(self, worker_id: int, shards: range, shard_count: int, worker_count: int) -> None:
+        self.worker_id = worker_id
+        self.shards = shards
+        self.env = dict(
+            os.environ,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=f"{shards.start}-{shards.stop - 1}",
+            WORKER_ID=str(worker_id),
+            WORKER_COUNT=str(worker_count),
+            METRICS_PORT=str(int(METRICS_PORT) + 1 + worker_id) if METRICS_PORT else "",
+        )
+        self.process: typing.Optional[asyncio.subprocess.Process] = None
+
+    @property
+    def metrics_url(self) -> str:
+        return f"http://{METRICS_HOST}:{self.env['METRICS_PORT']}/metrics"
+
+    async def run(self, stopping: asyncio.Event) -> None:
+        """Keeps the worker running until ``stopping`` is set, restarting it if it dies."""
+        while not stopping.is_set():
+            logger.info(f"Starting worker {self.worker_id} for shards {self.env['SHARD_IDS']}")
+            self.process = await asyncio.create_subprocess_exec(sys.executable, "main.py", env=self.env)
+            code = await self.process.wait()
+            if stopping.is_set():
+                return
+            logger.error(f"Worker {self.worker_id} exited with {code}, restarting in {RESTART_DELAY}s")
+            try:
+                await asyncio.wait_for(stopping.wait(), RESTART_DELAY)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+
+async def serve_metrics(workers: typing.List[Worker]) -> web.AppRunner:
+    session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+
+    async def scrape(worker: Worker) -> typing.Tuple[str, str]:
+        try:
+            async with session.get(worker.metrics_url) as resp:
+                return str(worker.worker_id), await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return str(worker.worker_id), ""
+
+    async def handle(request: web.Request) -> web.Response:
+        exports = dict(await asyncio.gather(*(scrape(worker) for worker in workers)))
+        return web.Response(text=merge_exports(exports), content_type="text/plain", charset="utf-8")
+
+    async def close_session(app: web.Application) -> None:
+        await session.close()
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    app.on_cleanup.append(close_session)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, int(METRICS_PORT)).start()
+    return runner
+
+
+async def main() -> None:
+    if SHARD_COUNT:
+        shard_count, concurrency = int(SHARD_COUNT), 1
+    else:
+        shard_count, concurrency = await recommended_shards()
+    ranges = shard_ranges(shard_count, WORKERS)
+    workers = [Worker(i, shards, shard_count, len(ranges)) for i, shards in enumerate(ranges)]
+    logger.info(f"Running {shard_count} shards across {len(workers)} workers")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    runner = await serve_metrics(workers) if METRICS_PORT else None
+    tasks = []
+    for worker in workers:
+        tasks.append(loop.create_task(worker.run(stopping)))
+        # Stagger start-up so the workers' shards don't all IDENTIFY at once.
+        try:
+            await asyncio.wait_for(stopping.wait(), IDENTIFY_INTERVAL * len(worker.shards) / concurrency)
+        except asyncio.TimeoutError:
+            pass
+
+    await stopping.wait()
+    logger.info("Stopping workers...")
+    for worker in workers:
+        worker.stop()
+    await asyncio.gather(*tasks)
+    if runner is not None:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
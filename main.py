@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import typing
 import asyncio
 
 import discord
@@ -8,9 +10,13 @@ from discord.ext import commands
 from dotenv import load_dotenv
 from loguru import logger
 
+from cogs.utils.metrics import Metrics
+
 # Load environment variables
 load_dotenv()
 
+STARTED_AT = time.perf_counter()
+
 # Set up logging
 def setup_logger():
     """Configures the logging settings."""
@@ -27,6 +33,52 @@ BOT_VERSION = os.getenv("VERSION")
 BOT_PREFIX = os.getenv("PREFIX")
 DISCORD_TOKEN = os.getenv("TOKEN")
 BOT_OWNER = os.getenv("OWNER")
+# Prometheus endpoint; leave METRICS_PORT empty to only collect for the stats command.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT", "9108")
+# Comma-separated discord.Intents flag names, or "all". Prefix commands need message_content.
+INTENTS = os.getenv("INTENTS", "guilds,voice_states,guild_messages,message_content")
+# Which members to keep cached: "all" (needs the members intent), "voice" or "none".
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "voice")
+# Messages kept in the client's cache; 0 turns the cache off.
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 0))
+# Total shards across all processes (empty lets Discord decide) and the ones this process runs,
+# as "first-last" or a comma-separated list. launcher.py sets these for each worker.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+
+
+def build_intents(spec: str) -> discord.Intents:
+    if spec.strip() == "all":
+        return discord.Intents.all()
+    intents = discord.Intents.none()
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name not in discord.Intents.VALID_FLAGS:
+            raise ValueError(f"Unknown intent {name!r}")
+        setattr(intents, name, True)
+    return intents
+
+
+def build_member_cache(spec: str, intents: discord.Intents) -> discord.MemberCacheFlags:
+    if spec == "all":
+        return discord.MemberCacheFlags.from_intents(intents)
+    flags = discord.MemberCacheFlags.none()
+    if spec == "voice":
+        flags.voice = intents.voice_states
+    elif spec != "none":
+        raise ValueError(f"Unknown member cache policy {spec!r}")
+    return flags
+
+
+def parse_shard_ids(spec: typing.Optional[str]) -> typing.Optional[typing.List[int]]:
+    if not spec:
+        return None
+    shard_ids = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
 
 # Set up bot status
 BOT_STATUS = discord.Activity(
@@ -34,27 +86,73 @@ BOT_STATUS = discord.Activity(
     name=f"{BOT_PREFIX}help | v{BOT_VERSION}"
 )
 
-class ID4(commands.Bot): 
+class ID4(commands.AutoShardedBot): 
     def __init__(self) -> None:
+        intents = build_intents(INTENTS)
+        shard_ids = parse_shard_ids(SHARD_IDS)
         super().__init__(
+            shard_count=int(SHARD_COUNT) if SHARD_COUNT else None,
+            shard_ids=shard_ids,
             command_prefix=commands.when_mentioned_or(BOT_PREFIX),
-            owner_id=BOT_OWNER,
+            owner_id=int(BOT_OWNER) if BOT_OWNER else None,
             activity=BOT_STATUS,
             case_insensitive=True,
             description="ID4 is an asynchronous Discord bot written in Python using the discord.py library.",
             status=discord.Status.online,
-            intents=discord.Intents.all(),
+            intents=intents,
+            member_cache_flags=build_member_cache(MEMBER_CACHE, intents),
+            chunk_guilds_at_startup=intents.members and MEMBER_CACHE == "all",
+            max_messages=MESSAGE_CACHE_SIZE or None,
         )
+        self.metrics = Metrics()
+        # Seconds from process start to each startup phase.
+        self.startup: typing.Dict[str, float] = {}
+        self.metrics.register(self.collect_startup)
+
+    def collect_startup(self):
+        for phase, seconds in self.startup.items():
+            yield "startup_seconds", {"phase": phase}, seconds
+
+    def mark_startup(self, phase: str) -> None:
+        self.startup[phase] = time.perf_counter() - STARTED_AT
+        logger.info(f"Startup: {phase} after {self.startup[phase]:.2f}s")
+
+    async def setup_hook(self) -> None:
+        self.mark_startup("logged_in")
+        await self.metrics.start(METRICS_HOST, int(METRICS_PORT) if METRICS_PORT else None)
+        await self.load_cogs()
+        self.mark_startup("extensions_loaded")
+
+    async def close(self) -> None:
+        await super().close()
+        await self.metrics.close()
+
+    async def on_command(self, ctx: commands.Context) -> None:
+        ctx.started_at = time.perf_counter()
+
+    async def on_command_completion(self, ctx: commands.Context) -> None:
+        self.metrics.observe("command_seconds", time.perf_counter() - ctx.started_at, command=ctx.command.qualified_name)
+
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError) -> None:
+        if ctx.command is not None and hasattr(ctx, "started_at"):
+            name = ctx.command.qualified_name
+            self.metrics.observe("command_seconds", time.perf_counter() - ctx.started_at, command=name)
+            self.metrics.inc("command_errors_total", command=name, error=type(error).__name__)
+        await super().on_command_error(ctx, error)
 
     async def on_ready(self) -> None:
+        # on_ready fires again after every gateway reconnect; only the first one is startup.
+        if "ready" in self.startup:
+            logger.info(f"Reconnected, serving {len(self.guilds)} servers.")
+            return
+        self.mark_startup("ready")
         logger.info(
             f"Discord.py API version: {discord.__version__}, Python version: {sys.version}"
         )
         self.bot_info = await self.application_info()
         for guild in self.guilds:
-            logger.info(f"Connected to {guild.name} (ID: {guild.id})")
-        logger.info(f"Serving {len(self.users)} users in {len(self.guilds)} servers.")
-        await self.load_cogs()
+            logger.debug(f"Connected to {guild.name} (ID: {guild.id})")
+        logger.info(f"Serving {len(self.users)} users in {len(self.guilds)} servers on shards {sorted(self.shards)} of {self.shard_count}.")
 
     async def load_cogs(self) -> None:
         for filename in os.listdir("./cogs"):
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import tempfile
+
+from bench.fakes import FakeDiscord, FakeLavalink, FakeSpotify
+from bench.load import Harness, configure_env, wait_for
+
+
+def test_players_move_to_the_surviving_node():
+    async def run():
+        first, second = FakeLavalink(0.0, track_seconds=600), FakeLavalink(0.0, track_seconds=600)
+        spotify = FakeSpotify(0.0)
+        for server in (first, second, spotify):
+            await server.start()
+
+        with tempfile.TemporaryDirectory() as directory:
+            configure_env(directory, first, spotify)
+            os.environ["LAVALINK_NODES"] = ",".join(
+                f"127.0.0.1:{server.port}:{server.password}" for server in (first, second)
+            )
+            import wavelink
+            from main import ID4
+
+            bot = ID4()
+            await bot._async_setup_hook()
+            fake = FakeDiscord(bot, 0.0)
+            await bot.setup_hook()
+            bot._ready.set()
+            cog = bot.get_cog("Music")
+            cog.nodes.check_interval = 0.2
+            await wait_for(lambda: len(cog.nodes.healthy_nodes()) == 2, "both nodes")
+            # The monitor started with the default interval; restart it on the short one.
+            cog.nodes._monitor.cancel()
+            cog.nodes._monitor = asyncio.get_running_loop().create_task(cog.nodes._watch())
+
+            harness = Harness(bot, fake)
+            guild, channel, member = fake.add_guild(0)
+            await harness.run_command(member, channel, "connect")
+            await harness.run_command(member, channel, "play failover song")
+            player = cog.sessions.get(guild.id).player
+            await wait_for(lambda: player.source is not None, "playback")
+            source = player.source
+            dead_server, live_server = (first, second) if player.node.identifier == "node-1" else (second, first)
+            await asyncio.sleep(1.0)
+            position = player.position
+
+            await dead_server.close()
+            await wait_for(lambda: str(guild.id) in live_server.last_play, "failover", timeout=10)
+            payload = live_server.last_play[str(guild.id)]
+            result = {
+                "node": player.node.identifier,
+                "live": cog.nodes.healthy_nodes()[0].identifier,
+                "track": payload["track"],
+                "source": source.id,
+                "start": int(payload.get("startTime", 0)) / 1000,
+                "position": position,
+                "errors": dict(harness.errors),
+            }
+            await bot.close()
+            for node in list(wavelink.NodePool._nodes.values()):
+                await node.cleanup()
+        for server in (live_server, spotify):
+            await server.close()
+        return result
+
+    result = asyncio.run(run())
+    assert result["errors"] == {}
+    assert result["node"] == result["live"]
+    assert result["track"] == result["source"]
+    assert result["start"] >= result["position"] >= 0.9
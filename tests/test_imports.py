@@ -0,0 +1,43 @@
+import asyncio
+
+import wavelink
+
+from cogs.utils.imports import SPOTIFY_PLAYLIST, YOUTUBE_PLAYLIST, ImportJob, Importer, ImportSource
+from cogs.utils.resolver import BatchResolver
+from cogs.utils.spotify import SpotifyError
+
+
+class BrokenSpotify:
+    """Serves the first page of a playlist, then fails like a playlist made private mid-import."""
+
+    async def playlist_tracks(self, playlist_id, offset=0, limit=100):
+        if offset:
+            raise SpotifyError(404, "Resource not found")
+        items = [{"track": {"name": f"song {n}", "artists": [{"name": "artist"}]}} for n in range(3)]
+        return {"items": items, "total": 6, "next": "page 2"}
+
+
+async def search(query):
+    return wavelink.YouTubeTrack(query, {"title": query, "identifier": query, "length": 1000, "isStream": False})
+
+
+async def collect(importer, job):
+    return [result async for result in importer.stream(job)]
+
+
+def test_spotify_error_keeps_tracks_already_read():
+    importer = Importer(BrokenSpotify(), BatchResolver(search=search), None)
+    job = ImportJob(ImportSource(SPOTIFY_PLAYLIST, "abc", "https://open.spotify.com/playlist/abc"))
+    results = asyncio.run(collect(importer, job))
+    assert [result.track.title for result in results] == ["song 0 artist", "song 1 artist", "song 2 artist"]
+    assert "after 3 songs" in job.error
+
+
+def test_unloadable_youtube_playlist_sets_error():
+    async def load_playlist(url):
+        raise wavelink.LoadTrackError({"exception": {"message": "This playlist is private.", "severity": "COMMON"}})
+
+    importer = Importer(None, BatchResolver(search=search), load_playlist)
+    job = ImportJob(ImportSource(YOUTUBE_PLAYLIST, "PLx", "https://www.youtube.com/playlist?list=PLx"))
+    assert asyncio.run(collect(importer, job)) == []
+    assert "private" in job.error
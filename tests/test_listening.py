@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+
+from cogs.utils.listening import ListeningStats
+from cogs.utils.storage import HistoryRecord, Storage
+from cogs.utils.writebehind import HistoryWriter
+
+
+def record(index: int) -> HistoryRecord:
+    return HistoryRecord(1, 2, "listener", f"Song {index}", f"https://example.com/{index}", time.time())
+
+
+def test_rebuild_keeps_records_pending_in_the_writer(tmp_path):
+    async def run():
+        storage = Storage(os.path.join(tmp_path, "history.db"))
+        # A long interval keeps submitted records pending until something forces them out.
+        writer = HistoryWriter(storage, batch_size=1000, interval=60)
+        writer.start()
+        stats = ListeningStats()
+
+        def play(index: int) -> None:
+            # Same order as the cog: counted live, then handed to the writer.
+            stats.add(record(index))
+            writer.submit(record(index))
+
+        await storage.add_history(*(record(index) for index in range(5)))
+        for index in range(5, 10):
+            play(index)
+        rebuild = asyncio.create_task(stats.rebuild(storage, writer=writer, batch_size=2))
+        await asyncio.sleep(0)
+        for index in range(10, 15):
+            play(index)
+        await rebuild
+        await writer.close()
+        written = await storage.last_history_id()
+        storage.close()
+        return stats, written
+
+    stats, written = asyncio.run(run())
+    assert written == 15
+    assert stats.plays == 15
+    assert stats.guilds[1].plays == 15
+    assert len(stats.top_tracks(guild_id=1, limit=20)) == 15
+
+
+def test_rebuild_only_counts_guilds_on_the_given_shards(tmp_path):
+    async def run():
+        storage = Storage(os.path.join(tmp_path, "history.db"))
+        # Guild 1 << 22 is on shard 1 of 2, guild 2 << 22 on shard 0; user 2 listens in both.
+        here, elsewhere = 1 << 22, 2 << 22
+        await storage.add_history(
+            *(HistoryRecord(here, 2, "listener", f"Here {n}", None, time.time()) for n in range(3)),
+            *(HistoryRecord(elsewhere, 2, "listener", f"Elsewhere {n}", None, time.time()) for n in range(4)),
+        )
+        stats = ListeningStats()
+        read = await stats.rebuild(storage, shard_ids=[1], shard_count=2, batch_size=2)
+        storage.close()
+        return stats, read, here
+
+    stats, read, here = asyncio.run(run())
+    assert read == 3
+    assert list(stats.guilds) == [here]
+    assert stats.users[2].plays == 3
+    assert {name for name, _ in stats.top_tracks(user_id=2)} == {"Here 0", "Here 1", "Here 2"}
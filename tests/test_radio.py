@@ -0,0 +1,46 @@
+import asyncio
+import tempfile
+
+from bench.fakes import FakeDiscord, FakeLavalink, FakeSpotify
+from bench.load import Harness, configure_env, wait_for
+
+
+def test_radio_refills_from_the_track_that_ended():
+    async def run():
+        lavalink, spotify = FakeLavalink(0.0, track_seconds=1.0), FakeSpotify(0.0)
+        for server in (lavalink, spotify):
+            await server.start()
+
+        with tempfile.TemporaryDirectory() as directory:
+            configure_env(directory, lavalink, spotify)
+            import wavelink
+            from main import ID4
+
+            bot = ID4()
+            await bot._async_setup_hook()
+            fake = FakeDiscord(bot, 0.0)
+            await bot.setup_hook()
+            bot._ready.set()
+            cog = bot.get_cog("Music")
+            cog.prefetcher.lookahead = 1
+            await wait_for(lambda: any(node.is_connected() for node in wavelink.NodePool._nodes.values()), "Lavalink")
+
+            harness = Harness(bot, fake)
+            guild, channel, member = fake.add_guild(0)
+            for command in ("connect", "play radio seed", "radio"):
+                await harness.run_command(member, channel, command)
+            session = cog.sessions.get(guild.id)
+            await wait_for(lambda: len(session.prefetch) == 1, "prefetch")
+            # As if the last fill had come back empty: when the seed ends there is nothing buffered or in flight.
+            session.prefetch.clear()
+            plays = lavalink.plays
+            await wait_for(lambda: lavalink.plays >= plays + 2, "radio to keep playing")
+            errors = dict(harness.errors)
+            await bot.close()
+            for node in list(wavelink.NodePool._nodes.values()):
+                await node.cleanup()
+        for server in (lavalink, spotify):
+            await server.close()
+        return errors
+
+    assert asyncio.run(run()) == {}
@@ -0,0 +1,41 @@
+import asyncio
+
+from cogs.utils.recommendations import RecommendationEngine
+from cogs.utils.session import GuildSession
+
+
+class CannedSpotify:
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    async def recommendations(self, seed_tracks, limit):
+        return {"tracks": self.tracks}
+
+
+def track(track_id, name, *artists):
+    return {"id": track_id, "name": name, "artists": [{"name": artist} for artist in artists]}
+
+
+def test_skips_recently_played_songs_only():
+    async def lookup(title):
+        return "seed"
+
+    spotify = CannedSpotify([
+        track("1", "Love", "Kendrick Lamar"),
+        track("2", "Crazy In Love (feat. Jay-Z)", "Beyoncé", "JAY-Z"),
+        track("3", "Never Gonna Give You Up - Remastered 2011", "Rick Astley"),
+        track("4", "Hello", "Lionel Richie"),
+        track("5", "Up", "Shania Twain"),
+        track("6", "Yellow", "Coldplay"),
+    ])
+    recent = [
+        "Beyoncé - Crazy In Love ft. JAY Z (Official Video)",
+        "Rick Astley - Never Gonna Give You Up (Official Music Video)",
+        "Adele - Hello",
+        "yellow",
+    ]
+    engine = RecommendationEngine(spotify, lookup)
+    session = GuildSession(1, None)
+    queries = asyncio.run(engine.take(session, 10, ["Seed Song"], recent))
+    # "Love" and "Up" are part of played titles but different songs, and this "Hello" is by someone else.
+    assert queries == ["Love Kendrick Lamar", "Hello Lionel Richie", "Up Shania Twain"]
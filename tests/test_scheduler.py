@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from cogs.utils.scheduler import Scheduler
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def test_retry_waits_for_retry_after():
+    async def run():
+        scheduler = Scheduler()
+        scheduler.add_upstream("spotify", rate=100, burst=10, concurrency=4)
+        # Let every worker go idle first: the bug was an idle worker holding a token it took before the backoff.
+        await scheduler.submit("spotify", lambda: asyncio.sleep(0))
+        await asyncio.sleep(0.05)
+        calls = []
+
+        async def call():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise RateLimited(0.5)
+            return "ok"
+
+        try:
+            result = await scheduler.submit("spotify", call)
+        finally:
+            await scheduler.close()
+        return result, calls
+
+    result, calls = asyncio.run(run())
+    assert result == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.5
+
+
+def test_backoff_holds_back_other_jobs():
+    async def run():
+        scheduler = Scheduler()
+        scheduler.add_upstream("spotify", rate=100, burst=10, concurrency=4)
+        await scheduler.submit("spotify", lambda: asyncio.sleep(0))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        finished = []
+
+        async def limited():
+            if not finished:
+                finished.append(None)
+                raise RateLimited(0.3)
+            return time.monotonic() - started
+
+        async def other():
+            await asyncio.sleep(0.05)
+            return await scheduler.submit("spotify", lambda: asyncio.sleep(0, time.monotonic() - started))
+
+        try:
+            return await asyncio.gather(scheduler.submit("spotify", limited), other())
+        finally:
+            await scheduler.close()
+
+    retried, other = asyncio.run(run())
+    assert retried >= 0.3
+    assert other >= 0.3
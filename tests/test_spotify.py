@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from bench.fakes import FakeSpotify
+from cogs.utils.metrics import Metrics
+from cogs.utils.scheduler import Scheduler
+from cogs.utils.spotify import AsyncSpotify
+
+
+def test_slow_spotify_does_not_stall_the_event_loop():
+    async def run():
+        server = FakeSpotify(latency=1.0)
+        await server.start()
+        client = AsyncSpotify("id", "secret", api_url=server.api_url, token_url=server.token_url)
+        metrics = Metrics(lag_interval=0.02)
+        await metrics.start()
+        try:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(client.search(f"song {n}") for n in range(20)))
+            elapsed = time.perf_counter() - started
+        finally:
+            await metrics.close()
+            await client.close()
+            await server.close()
+        return results, elapsed, metrics.loop_lag
+
+    results, elapsed, lag = asyncio.run(run())
+    assert all(result["tracks"]["items"] for result in results)
+    # Token fetch plus one round of concurrent searches, not twenty searches back to back.
+    assert elapsed < 4.0
+    # The sampler kept ticking on time for the whole second the requests were outstanding.
+    assert lag.count >= 40
+    assert lag.max < 0.1
+
+
+class RateLimitedSpotipy:
+    """Stands in for the spotipy client: answers the first search with a 429."""
+
+    def __init__(self, retry_after: str) -> None:
+        self.retry_after = retry_after
+        self.calls = []
+
+    def search(self, **kwargs):
+        from spotipy import SpotifyException
+
+        self.calls.append(time.monotonic())
+        if len(self.calls) == 1:
+            raise SpotifyException(429, -1, "rate limited", headers={"Retry-After": self.retry_after})
+        return {"tracks": {"items": [{"id": "found"}]}}
+
+
+def test_threaded_calls_back_off_for_retry_after():
+    async def run():
+        scheduler = Scheduler()
+        scheduler.add_upstream("spotify", rate=100, burst=10, concurrency=4)
+        client = AsyncSpotify("id", "secret", use_threads=True, scheduler=scheduler)
+        client._spotipy = spotipy = RateLimitedSpotipy("0.5")
+        try:
+            result = await client.search("song")
+        finally:
+            await scheduler.close()
+            await client.close()
+        return result, spotipy.calls
+
+    result, calls = asyncio.run(run())
+    assert result["tracks"]["items"][0]["id"] == "found"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.5
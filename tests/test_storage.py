@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+
+from cogs.utils.storage import HistoryRecord, PlaylistEntry, Storage
+
+LEGACY = {
+    "_default": {
+        "1": {"requestor": "someone", "song_name": "First", "song_url": "https://example.com/1", "time": "12:00:00|01/02/2023"},
+        "2": {"requestor": "someone", "song_name": "Second", "song_url": "https://example.com/2", "time": "12:05:00|01/02/2023"},
+    },
+    "playlists": {
+        "1": {"user_id": 7, "playlist_name": "mix", "song_name": "A", "song_url": "https://example.com/a"},
+        "2": {"user_id": 7, "playlist_name": "mix", "song_name": "B", "song_url": "https://example.com/b"},
+        "3": {"user_id": 8, "playlist_name": "chill", "song_name": "C", "song_url": "https://example.com/c"},
+    },
+}
+
+
+def write_legacy(path):
+    with open(path, "w", encoding="utf-8") as write_file:
+        json.dump(LEGACY, write_file)
+
+
+def contents(storage):
+    return (
+        storage._last_history_id(),
+        storage._playlist_entries(7, "mix"),
+        storage._playlist_entries(8, "chill"),
+    )
+
+
+def test_tinydb_import_is_not_repeated_when_the_rename_was_lost(tmp_path):
+    json_path = os.path.join(tmp_path, "history.json")
+    write_legacy(json_path)
+    storage = Storage(os.path.join(tmp_path, "harmony.db"))
+
+    assert storage._migrate_tinydb(json_path) == 5
+    imported = contents(storage)
+    # As if the process had died after committing but before renaming the file.
+    shutil.move(json_path + ".migrated", json_path)
+
+    assert storage._migrate_tinydb(json_path) == 0
+    assert contents(storage) == imported
+    assert imported[0] == 2
+    assert [entry.song_name for entry in imported[1]] == ["A", "B"]
+    assert not os.path.exists(json_path)
+    assert os.path.exists(json_path + ".migrated")
+    storage.close()
+
+
+def test_tinydb_import_resumes_a_leftover_migrating_file(tmp_path):
+    json_path = os.path.join(tmp_path, "history.json")
+    # What earlier versions left behind after dying between playlists:
+    # the file claimed, all history and the first playlist written.
+    write_legacy(json_path + ".migrating")
+    storage = Storage(os.path.join(tmp_path, "harmony.db"))
+    storage._add_history([(None, None, "someone", "First", None, 1.0), (None, None, "someone", "Second", None, 2.0)])
+    storage._add_playlist_entries(7, "mix", [PlaylistEntry("A", "https://example.com/a"), PlaylistEntry("B", None)])
+
+    assert storage._migrate_tinydb(json_path) == 1
+    last_id, mix, chill = contents(storage)
+    assert last_id == 2
+    assert len(mix) == 2
+    assert [entry.song_name for entry in chill] == ["C"]
+    assert os.path.exists(json_path + ".migrated")
+    assert not os.path.exists(json_path + ".migrating")
+    storage.close()
+
+
+def test_recent_history_only_covers_the_given_shards(tmp_path):
+    storage = Storage(os.path.join(tmp_path, "harmony.db"))
+    # Discord puts a guild on shard (guild_id >> 22) % shard_count.
+    guilds = [(shard << 22) + 1000 * n for n in range(1, 4) for shard in range(4)]
+    storage._add_history(
+        [HistoryRecord(guild_id, 1, "someone", f"Song {n}", None, float(n)) for guild_id in guilds for n in range(3)]
+    )
+
+    records = storage._recent_history_by_guild(2, [1, 3], 4)
+    assert {record.guild_id for record in records} == {guild_id for guild_id in guilds if (guild_id >> 22) % 4 in (1, 3)}
+    assert len(records) == 2 * 6
+    assert len(storage._recent_history_by_guild(2, None, 1)) == 2 * len(guilds)
+    storage.close()
@@ -0,0 +1,27 @@
+import random
+
+from bench.trackmeta import make_track
+from cogs.utils.trackqueue import TrackQueue
+
+
+def rounds(queue):
+    return [node.round for node in queue._nodes()]
+
+
+def test_fair_appends_after_moves_keep_round_order():
+    random.seed(0)
+    tracks = [make_track(index) for index in range(50)]
+    queue = TrackQueue(fair=True)
+    for step in range(3000):
+        if len(queue) > 1 and random.random() < 0.3:
+            queue.move(random.randrange(len(queue)), random.randrange(len(queue)))
+        elif queue and random.random() < 0.2:
+            queue.pop()
+        else:
+            requester = random.randrange(4)
+            index = queue.append(random.choice(tracks), requester)
+            # Right after every track from the same round or an earlier one, and before the later ones.
+            order = rounds(queue)
+            assert all(round_ <= order[index] for round_ in order[:index])
+            assert all(round_ > order[index] for round_ in order[index + 1:])
+        assert rounds(queue) == sorted(rounds(queue)), f"rounds out of order after step {step}"